@@ -0,0 +1,82 @@
+import glob
+import os
+import re
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from embeddings.utils import secciones_md
+from embeddings.utils.secciones_md import parsear_markdown
+
+
+def _extraccion_por_regex(contenido):
+    """Extracción anterior: una búsqueda independiente (compilada en cada llamada) por cada dato."""
+    re.search(r"^##\s*(.+)", contenido, re.MULTILINE)
+    re.search(r"###\s*Descripción\.\s*\n+(.+?)(?=\n###|\Z)", contenido, re.DOTALL)
+    re.search(r"### Parámetros Técnicos\n\n(.*?)(?=\n\n###|\Z)", contenido, re.DOTALL)
+    match = re.search(r"### Adicionales\n\n(.*?)(?=\n\n###|\Z)", contenido, re.DOTALL)
+    if match:
+        for linea in match.group(1).strip().split('\n'):
+            re.search(r'\*\*(.*?)\*\*:\s*(.*)', linea)
+    re.split(r"### Parámetros Técnicos", contenido)
+    list(re.finditer(r"^#{2,3} (.+?)(?:\.|\n)", contenido, flags=re.MULTILINE))
+
+
+def _extraccion_por_arbol(contenido):
+    documento = parsear_markdown(contenido)
+    documento.titulo
+    documento.descripcion
+    documento.parametros_tecnicos
+    documento.adicionales
+    documento.texto_antes_de("Parámetros Técnicos", prefijo=True)
+    documento.seccion("procedimiento")
+
+
+class Command(BaseCommand):
+    help = 'Compara el tiempo de extracción de secciones con regex sueltas y con el parser compartido'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeticiones',
+            type=int,
+            default=20,
+            help='Cantidad de veces que se recorre el corpus (default: 20)',
+        )
+
+    def handle(self, *args, **options):
+        rutas = glob.glob(os.path.join(settings.MEDIA_ROOT, 'Markdowns', '**', '*.md'), recursive=True)
+        if not rutas:
+            self.stdout.write(self.style.ERROR('No se encontraron archivos en MEDIA_ROOT/Markdowns'))
+            return
+
+        corpus = []
+        for ruta in rutas:
+            with open(ruta, 'r', encoding='utf-8') as f:
+                corpus.append(f.read())
+        repeticiones = options['repeticiones']
+
+        def medir(funcion):
+            inicio = time.perf_counter()
+            for _ in range(repeticiones):
+                for contenido in corpus:
+                    funcion(contenido)
+            return time.perf_counter() - inicio
+
+        tiempo_regex = medir(_extraccion_por_regex)
+
+        # Sin caché: cada documento se analiza de nuevo en cada repetición
+        def sin_cache(contenido):
+            secciones_md._cache.clear()
+            _extraccion_por_arbol(contenido)
+        tiempo_arbol = medir(sin_cache)
+
+        secciones_md._cache.clear()
+        tiempo_cache = medir(_extraccion_por_arbol)
+
+        self.stdout.write(f'{len(corpus)} documentos x {repeticiones} repeticiones')
+        self.stdout.write(f'Regex por llamada:        {tiempo_regex * 1000:.1f} ms')
+        self.stdout.write(f'Parser de una pasada:     {tiempo_arbol * 1000:.1f} ms ({tiempo_regex / tiempo_arbol:.1f}x)')
+        self.stdout.write(self.style.SUCCESS(
+            f'Parser con caché:         {tiempo_cache * 1000:.1f} ms ({tiempo_regex / tiempo_cache:.1f}x)'
+        ))
@@ -0,0 +1,11 @@
+from embeddings.utils.trabajos import cola_ingestas
+from main.utils.segundo_plano import ComandoProcesarCola
+
+
+class Command(ComandoProcesarCola):
+    help = 'Procesa los trabajos de ingesta de embeddings pendientes (worker local, sin broker externo)'
+    trabajos = 'trabajos de ingesta'
+    minutos_sin_avance = 30
+
+    def obtener_cola(self):
+        return cola_ingestas
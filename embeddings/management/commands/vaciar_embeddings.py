@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from embeddings.utils.embeddings_processor import vaciar_vectorstore
+
+
+class Command(BaseCommand):
+    help = 'Elimina todos los embeddings y reconstruye la colección vacía (los workers recargan la base de datos)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--confirmar',
+            action='store_true',
+            help='Confirma la eliminación de todos los embeddings',
+        )
+
+    def handle(self, *args, **options):
+        if not options['confirmar']:
+            self.stdout.write(self.style.WARNING('Se eliminarán todos los embeddings. Vuelva a ejecutar con --confirmar.'))
+            return
+
+        eliminados = vaciar_vectorstore()
+        self.stdout.write(self.style.SUCCESS(f'{eliminados} embeddings eliminados'))
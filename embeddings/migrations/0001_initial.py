@@ -0,0 +1,30 @@
+# Generated by Django 5.2 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmbeddingCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=64, unique=True, verbose_name='Clave')),
+                ('modelo', models.CharField(max_length=100, verbose_name='Modelo')),
+                ('vector', models.JSONField(verbose_name='Vector')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('ultimo_uso', models.DateTimeField(auto_now=True, db_index=True, verbose_name='Último Uso')),
+            ],
+            options={
+                'verbose_name': 'Embedding en Caché',
+                'verbose_name_plural': 'Embeddings en Caché',
+                'ordering': ['-ultimo_uso'],
+            },
+        ),
+    ]
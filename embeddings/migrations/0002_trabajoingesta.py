@@ -0,0 +1,40 @@
+# Generated by Django 5.2 on 2026-10-18 10:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('embeddings', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoIngesta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('categoria', models.CharField(max_length=100, verbose_name='Categoría')),
+                ('documentos', models.JSONField(default=list, verbose_name='Documentos')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_proceso', 'En proceso'), ('completado', 'Completado'), ('error', 'Error')], db_index=True, default='pendiente', max_length=20, verbose_name='Estado')),
+                ('total_documentos', models.PositiveIntegerField(default=0, verbose_name='Total de Documentos')),
+                ('documentos_procesados', models.PositiveIntegerField(default=0, verbose_name='Documentos Procesados')),
+                ('agregados', models.PositiveIntegerField(default=0, verbose_name='Agregados')),
+                ('actualizados', models.PositiveIntegerField(default=0, verbose_name='Actualizados')),
+                ('omitidos', models.PositiveIntegerField(default=0, verbose_name='Omitidos')),
+                ('tokens_usados', models.PositiveIntegerField(default=0, verbose_name='Tokens Usados')),
+                ('errores', models.JSONField(blank=True, default=list, verbose_name='Errores')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Fecha de Actualización')),
+                ('creado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='trabajos_ingesta', to=settings.AUTH_USER_MODEL, verbose_name='Creado por')),
+            ],
+            options={
+                'verbose_name': 'Trabajo de Ingesta',
+                'verbose_name_plural': 'Trabajos de Ingesta',
+                'ordering': ['-fecha_creacion'],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-18 16:10
+
+from django.db import migrations, models
+
+
+def documentos_a_archivos(apps, schema_editor):
+    """Los trabajos existentes guardaban los datos de cada documento; conservar solo el nombre."""
+    TrabajoIngesta = apps.get_model('embeddings', 'TrabajoIngesta')
+    for trabajo in TrabajoIngesta.objects.all():
+        trabajo.archivos = [
+            documento['nombre_archivo'] if isinstance(documento, dict) else documento
+            for documento in trabajo.archivos
+        ]
+        trabajo.save(update_fields=['archivos'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('embeddings', '0002_trabajoingesta'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='trabajoingesta',
+            old_name='documentos',
+            new_name='archivos',
+        ),
+        migrations.AlterField(
+            model_name='trabajoingesta',
+            name='archivos',
+            field=models.JSONField(default=list, verbose_name='Archivos'),
+        ),
+        migrations.RunPython(documentos_a_archivos, migrations.RunPython.noop),
+    ]
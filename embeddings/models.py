@@ -1,3 +1,90 @@
 from django.db import models
+from django.contrib.auth.models import User
 
-# Create your models here.
+
+class EmbeddingCache(models.Model):
+    """
+    Caché persistente de embeddings de consultas (títulos), compartida entre workers.
+    La clave es el hash SHA-256 del modelo y del texto.
+    """
+    clave = models.CharField(max_length=64, unique=True, verbose_name='Clave')
+    modelo = models.CharField(max_length=100, verbose_name='Modelo')
+    vector = models.JSONField(verbose_name='Vector')
+    fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')
+    ultimo_uso = models.DateTimeField(auto_now=True, db_index=True, verbose_name='Último Uso')
+
+    class Meta:
+        verbose_name = 'Embedding en Caché'
+        verbose_name_plural = 'Embeddings en Caché'
+        ordering = ['-ultimo_uso']
+
+    def __str__(self):
+        return f"{self.modelo} - {self.clave[:12]}"
+
+
+class TrabajoIngesta(models.Model):
+    """
+    Trabajo de carga de embeddings que se procesa fuera de la solicitud HTTP.
+    Guarda los nombres de los archivos subidos (en MEDIA_ROOT/Markdowns/<categoria>)
+    y el progreso de la carga.
+    """
+    ESTADO_PENDIENTE = 'pendiente'
+    ESTADO_EN_PROCESO = 'en_proceso'
+    ESTADO_COMPLETADO = 'completado'
+    ESTADO_ERROR = 'error'
+    ESTADOS = [
+        (ESTADO_PENDIENTE, 'Pendiente'),
+        (ESTADO_EN_PROCESO, 'En proceso'),
+        (ESTADO_COMPLETADO, 'Completado'),
+        (ESTADO_ERROR, 'Error'),
+    ]
+
+    categoria = models.CharField(max_length=100, verbose_name='Categoría')
+    archivos = models.JSONField(default=list, verbose_name='Archivos')
+    estado = models.CharField(max_length=20, choices=ESTADOS, default=ESTADO_PENDIENTE, db_index=True, verbose_name='Estado')
+    total_documentos = models.PositiveIntegerField(default=0, verbose_name='Total de Documentos')
+    documentos_procesados = models.PositiveIntegerField(default=0, verbose_name='Documentos Procesados')
+    agregados = models.PositiveIntegerField(default=0, verbose_name='Agregados')
+    actualizados = models.PositiveIntegerField(default=0, verbose_name='Actualizados')
+    omitidos = models.PositiveIntegerField(default=0, verbose_name='Omitidos')
+    tokens_usados = models.PositiveIntegerField(default=0, verbose_name='Tokens Usados')
+    errores = models.JSONField(default=list, blank=True, verbose_name='Errores')
+    creado_por = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='trabajos_ingesta',
+        verbose_name='Creado por'
+    )
+    fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')
+    fecha_actualizacion = models.DateTimeField(auto_now=True, verbose_name='Fecha de Actualización')
+
+    class Meta:
+        verbose_name = 'Trabajo de Ingesta'
+        verbose_name_plural = 'Trabajos de Ingesta'
+        ordering = ['-fecha_creacion']
+
+    def __str__(self):
+        return f"Ingesta #{self.pk} - {self.categoria} ({self.get_estado_display()})"
+
+    @property
+    def finalizado(self):
+        return self.estado in (self.ESTADO_COMPLETADO, self.ESTADO_ERROR)
+
+    def como_dict(self):
+        """Representación del estado del trabajo para el endpoint de progreso."""
+        return {
+            'id': self.pk,
+            'categoria': self.categoria,
+            'estado': self.estado,
+            'estado_display': self.get_estado_display(),
+            'total_documentos': self.total_documentos,
+            'documentos_procesados': self.documentos_procesados,
+            'agregados': self.agregados,
+            'actualizados': self.actualizados,
+            'omitidos': self.omitidos,
+            'tokens_usados': self.tokens_usados,
+            'errores': self.errores,
+            'finalizado': self.finalizado,
+        }
@@ -1,3 +1,244 @@
-from django.test import TestCase
+import os
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from chromadb.api.client import SharedSystemClient
+from django.test import TestCase, override_settings
+
+from embeddings.models import EmbeddingCache, TrabajoIngesta
+from embeddings.utils import embeddings_processor
+from embeddings.utils.embeddings_processor import embeber_consultas
+from embeddings.utils.secciones_md import parsear_markdown
+from embeddings.utils.trabajos import cola_ingestas, encolar_ingesta, ejecutar_trabajo
+
+
+class EmbeddingsFalsos:
+    """Modelo de embeddings que registra cada llamada en lugar de usar la API."""
+    model = 'modelo-falso'
+
+    def __init__(self):
+        self.llamadas = []
+
+    def embed_documents(self, textos):
+        self.llamadas.append(list(textos))
+        return [[float(len(texto)), float(i)] for i, texto in enumerate(textos)]
+
+
+class VectorstoreTemporalTestCase(TestCase):
+    """Usa una base de datos vectorial vacía en un directorio temporal."""
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directorio.cleanup)
+        parches = [mock.patch.dict(os.environ, {'OPENAI_API_KEY': 'sk-prueba'})] + [
+            mock.patch.object(embeddings_processor, nombre, valor)
+            for nombre, valor in (('VECTOR_DB_PATH', self.directorio.name), ('_vectorstore', None), ('_vectorstore_firma', None))
+        ]
+        for parche in parches:
+            parche.start()
+            self.addCleanup(parche.stop)
+        self.addCleanup(SharedSystemClient._identifier_to_system.pop, self.directorio.name, None)
+
+    def _agregar(self, vectorstore, *ids):
+        vectorstore._collection.add(
+            ids=list(ids), embeddings=[[1.0, 0.0]] * len(ids), metadatas=[{'categoria': 'muros'}] * len(ids)
+        )
+
+
+class VectorstoreCompartidoTests(VectorstoreTemporalTestCase):
+    def test_reutiliza_la_instancia_mientras_no_cambia_la_base_de_datos(self):
+        self.assertIs(embeddings_processor.obtener_vectorstore(), embeddings_processor.obtener_vectorstore())
+
+    def test_vaciar_recarga_la_instancia_sin_afectar_a_la_anterior(self):
+        anterior = embeddings_processor.obtener_vectorstore()
+        self._agregar(anterior, 'a', 'b')
+
+        self.assertEqual(embeddings_processor.vaciar_vectorstore(), 2)
+
+        nueva = embeddings_processor.obtener_vectorstore()
+        self.assertIsNot(nueva, anterior)
+        self.assertEqual(nueva._collection.count(), 0)
+        # Un hilo que aún tiene la instancia anterior puede seguir usándola
+        self.assertEqual(anterior._collection.count(), 0)
+
+    def test_otro_worker_detecta_la_nueva_generacion(self):
+        anterior = embeddings_processor.obtener_vectorstore()
+        with open(os.path.join(self.directorio.name, '.generacion'), 'w', encoding='utf-8') as f:
+            f.write('reconstruida')
+
+        self.assertIsNot(embeddings_processor.obtener_vectorstore(), anterior)
+
+
+class ContarEmbeddingsTests(VectorstoreTemporalTestCase):
+    def setUp(self):
+        super().setUp()
+        parche = mock.patch.object(embeddings_processor, '_conteos_por_categoria', {})
+        parche.start()
+        self.addCleanup(parche.stop)
+        self.vectorstore = embeddings_processor.obtener_vectorstore()
+        self._agregar(self.vectorstore, 'a', 'b')
+
+    def test_sin_filtro_no_trae_los_ids(self):
+        with mock.patch.object(self.vectorstore, 'get') as get:
+            self.assertEqual(embeddings_processor.contar_embeddings(), 2)
+        get.assert_not_called()
+
+    def test_el_conteo_por_categoria_se_reutiliza_hasta_que_cambia_la_coleccion(self):
+        with mock.patch.object(self.vectorstore, 'get', wraps=self.vectorstore.get) as get:
+            self.assertEqual(embeddings_processor.contar_embeddings('muros'), 2)
+            self.assertEqual(embeddings_processor.contar_embeddings('muros'), 2)
+            self.assertEqual(get.call_count, 1)
+
+            self._agregar(self.vectorstore, 'c')
+            embeddings_processor.marcar_coleccion_modificada()
+            self.assertEqual(embeddings_processor.contar_embeddings('muros'), 3)
+            self.assertEqual(get.call_count, 2)
+
+
+class IngerirDocumentosTests(VectorstoreTemporalTestCase):
+    def setUp(self):
+        super().setUp()
+        self.embeddings = EmbeddingsFalsos()
+        self.vectorstore = embeddings_processor.obtener_vectorstore()
+        self.vectorstore._embedding_function = self.embeddings
+        # tiktoken descarga la codificación la primera vez; contar caracteres basta aquí
+        parche = mock.patch.object(embeddings_processor, 'contar_tokens', side_effect=len)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def _documento(self, nombre_archivo, texto='Muro de ladrillo'):
+        return {
+            'titulo': nombre_archivo, 'descripcion': texto, 'texto_para_embedding': texto,
+            'nombre_archivo': nombre_archivo, 'categoria': 'muros'
+        }
+
+    def test_consulta_solo_los_documentos_del_lote(self):
+        # Registro de una carga anterior sin ID estable y otro de un archivo distinto
+        self.vectorstore._collection.add(
+            ids=['anterior', 'otro'], embeddings=[[1.0, 0.0]] * 2,
+            metadatas=[{'categoria': 'muros', 'nombre_archivo': 'muro.md'},
+                       {'categoria': 'muros', 'nombre_archivo': 'otro.md'}]
+        )
+
+        with mock.patch.object(self.vectorstore, 'get', wraps=self.vectorstore.get) as get:
+            resultado = embeddings_processor.ingerir_documentos([self._documento('muro.md')])
+
+        self.assertEqual(resultado['agregados'], 1)
+        self.assertNotIn({'categoria': {'$in': ['muros']}}, [llamada.kwargs.get('where') for llamada in get.call_args_list])
+        self.assertEqual(
+            sorted(self.vectorstore.get(include=[])['ids']),
+            sorted([embeddings_processor.id_documento('muros', 'muro.md'), 'otro'])
+        )
+
+    def test_los_documentos_sin_cambios_no_se_vuelven_a_embeber(self):
+        embeddings_processor.ingerir_documentos([self._documento('muro.md')])
+        self.embeddings.llamadas.clear()
+
+        resultado = embeddings_processor.ingerir_documentos([
+            self._documento('muro.md'), self._documento('nuevo.md', 'Muro de hormigón')
+        ])
+
+        self.assertEqual((resultado['agregados'], resultado['actualizados'], resultado['omitidos']), (1, 0, 1))
+        self.assertEqual(self.embeddings.llamadas, [['Muro de hormigón']])
+
+
+class EmbeberConsultasTests(TestCase):
+    def setUp(self):
+        self.embeddings = EmbeddingsFalsos()
+
+    def test_primera_consulta_embebe_los_textos_en_una_llamada(self):
+        vectores = embeber_consultas(['tubería', 'válvula', 'tubería'], embeddings=self.embeddings)
+
+        self.assertEqual(self.embeddings.llamadas, [['tubería', 'válvula']])
+        self.assertEqual(vectores[0], vectores[2])
+        self.assertEqual(len(vectores), 3)
+        self.assertEqual(EmbeddingCache.objects.filter(modelo='modelo-falso').count(), 2)
+
+    def test_segunda_consulta_no_llama_al_modelo(self):
+        primeros = embeber_consultas(['tubería', 'válvula'], embeddings=self.embeddings)
+        self.embeddings.llamadas.clear()
+
+        segundos = embeber_consultas(['válvula', 'tubería'], embeddings=self.embeddings)
+
+        self.assertEqual(self.embeddings.llamadas, [])
+        self.assertEqual(segundos, [primeros[1], primeros[0]])
+
+    def test_solo_se_embeben_los_textos_faltantes(self):
+        embeber_consultas(['tubería'], embeddings=self.embeddings)
+        self.embeddings.llamadas.clear()
+
+        embeber_consultas(['tubería', 'bomba'], embeddings=self.embeddings)
+
+        self.assertEqual(self.embeddings.llamadas, [['bomba']])
+
+
+class TrabajoIngestaTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        carpeta = os.path.join(self.media.name, 'Markdowns', 'muros')
+        os.makedirs(carpeta)
+        for i in range(3):
+            with open(os.path.join(carpeta, f'muro_{i}.md'), 'w', encoding='utf-8') as f:
+                f.write(f'## Muro {i}\n\n### Descripción\nMuro de ladrillo {i}.\n')
+
+    def test_lee_los_archivos_en_el_worker_y_registra_el_progreso(self):
+        lotes = []
+
+        def ingerir(lote):
+            lotes.append([doc['nombre_archivo'] for doc in lote])
+            return {'agregados': len(lote), 'actualizados': 0, 'omitidos': 0, 'tokens': 10}
+
+        with override_settings(MEDIA_ROOT=self.media.name), \
+                mock.patch('embeddings.utils.embeddings_processor.ingerir_documentos', side_effect=ingerir):
+            trabajo = encolar_ingesta('muros', ['muro_0.md', 'muro_1.md', 'muro_2.md', 'falta.md'])
+            self.assertTrue(ejecutar_trabajo(trabajo.pk))
+
+        trabajo.refresh_from_db()
+        self.assertEqual(lotes, [['muro_0.md', 'muro_1.md', 'muro_2.md']])
+        self.assertEqual(trabajo.estado, TrabajoIngesta.ESTADO_COMPLETADO)
+        self.assertEqual(trabajo.documentos_procesados, 4)
+        self.assertEqual(trabajo.agregados, 3)
+        self.assertEqual(trabajo.tokens_usados, 10)
+        self.assertEqual([error['archivos'] for error in trabajo.errores], [['falta.md']])
+
+    def test_un_error_fuera_de_los_lotes_deja_el_trabajo_como_error(self):
+        with override_settings(MEDIA_ROOT=self.media.name), \
+                mock.patch('embeddings.utils.trabajos.parsear_markdown', side_effect=ValueError('Markdown inválido')), \
+                mock.patch('embeddings.utils.embeddings_processor.ingerir_documentos') as ingerir:
+            trabajo = encolar_ingesta('muros', ['muro_0.md', 'muro_1.md'])
+            self.assertEqual(cola_ingestas.procesar_pendientes(), 1)
+
+        trabajo.refresh_from_db()
+        ingerir.assert_not_called()
+        self.assertEqual(trabajo.estado, TrabajoIngesta.ESTADO_ERROR)
+        self.assertTrue(trabajo.finalizado)
+        self.assertEqual(trabajo.errores, [{'archivos': [], 'error': 'Markdown inválido'}])
+
+
+class DocumentoMarkdownTests(TestCase):
+    TEXTO = (
+        "## Muro de ladrillo\n\n"
+        "### Parámetros Técnicos\n"
+        "| Parámetro | Opciones | Defecto |\n"
+        "|---|---|---|\n"
+        "| Espesor | 12 cm, 18 cm | 18 cm |\n\n"
+        "### Adicionales\n"
+        "- **Revoque**: revoque fino en ambas caras\n"
+    )
+
+    def test_modificar_los_parametros_no_altera_el_documento_en_cache(self):
+        parametros = parsear_markdown(self.TEXTO).parametros_tecnicos
+        parametros[0]['opciones'].append('25 cm')
+        parametros[0]['nombre'] = 'Otro'
+
+        self.assertEqual(parsear_markdown(self.TEXTO).parametros_tecnicos, [
+            {'nombre': 'Espesor', 'opciones': ['12 cm', '18 cm'], 'valor_defecto': '18 cm'}
+        ])
+
+    def test_modificar_los_adicionales_no_altera_el_documento_en_cache(self):
+        parsear_markdown(self.TEXTO).adicionales[0]['descripcion'] = ''
+
+        self.assertEqual(parsear_markdown(self.TEXTO).adicionales, [
+            {'nombre': 'Revoque', 'descripcion': 'revoque fino en ambas caras'}
+        ])
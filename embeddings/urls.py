@@ -7,4 +7,5 @@ app_name = 'embeddings'
 urlpatterns = [
     path("", views.embeddings_view, name="embeddings_view"),
     path('delete/', views.delete_embeddings, name='delete_embeddings'),
+    path('ingesta/<int:trabajo_id>/', views.estado_ingesta, name='estado_ingesta'),
 ] 
\ No newline at end of file
@@ -1,11 +1,20 @@
+import hashlib
 import json
 import os
+import threading
+import uuid
 import numpy as np
-from typing import List, Dict
+import tiktoken
+from typing import List, Dict, Iterable
 from langchain_openai import OpenAIEmbeddings
 from langchain_chroma import Chroma
+from chromadb.api.client import SharedSystemClient
 from langchain_core.documents import Document
 from django.conf import settings
+from django.utils import timezone
+
+from embeddings.models import EmbeddingCache
+from main.utils.cache_lru import registrar_insercion
 
 from rich.console import Console
 console = Console()
@@ -13,9 +22,216 @@ console = Console()
 # Definir la ruta base para la base de datos vectorial
 VECTOR_DB_PATH = os.path.join(settings.BASE_DIR, 'chroma_db')
 
-def listar_embeddings() -> List[Dict]:
+# Modelo de embeddings usado para indexar y consultar la base de datos
+EMBEDDING_MODEL = "text-embedding-ada-002"
+
+# Cantidad máxima de embeddings de consultas guardados en la caché
+EMBEDDING_CACHE_MAX_ENTRADAS = getattr(settings, 'EMBEDDING_CACHE_MAX_ENTRADAS', 5000)
+
+# Cantidad de documentos enviados juntos a la API de embeddings durante la carga
+EMBEDDINGS_TAMANO_LOTE = getattr(settings, 'EMBEDDINGS_TAMANO_LOTE', 50)
+
+# Conexión compartida por proceso (worker) a la base de datos vectorial
+_vectorstore: Chroma = None
+_vectorstore_firma = None
+_vectorstore_lock = threading.Lock()
+
+# Cantidad de embeddings por categoría, junto con la versión de la colección en que se contó
+_conteos_por_categoria: Dict[str, tuple] = {}
+
+
+def _ruta_marca_generacion() -> str:
+    return os.path.join(VECTOR_DB_PATH, '.generacion')
+
+
+def _inodo_base_datos():
+    """Retorna el inodo del archivo SQLite de Chroma, o None si aún no existe."""
+    try:
+        return os.stat(os.path.join(VECTOR_DB_PATH, 'chroma.sqlite3')).st_ino
+    except OSError:
+        return None
+
+
+def _firma_base_datos() -> tuple:
+    """
+    Identifica la base de datos en disco: cambia si chroma_db se reemplaza por
+    otra copia (nuevo inodo) o si se reconstruye con invalidar_vectorstore()
+    (nueva generación), aunque el sistema de archivos reutilice el inodo.
+    """
+    try:
+        with open(_ruta_marca_generacion(), 'r', encoding='utf-8') as f:
+            generacion = f.read().strip()
+    except OSError:
+        generacion = None
+    return (_inodo_base_datos(), generacion)
+
+
+def obtener_vectorstore() -> Chroma:
+    """
+    Retorna la instancia compartida de Chroma, creándola la primera vez que se usa.
+    
+    La instancia se reutiliza en todas las llamadas del mismo proceso, evitando
+    reabrir la base de datos SQLite y el cliente de OpenAI en cada consulta.
+    Si la base de datos fue reemplazada o reconstruida (en este u otro worker),
+    la instancia se recarga automáticamente.
+    
+    Returns:
+        Chroma: Base de datos vectorial compartida
+    """
+    global _vectorstore, _vectorstore_firma
+    
+    firma = _firma_base_datos()
+    if _vectorstore is not None and firma == _vectorstore_firma:
+        return _vectorstore
+    
+    with _vectorstore_lock:
+        # Verificar nuevamente dentro del lock por si otro hilo ya la recargó
+        firma = _firma_base_datos()
+        if _vectorstore is None or _vectorstore_firma != firma:
+            # chromadb comparte un sistema por ruta: quitar solo el de esta ruta para
+            # abrir el archivo nuevo. Los hilos que aún usan la instancia anterior
+            # conservan su propia referencia al sistema anterior.
+            SharedSystemClient._identifier_to_system.pop(VECTOR_DB_PATH, None)
+            os.makedirs(VECTOR_DB_PATH, exist_ok=True)
+            _vectorstore = Chroma(
+                persist_directory=VECTOR_DB_PATH,
+                embedding_function=OpenAIEmbeddings(model=EMBEDDING_MODEL)
+            )
+            _vectorstore_firma = _firma_base_datos()
+        return _vectorstore
+
+
+def invalidar_vectorstore() -> None:
+    """
+    Registra una nueva generación de la base de datos y descarta la instancia
+    compartida, para que este y los demás workers la recarguen en su próximo uso.
+    
+    Debe llamarse cuando la base de datos se reconstruye desde cero.
+    """
+    global _vectorstore, _vectorstore_firma
+    
+    with _vectorstore_lock:
+        try:
+            os.makedirs(VECTOR_DB_PATH, exist_ok=True)
+            with open(_ruta_marca_generacion(), 'w', encoding='utf-8') as f:
+                f.write(uuid.uuid4().hex)
+        except OSError as e:
+            console.print(f"[red]Error al registrar la nueva generación de la base de datos: {str(e)}[/red]")
+        _vectorstore = None
+        _vectorstore_firma = None
+
+
+def vaciar_vectorstore() -> int:
     """
-    Lista todos los embeddings existentes en la base de datos.
+    Elimina todos los embeddings, reconstruyendo la colección vacía.
+    
+    Returns:
+        int: Cantidad de embeddings eliminados
+    """
+    vectorstore = obtener_vectorstore()
+    cantidad = vectorstore._collection.count()
+    vectorstore.reset_collection()
+    invalidar_vectorstore()
+    marcar_coleccion_modificada()
+    return cantidad
+
+
+def _clave_cache(texto: str, modelo: str) -> str:
+    return hashlib.sha256(f"{modelo}\n{texto}".encode('utf-8')).hexdigest()
+
+
+def embeber_consultas(textos: List[str], embeddings=None) -> List[List[float]]:
+    """
+    Obtiene los embeddings de varias consultas usando una caché persistente.
+    
+    Los textos que no están en caché se envían juntos en una sola llamada a
+    embed_documents; el resto se resuelve sin acceder a la red.
+    
+    Args:
+        textos: Lista de textos a embeber
+        embeddings: Modelo de embeddings a usar (por defecto, el de la base de datos compartida)
+        
+    Returns:
+        List[List[float]]: Vectores en el mismo orden que los textos
+    """
+    if embeddings is None:
+        embeddings = obtener_vectorstore().embeddings
+    modelo = getattr(embeddings, 'model', EMBEDDING_MODEL)
+    
+    claves = [_clave_cache(texto, modelo) for texto in textos]
+    en_cache = {
+        entrada.clave: entrada.vector
+        for entrada in EmbeddingCache.objects.filter(clave__in=set(claves))
+    }
+    if en_cache:
+        EmbeddingCache.objects.filter(clave__in=en_cache.keys()).update(ultimo_uso=timezone.now())
+    
+    # Embeber una sola vez cada texto faltante, en una única llamada
+    faltantes = {}
+    for clave, texto in zip(claves, textos):
+        if clave not in en_cache and clave not in faltantes:
+            faltantes[clave] = texto
+    
+    if faltantes:
+        vectores = embeddings.embed_documents(list(faltantes.values()))
+        nuevos = dict(zip(faltantes.keys(), vectores))
+        EmbeddingCache.objects.bulk_create(
+            [EmbeddingCache(clave=clave, modelo=modelo, vector=list(vector)) for clave, vector in nuevos.items()],
+            ignore_conflicts=True
+        )
+        en_cache.update(nuevos)
+        registrar_insercion(EmbeddingCache, EMBEDDING_CACHE_MAX_ENTRADAS, campo_uso='ultimo_uso', cantidad=len(nuevos))
+    
+    return [en_cache[clave] for clave in claves]
+
+
+def _ruta_marca_version() -> str:
+    return os.path.join(VECTOR_DB_PATH, '.version')
+
+
+def marcar_coleccion_modificada() -> None:
+    """
+    Registra que la colección cambió, para que los índices en memoria derivados
+    de ella (de este u otros workers) se reconstruyan en su próximo uso.
+    """
+    try:
+        os.makedirs(VECTOR_DB_PATH, exist_ok=True)
+        with open(_ruta_marca_version(), 'a'):
+            pass
+        os.utime(_ruta_marca_version(), None)
+    except OSError as e:
+        console.print(f"[red]Error al marcar la colección como modificada: {str(e)}[/red]")
+
+
+def version_coleccion() -> tuple:
+    """
+    Retorna un identificador de la versión actual de la colección.
+    
+    Cambia cada vez que se llama a marcar_coleccion_modificada() o cuando la
+    base de datos se reemplaza o reconstruye.
+    
+    Returns:
+        tuple: (firma de la base de datos, marca de tiempo de la última modificación)
+    """
+    try:
+        marca = os.stat(_ruta_marca_version()).st_mtime_ns
+    except OSError:
+        marca = None
+    return (_firma_base_datos(), marca)
+
+
+def _filtro_categoria(categoria: str = None):
+    return {'categoria': categoria} if categoria else None
+
+
+def listar_embeddings(limit: int = None, offset: int = 0, categoria: str = None) -> List[Dict]:
+    """
+    Lista los embeddings existentes en la base de datos, leyendo solo sus metadatos.
+    
+    Args:
+        limit: Cantidad máxima de documentos a retornar (todos si es None)
+        offset: Cantidad de documentos a saltar
+        categoria: Si se indica, solo se listan los documentos de esa categoría
     
     Returns:
         List[Dict]: Lista de documentos con sus metadatos
@@ -26,25 +242,19 @@ def listar_embeddings() -> List[Dict]:
             console.print(f"[yellow]El directorio {VECTOR_DB_PATH} no existe[/yellow]")
             return []
             
-        # Inicializar embeddings
-        embeddings = OpenAIEmbeddings(
-            model="text-embedding-ada-002"
-        )
+        # Obtener la base de datos compartida
+        vectorstore = obtener_vectorstore()
         
-        # Cargar la base de datos existente
-        vectorstore = Chroma(
-            persist_directory=VECTOR_DB_PATH,
-            embedding_function=embeddings
+        # Obtener la página de documentos, sin textos ni vectores
+        docs = vectorstore.get(
+            where=_filtro_categoria(categoria),
+            limit=limit,
+            offset=offset,
+            include=['metadatas']
         )
         
-        # Obtener todos los documentos
-        docs = vectorstore.get()
-        
         if not docs or not docs['ids']:
-            console.print("[yellow]No se encontraron documentos en la base de datos[/yellow]")
             return []
-            
-        console.print(f"[green]Documentos encontrados: {len(docs['ids'])}[/green]")
         
         # Formatear resultados
         resultados = []
@@ -62,13 +272,98 @@ def listar_embeddings() -> List[Dict]:
                 console.print(f"[red]Error al procesar documento {i}: {str(e)}[/red]")
                 continue
         
-        console.print(f"[green]Resultados formateados: {len(resultados)}[/green]")
         return resultados
         
     except Exception as e:
         console.print(f"[red]Error al listar embeddings: {str(e)}[/red]")
         return []
 
+def contar_embeddings(categoria: str = None) -> int:
+    """
+    Cuenta los embeddings de la base de datos, opcionalmente filtrados por categoría.
+    
+    Args:
+        categoria: Si se indica, solo se cuentan los documentos de esa categoría
+    
+    Returns:
+        int: Cantidad de documentos
+    """
+    try:
+        if not os.path.exists(VECTOR_DB_PATH):
+            return 0
+        
+        vectorstore = obtener_vectorstore()
+        if not categoria:
+            return vectorstore._collection.count()
+        
+        # Chroma no cuenta con filtro: los IDs se traen una sola vez por versión de la colección
+        version = version_coleccion()
+        conteo = _conteos_por_categoria.get(categoria)
+        if conteo is not None and conteo[0] == version:
+            return conteo[1]
+        cantidad = len(vectorstore.get(where=_filtro_categoria(categoria), include=[])['ids'])
+        _conteos_por_categoria[categoria] = (version, cantidad)
+        return cantidad
+    except Exception as e:
+        console.print(f"[red]Error al contar embeddings: {str(e)}[/red]")
+        return 0
+
+class ListadoEmbeddings:
+    """
+    Secuencia perezosa de embeddings para usar con django.core.paginator.Paginator.
+    
+    Solo consulta la base de datos para contar y para obtener la página solicitada.
+    """
+    
+    def __init__(self, categoria: str = None):
+        self.categoria = categoria
+    
+    def count(self) -> int:
+        return contar_embeddings(self.categoria)
+    
+    def __len__(self):
+        return self.count()
+    
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            inicio = item.start or 0
+            limite = None if item.stop is None else max(item.stop - inicio, 0)
+            if limite == 0:
+                return []
+            return listar_embeddings(limit=limite, offset=inicio, categoria=self.categoria)
+        return listar_embeddings(limit=1, offset=item, categoria=self.categoria)[0]
+
+def borrar_embeddings(embedding_ids: List[str]) -> Dict[str, bool]:
+    """
+    Borra varios embeddings de la base de datos en una sola operación.
+    
+    Args:
+        embedding_ids: IDs de los embeddings a borrar
+        
+    Returns:
+        Dict[str, bool]: Para cada ID, True si se borró y False si no existía o hubo un error
+    """
+    ids = list(dict.fromkeys(embedding_ids))
+    if not ids:
+        return {}
+    
+    try:
+        # Obtener la base de datos compartida
+        vectorstore = obtener_vectorstore()
+        
+        # Verificar cuáles existen (sin traer documentos ni vectores)
+        existentes = set(vectorstore.get(ids=ids, include=[])['ids'])
+        
+        # Borrar todos los documentos existentes de una vez
+        if existentes:
+            vectorstore.delete(list(existentes))
+            marcar_coleccion_modificada()
+        
+        return {embedding_id: embedding_id in existentes for embedding_id in ids}
+    except Exception as e:
+        console.print(f"[red]Error al borrar embeddings: {str(e)}[/red]")
+        return {embedding_id: False for embedding_id in ids}
+
 def borrar_embedding(embedding_id: str) -> bool:
     """
     Borra un embedding específico de la base de datos.
@@ -79,27 +374,174 @@ def borrar_embedding(embedding_id: str) -> bool:
     Returns:
         bool: True si se borró correctamente, False en caso contrario
     """
-    try:
-        # Inicializar embeddings
-        embeddings = OpenAIEmbeddings(
-            model="text-embedding-ada-002"
-        )
+    return borrar_embeddings([embedding_id]).get(embedding_id, False)
+
+def id_documento(categoria: str, nombre_archivo: str) -> str:
+    """
+    Genera el ID estable de un documento a partir de su categoría y nombre de archivo,
+    de modo que volver a subir el mismo archivo actualice el mismo registro.
+    """
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{categoria}/{nombre_archivo}"))
+
+
+_codificador_tokens = None
+
+
+def contar_tokens(texto: str) -> int:
+    """Cuenta los tokens que consume un texto en el modelo de embeddings."""
+    global _codificador_tokens
+    
+    if _codificador_tokens is None:
+        _codificador_tokens = tiktoken.encoding_for_model(EMBEDDING_MODEL)
+    return len(_codificador_tokens.encode(texto))
+
+
+def hash_contenido(texto: str) -> str:
+    """Retorna el hash SHA-256 del texto usado para generar el embedding."""
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+def ingerir_documentos(datos: List[Dict]) -> Dict[str, int]:
+    """
+    Agrega o actualiza documentos en la base de datos vectorial de forma idempotente.
+    
+    Cada documento usa un ID derivado de su categoría y nombre de archivo, y guarda
+    el hash de su texto. Solo se generan embeddings para los documentos nuevos o
+    cuyo texto cambió; los registros duplicados de cargas anteriores se eliminan.
+    
+    Args:
+        datos: Lista de diccionarios con titulo, descripcion, texto_para_embedding,
+            nombre_archivo y categoria
         
-        # Cargar la base de datos existente
-        vectorstore = Chroma(
-            persist_directory=VECTOR_DB_PATH,
-            embedding_function=embeddings
-        )
+    Returns:
+        Dict[str, int]: Cantidad de documentos agregados, actualizados y omitidos,
+            y tokens enviados a la API de embeddings
+    """
+    resultado = {'agregados': 0, 'actualizados': 0, 'omitidos': 0, 'tokens': 0}
+    
+    # Preparar documentos para ChromaDB (el último con el mismo ID prevalece)
+    documentos: Dict[str, Document] = {}
+    for item in datos:
+        # Validar que los campos requeridos existan
+        if not all(key in item for key in ['texto_para_embedding', 'titulo', 'nombre_archivo']):
+            console.print(f"[red]Error: Faltan campos requeridos en el documento: {item}[/red]")
+            continue
         
-        # Borrar el documento
-        vectorstore.delete([embedding_id])
+        categoria = item.get('categoria', '')
+        # Crear documento con el texto para embedding y metadatos
+        documentos[id_documento(categoria, item['nombre_archivo'])] = Document(
+            page_content=item['texto_para_embedding'],
+            metadata={
+                'titulo': item['titulo'],
+                'nombre_archivo': item['nombre_archivo'],
+                'descripcion': item.get('descripcion', ''),
+                'categoria': categoria,
+                'hash_contenido': hash_contenido(item['texto_para_embedding'])
+            }
+        )
+    
+    if not documentos:
+        return resultado
+    
+    vectorstore = obtener_vectorstore()
+    
+    # Registros existentes de los documentos del lote (solo metadatos)
+    existentes = vectorstore.get(ids=list(documentos), include=['metadatas'])
+    hashes_existentes = {
+        doc_id: metadata.get('hash_contenido')
+        for doc_id, metadata in zip(existentes['ids'], existentes['metadatas'])
+    }
+    
+    # Registros de cargas anteriores sin ID estable para los mismos archivos
+    nombres = sorted({doc.metadata['nombre_archivo'] for doc in documentos.values()})
+    anteriores = vectorstore.get(
+        where={'nombre_archivo': {'$in': nombres}},
+        include=['metadatas']
+    )
+    duplicados = [
+        doc_id
+        for doc_id, metadata in zip(anteriores['ids'], anteriores['metadatas'])
+        if doc_id not in documentos
+        and id_documento(metadata.get('categoria', ''), metadata.get('nombre_archivo', '')) in documentos
+    ]
+    
+    ids_a_guardar = []
+    for doc_id, doc in documentos.items():
+        if doc_id not in hashes_existentes:
+            resultado['agregados'] += 1
+        elif hashes_existentes[doc_id] != doc.metadata['hash_contenido']:
+            resultado['actualizados'] += 1
+        else:
+            resultado['omitidos'] += 1
+            continue
+        ids_a_guardar.append(doc_id)
+    
+    if duplicados:
+        console.print(f"[yellow]Eliminando {len(duplicados)} registros duplicados[/yellow]")
+        vectorstore.delete(duplicados)
+    
+    if ids_a_guardar:
+        # add_documents hace upsert cuando se indican los IDs
+        a_guardar = [documentos[doc_id] for doc_id in ids_a_guardar]
+        vectorstore.add_documents(a_guardar, ids=ids_a_guardar)
+        resultado['tokens'] = sum(contar_tokens(doc.page_content) for doc in a_guardar)
+    
+    if ids_a_guardar or duplicados:
+        marcar_coleccion_modificada()
+    
+    return resultado
+
+
+def ingerir_en_lotes(datos: Iterable[Dict], tamano_lote: int = EMBEDDINGS_TAMANO_LOTE,
+                     al_procesar_lote=None, al_fallar_lote=None) -> Dict[str, int]:
+    """
+    Ingiere documentos a medida que se producen, en lotes de tamaño acotado.
+    
+    Permite consumir un generador sin acumular todos los documentos en memoria:
+    cada lote se envía a ingerir_documentos apenas se completa.
+    
+    Args:
+        datos: Iterable de diccionarios con los datos estructurados de cada documento
+        tamano_lote: Cantidad máxima de documentos por lote
+        al_procesar_lote: Función opcional que recibe cada lote y su resultado,
+            útil para informar el progreso
+        al_fallar_lote: Función opcional que recibe cada lote y la excepción que
+            produjo; si se indica, un lote fallido no detiene la carga de los siguientes
         
-        return True
-    except Exception as e:
-        console.print(f"[red]Error al borrar embedding: {str(e)}[/red]")
-        return False
+    Returns:
+        Dict[str, int]: Cantidad total de documentos agregados, actualizados y omitidos,
+            y tokens enviados a la API de embeddings
+    """
+    resultado = {'agregados': 0, 'actualizados': 0, 'omitidos': 0, 'tokens': 0}
+    lote = []
+    
+    def _ingerir_lote():
+        try:
+            resultado_lote = ingerir_documentos(lote)
+        except Exception as e:
+            if al_fallar_lote is None:
+                raise
+            console.print(f"[red]Error en el lote de {len(lote)} documentos: {str(e)}[/red]")
+            al_fallar_lote(lote, e)
+            return
+        for clave, cantidad in resultado_lote.items():
+            resultado[clave] += cantidad
+        console.print(f"[green]Lote de {len(lote)} documentos procesado[/green]")
+        if al_procesar_lote is not None:
+            al_procesar_lote(lote, resultado_lote)
+    
+    for item in datos:
+        lote.append(item)
+        if len(lote) >= tamano_lote:
+            _ingerir_lote()
+            lote = []
+    if lote:
+        _ingerir_lote()
+    
+    return resultado
+
 
-def procesar_embeddings(json_path: str) -> str:
+def procesar_embeddings(json_path: str) -> Dict[str, int]:
     """
     Procesa los archivos JSON y crea embeddings usando LangChain y ChromaDB.
     
@@ -107,60 +549,31 @@ def procesar_embeddings(json_path: str) -> str:
         json_path: Ruta al archivo JSON con los datos estructurados
         
     Returns:
-        str: Ruta a la base de datos de Chroma
+        Dict[str, int]: Cantidad de documentos agregados, actualizados y omitidos, y tokens
+            usados, o un diccionario vacío si ocurrió un error
     """
     try:
-        # Inicializar el modelo de embeddings
-        embeddings = OpenAIEmbeddings(
-            model="text-embedding-ada-002"
-        )
-        
         # Cargar datos del JSON
         with open(json_path, 'r', encoding='utf-8') as f:
             datos = json.load(f)
         
-        # Preparar documentos para ChromaDB
-        documentos: List[Document] = []
-        for item in datos:
-            # Validar que los campos requeridos existan
-            if not all(key in item for key in ['texto_para_embedding', 'titulo', 'nombre_archivo']):
-                console.print(f"[red]Error: Faltan campos requeridos en el documento: {item}[/red]")
-                continue
-                
-            # Crear documento con el texto para embedding y metadatos
-            doc = Document(
-                page_content=item['texto_para_embedding'],
-                metadata={
-                    'titulo': item['titulo'],
-                    'nombre_archivo': item['nombre_archivo'],
-                    'descripcion': item.get('descripcion', ''),
-                    'categoria': item.get('categoria', '')
-                }
-            )
-            documentos.append(doc)
+        console.print(f"[green]Procesando {len(datos)} documentos...[/green]")
         
-        if not documentos:
-            console.print("[red]No se pudieron procesar documentos válidos[/red]")
-            return ""
-            
-        console.print(f"[green]Procesando {len(documentos)} documentos...[/green]")
+        resultado = ingerir_en_lotes(datos)
         
-        # Crear directorio para la base de datos si no existe
-        os.makedirs(VECTOR_DB_PATH, exist_ok=True)
+        if not (resultado['agregados'] or resultado['actualizados'] or resultado['omitidos']):
+            console.print("[red]No se pudieron procesar documentos válidos[/red]")
+            return {}
         
-        # Crear la base de datos de vectores (la persistencia es automática)
-        vectorstore = Chroma.from_documents(
-            documents=documentos,
-            embedding=embeddings,
-            persist_directory=VECTOR_DB_PATH
+        console.print(
+            f"[green]Embeddings procesados: {resultado['agregados']} agregados, "
+            f"{resultado['actualizados']} actualizados, {resultado['omitidos']} sin cambios[/green]"
         )
-        
-        console.print("[green]Embeddings creados exitosamente[/green]")
-        return VECTOR_DB_PATH
+        return resultado
         
     except Exception as e:
         console.print(f"[red]Error al procesar embeddings: {str(e)}[/red]")
-        return ""
+        return {}
 
 def buscar_similares(query: str, n_results: int = 5) -> List[Dict]:
     """
@@ -173,16 +586,8 @@ def buscar_similares(query: str, n_results: int = 5) -> List[Dict]:
     Returns:
         List[Dict]: Lista de documentos similares con sus metadatos
     """
-    # Inicializar embeddings
-    embeddings = OpenAIEmbeddings(
-        model="text-embedding-ada-002"
-    )
-    
-    # Cargar la base de datos existente
-    vectorstore = Chroma(
-        persist_directory=VECTOR_DB_PATH,
-        embedding_function=embeddings
-    )
+    # Obtener la base de datos compartida
+    vectorstore = obtener_vectorstore()
     
     # Realizar la búsqueda
     docs = vectorstore.similarity_search_with_score(query, k=n_results)
@@ -211,16 +616,8 @@ def obtener_vector_embedding(embedding_id: str) -> Dict:
         Dict: Diccionario con la información del vector
     """
     try:
-        # Inicializar embeddings
-        embeddings = OpenAIEmbeddings(
-            model="text-embedding-ada-002"
-        )
-        
-        # Cargar la base de datos existente
-        vectorstore = Chroma(
-            persist_directory=VECTOR_DB_PATH,
-            embedding_function=embeddings
-        )
+        # Obtener la base de datos compartida
+        vectorstore = obtener_vectorstore()
         
         # Obtener el documento específico con su embedding
         docs = vectorstore.get(
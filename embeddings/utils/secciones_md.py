@@ -0,0 +1,229 @@
+"""
+Parser de secciones para las especificaciones técnicas en Markdown.
+
+Recorre el documento una sola vez para ubicar los encabezados de nivel 2 y 3
+(título, Descripción, Parámetros Técnicos, Adicionales, Procedimiento, ...) y
+guarda el resultado en una caché por hash de contenido, de modo que todas las
+funciones que extraen partes de una especificación comparten el mismo análisis.
+"""
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Dict, List, Optional, Tuple
+
+# Encabezados "## Título" y "### Sección" (no "####")
+_RE_ENCABEZADO = re.compile(r"^(#{2,3})(?!#)[ \t]*(\S.*?)[ \t]*$", re.MULTILINE)
+# Línea de adicional: "- **Nombre**: descripción"
+_RE_ADICIONAL = re.compile(r"\*\*(.*?)\*\*:\s*(.*)")
+
+# Cantidad máxima de documentos analizados que se mantienen en memoria
+MAX_DOCUMENTOS_EN_CACHE = 512
+
+
+def normalizar_nombre(texto: str) -> str:
+    """Nombre comparable de una sección: texto hasta el primer punto, sin mayúsculas."""
+    return texto.split(".", 1)[0].strip().casefold()
+
+
+@dataclass
+class Seccion:
+    titulo: str
+    nivel: int
+    inicio: int
+    inicio_contenido: int
+    fin: int
+    nombre: str = field(init=False)
+
+    def __post_init__(self):
+        self.nombre = normalizar_nombre(self.titulo)
+
+
+class DocumentoMarkdown:
+    """Árbol de secciones de una especificación Markdown."""
+
+    def __init__(self, texto: str):
+        self.texto = texto
+        self.secciones: List[Seccion] = []
+
+        encabezados = list(_RE_ENCABEZADO.finditer(texto))
+        for i, match in enumerate(encabezados):
+            fin = encabezados[i + 1].start() if i + 1 < len(encabezados) else len(texto)
+            salto = texto.find("\n", match.end())
+            inicio_contenido = min(salto + 1, fin) if salto != -1 else fin
+            self.secciones.append(Seccion(
+                titulo=match.group(2),
+                nivel=len(match.group(1)),
+                inicio=match.start(),
+                inicio_contenido=inicio_contenido,
+                fin=fin,
+            ))
+
+    def seccion(self, nombre: str, prefijo: bool = False) -> Optional[Seccion]:
+        """
+        Busca la primera sección con el nombre indicado (sin distinguir mayúsculas
+        ni el punto final). Con prefijo=True basta con que el nombre empiece así.
+        """
+        buscado = normalizar_nombre(nombre)
+        for seccion in self.secciones:
+            if seccion.nombre == buscado or (prefijo and seccion.nombre.startswith(buscado)):
+                return seccion
+        return None
+
+    def contenido(self, nombre: str, prefijo: bool = False) -> str:
+        seccion = self.seccion(nombre, prefijo)
+        return self.texto[seccion.inicio_contenido:seccion.fin] if seccion else ""
+
+    def texto_antes_de(self, nombre: str, prefijo: bool = False) -> str:
+        """Texto del documento anterior a la sección indicada (o completo si no existe)."""
+        seccion = self.seccion(nombre, prefijo)
+        return self.texto[:seccion.inicio] if seccion else self.texto
+
+    @cached_property
+    def titulo(self) -> str:
+        for seccion in self.secciones:
+            if seccion.nivel == 2:
+                return seccion.titulo
+        return self.secciones[0].titulo if self.secciones else ""
+
+    @cached_property
+    def descripcion(self) -> str:
+        return self.contenido("Descripción").strip().replace("\n", " ")
+
+    @cached_property
+    def _filas_parametros(self) -> Tuple[Tuple[str, Tuple[str, ...], Optional[str]], ...]:
+        tabla = self.contenido("Parámetros Técnicos")
+        if not tabla.strip():
+            return ()
+
+        filas = []
+        for linea in tabla.strip().split("\n")[2:]:
+            if linea.strip():
+                columnas = [col.strip() for col in linea.split("|") if col.strip()]
+                if len(columnas) >= 2:
+                    filas.append((
+                        columnas[0],
+                        tuple(columnas[1].split(", ")),
+                        columnas[2] if len(columnas) > 2 else None
+                    ))
+        return tuple(filas)
+
+    @cached_property
+    def _filas_adicionales(self) -> Tuple[Tuple[str, str], ...]:
+        filas = []
+        for linea in self.contenido("Adicionales").strip().split("\n"):
+            match = _RE_ADICIONAL.search(linea)
+            if match:
+                filas.append((match.group(1).strip(), match.group(2).strip()))
+        return tuple(filas)
+
+    @property
+    def parametros_tecnicos(self) -> List[Dict]:
+        """
+        Filas de la tabla de Parámetros Técnicos (sin encabezado ni separador).
+        Cada llamada retorna listas nuevas, así modificarlas no altera el documento en caché.
+        """
+        return [
+            {"nombre": nombre, "opciones": list(opciones), "valor_defecto": valor_defecto}
+            for nombre, opciones, valor_defecto in self._filas_parametros
+        ]
+
+    @property
+    def adicionales(self) -> List[Dict]:
+        """
+        Actividades de la sección Adicionales con formato "**Nombre**: descripción".
+        Cada llamada retorna diccionarios nuevos, como parametros_tecnicos.
+        """
+        return [
+            {"nombre": nombre, "descripcion": descripcion}
+            for nombre, descripcion in self._filas_adicionales
+        ]
+
+
+_cache: "OrderedDict[str, DocumentoMarkdown]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def hash_markdown(texto: str) -> str:
+    return hashlib.blake2b(texto.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def parsear_markdown(texto: str) -> DocumentoMarkdown:
+    """
+    Retorna el árbol de secciones del texto, reutilizando el análisis previo
+    si el mismo contenido ya fue procesado.
+    """
+    clave = hash_markdown(texto)
+    with _cache_lock:
+        documento = _cache.get(clave)
+        if documento is not None:
+            _cache.move_to_end(clave)
+            return documento
+
+    documento = DocumentoMarkdown(texto)
+
+    with _cache_lock:
+        _cache[clave] = documento
+        if len(_cache) > MAX_DOCUMENTOS_EN_CACHE:
+            _cache.popitem(last=False)
+    return documento
+
+
+# Documentos base (MEDIA_ROOT/Markdowns/<categoria>/<archivo>) ya analizados,
+# por (categoria, nombre_archivo), junto con la versión del archivo en disco
+_documentos_base: Dict[tuple, tuple] = {}
+_documentos_base_lock = threading.Lock()
+
+
+def ruta_documento_base(categoria: str, nombre_archivo: str) -> str:
+    from django.conf import settings
+    return os.path.join(settings.MEDIA_ROOT, 'Markdowns', categoria, nombre_archivo)
+
+
+def _version_archivo(ruta: str) -> tuple:
+    info = os.stat(ruta)
+    return (info.st_mtime_ns, info.st_size)
+
+
+def obtener_documento_base(categoria: str, nombre_archivo: str) -> DocumentoMarkdown:
+    """
+    Retorna el documento base analizado. Solo se vuelve a leer del disco si el
+    archivo cambió (fecha de modificación o tamaño) desde la última lectura.
+
+    Raises:
+        OSError: Si el archivo no existe o no se puede leer
+    """
+    ruta = ruta_documento_base(categoria, nombre_archivo)
+    version = _version_archivo(ruta)
+    clave = (categoria, nombre_archivo)
+
+    with _documentos_base_lock:
+        en_cache = _documentos_base.get(clave)
+    if en_cache is not None and en_cache[0] == version:
+        return en_cache[1]
+
+    with open(ruta, 'r', encoding='utf-8') as f:
+        documento = parsear_markdown(f.read())
+
+    with _documentos_base_lock:
+        _documentos_base[clave] = (version, documento)
+    return documento
+
+
+def precargar_documento_base(categoria: str, nombre_archivo: str, contenido: str) -> DocumentoMarkdown:
+    """
+    Registra en la caché un documento base recién guardado en disco, para que los
+    pasos 3 y 4 del asistente no tengan que leerlo ni analizarlo de nuevo.
+    """
+    documento = parsear_markdown(contenido)
+    # Pre-calcular las secciones que consultan los pasos 3 y 4
+    documento._filas_parametros
+    documento._filas_adicionales
+
+    version = _version_archivo(ruta_documento_base(categoria, nombre_archivo))
+    with _documentos_base_lock:
+        _documentos_base[(categoria, nombre_archivo)] = (version, documento)
+    return documento
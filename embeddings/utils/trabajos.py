@@ -0,0 +1,190 @@
+import json
+from typing import Dict, Iterable, Iterator, List
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from embeddings.models import TrabajoIngesta
+from embeddings.utils.embeddings_processor import ingerir_en_lotes
+from embeddings.utils.secciones_md import parsear_markdown, precargar_documento_base, ruta_documento_base
+from main.utils.segundo_plano import ColaTrabajos
+
+from rich.console import Console
+console = Console()
+
+# Si es True, los trabajos se ejecutan en un pool de hilos del mismo proceso web.
+# Si es False, quedan pendientes hasta que los procese `python manage.py procesar_ingestas`.
+EMBEDDINGS_INGESTA_EN_SEGUNDO_PLANO = getattr(settings, 'EMBEDDINGS_INGESTA_EN_SEGUNDO_PLANO', True)
+
+# Cantidad de trabajos que se ejecutan en paralelo dentro de cada proceso
+EMBEDDINGS_INGESTA_HILOS = getattr(settings, 'EMBEDDINGS_INGESTA_HILOS', 1)
+
+# Si es True, los datos estructurados de cada carga se guardan en datos_estructurados.json para auditoría
+EMBEDDINGS_JSON_AUDITORIA = getattr(settings, 'EMBEDDINGS_JSON_AUDITORIA', False)
+
+def encolar_ingesta(categoria: str, archivos: List[str], usuario=None) -> TrabajoIngesta:
+    """
+    Crea un trabajo de ingesta y lo envía al pool de hilos (si está habilitado).
+
+    Args:
+        categoria: Categoría de los documentos
+        archivos: Nombres de los archivos ya guardados en MEDIA_ROOT/Markdowns/<categoria>
+        usuario: Usuario que realizó la carga
+
+    Returns:
+        TrabajoIngesta: El trabajo creado
+    """
+    trabajo = TrabajoIngesta.objects.create(
+        categoria=categoria,
+        archivos=archivos,
+        total_documentos=len(archivos),
+        creado_por=usuario if usuario is not None and usuario.is_authenticated else None
+    )
+
+    cola_ingestas.encolar(trabajo.pk)
+    return trabajo
+
+
+def extraer_datos_desde_md(contenido: str):
+    documento = parsear_markdown(contenido)
+
+    titulo = documento.titulo
+    descripcion = documento.descripcion
+    texto_para_embedding = f"{titulo}. {descripcion}"
+    return titulo, descripcion, texto_para_embedding
+
+
+def documentos_desde_archivos(categoria: str, archivos: Iterable[str], al_fallar_archivo=None) -> Iterator[Dict]:
+    """
+    Lee y analiza los archivos de la carga de a uno, generando sus datos
+    estructurados a medida que se consumen.
+
+    Args:
+        categoria: Categoría de los documentos
+        archivos: Nombres de los archivos en MEDIA_ROOT/Markdowns/<categoria>
+        al_fallar_archivo: Función opcional que recibe el nombre del archivo y la
+            excepción si no se pudo leer; el archivo se omite
+    """
+    for nombre_archivo in archivos:
+        try:
+            with open(ruta_documento_base(categoria, nombre_archivo), 'r', encoding='utf-8') as f:
+                contenido = f.read()
+            titulo, descripcion, texto_para_embedding = extraer_datos_desde_md(contenido)
+        except (OSError, UnicodeDecodeError) as e:
+            if al_fallar_archivo is None:
+                raise
+            al_fallar_archivo(nombre_archivo, e)
+            continue
+
+        # Dejar listas las tablas de parámetros y adicionales para el asistente de pliegos
+        precargar_documento_base(categoria, nombre_archivo, contenido)
+
+        yield {
+            "titulo": titulo,
+            "descripcion": descripcion,
+            "texto_para_embedding": texto_para_embedding,
+            "nombre_archivo": nombre_archivo,
+            "categoria": categoria
+        }
+
+
+def _auditar_en_json(documentos, json_output):
+    """Escribe los documentos en un arreglo JSON a medida que pasan, sin acumularlos."""
+    with open(json_output, 'w', encoding='utf-8') as json_file:
+        json_file.write('[\n')
+        for i, documento in enumerate(documentos):
+            if i:
+                json_file.write(',\n')
+            json_file.write(json.dumps(documento, ensure_ascii=False, indent=2))
+            yield documento
+        json_file.write('\n]\n')
+
+
+def ejecutar_trabajo(trabajo_id: int) -> bool:
+    """
+    Ejecuta un trabajo de ingesta pendiente, leyendo los archivos de a uno y
+    actualizando su progreso después de cada lote.
+
+    Args:
+        trabajo_id: ID del trabajo
+
+    Returns:
+        bool: False si el trabajo no estaba pendiente (otro proceso lo tomó), True en caso contrario
+    """
+    if not cola_ingestas.tomar(trabajo_id):
+        return False
+
+    trabajo = TrabajoIngesta.objects.get(pk=trabajo_id)
+    errores = []
+    lotes_correctos = 0
+    console.print(f"[green]Ingesta #{trabajo_id}: procesando {len(trabajo.archivos)} documentos[/green]")
+
+    def al_procesar_lote(lote, resultado):
+        nonlocal lotes_correctos
+        lotes_correctos += 1
+        TrabajoIngesta.objects.filter(pk=trabajo_id).update(
+            documentos_procesados=F('documentos_procesados') + len(lote),
+            agregados=F('agregados') + resultado['agregados'],
+            actualizados=F('actualizados') + resultado['actualizados'],
+            omitidos=F('omitidos') + resultado['omitidos'],
+            tokens_usados=F('tokens_usados') + resultado['tokens'],
+            fecha_actualizacion=timezone.now()
+        )
+
+    def registrar_error(archivos, error, procesados):
+        errores.append({'archivos': archivos, 'error': str(error)})
+        TrabajoIngesta.objects.filter(pk=trabajo_id).update(
+            documentos_procesados=F('documentos_procesados') + procesados,
+            errores=errores,
+            fecha_actualizacion=timezone.now()
+        )
+
+    documentos = documentos_desde_archivos(
+        trabajo.categoria,
+        trabajo.archivos,
+        al_fallar_archivo=lambda nombre, e: registrar_error([nombre], e, 1)
+    )
+    if EMBEDDINGS_JSON_AUDITORIA:
+        json_output = ruta_documento_base(trabajo.categoria, 'datos_estructurados.json')
+        documentos = _auditar_en_json(documentos, json_output)
+
+    ingerir_en_lotes(
+        documentos,
+        al_procesar_lote=al_procesar_lote,
+        al_fallar_lote=lambda lote, e: registrar_error(
+            [doc.get('nombre_archivo', '') for doc in lote], e, len(lote)
+        )
+    )
+
+    # Ningún documento se pudo cargar: marcar el trabajo como error
+    estado = TrabajoIngesta.ESTADO_ERROR if errores and not lotes_correctos else TrabajoIngesta.ESTADO_COMPLETADO
+    TrabajoIngesta.objects.filter(pk=trabajo_id).update(estado=estado, fecha_actualizacion=timezone.now())
+    console.print(f"[green]Ingesta #{trabajo_id}: {estado}[/green]")
+    return True
+
+
+def _campos_error(trabajo_id: int, error: Exception) -> Dict:
+    """Agrega a los errores del trabajo el de la excepción que lo detuvo."""
+    errores = TrabajoIngesta.objects.filter(pk=trabajo_id).values_list('errores', flat=True).first() or []
+    return {'errores': errores + [{'archivos': [], 'error': str(error)}]}
+
+
+# Ingerir dos veces un lote es seguro (los documentos sin cambios se omiten), por
+# eso los trabajos interrumpidos se reencolan desde el principio
+cola_ingestas = ColaTrabajos(
+    TrabajoIngesta,
+    ejecutar_trabajo,
+    hilos=EMBEDDINGS_INGESTA_HILOS,
+    nombre_hilos='ingesta-embeddings',
+    en_segundo_plano=EMBEDDINGS_INGESTA_EN_SEGUNDO_PLANO,
+    reinicio={
+        'documentos_procesados': 0,
+        'agregados': 0,
+        'actualizados': 0,
+        'omitidos': 0,
+        'tokens_usados': 0,
+        'errores': [],
+    },
+    campos_error=_campos_error,
+)
@@ -1,20 +1,47 @@
 import os
-import json
-import re
 from django.conf import settings
-from django.shortcuts import render, redirect
+from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from .forms import EmbeddingsForm
-from .utils.embeddings_processor import procesar_embeddings, listar_embeddings, borrar_embedding
+from django.core.paginator import Paginator
+from django.http import JsonResponse
+from .forms import EmbeddingsForm, CATEGORIAS
+from .models import TrabajoIngesta
+from .utils.embeddings_processor import borrar_embeddings, ListadoEmbeddings
+from .utils.trabajos import encolar_ingesta
 
-def extraer_datos_desde_md(contenido):
-    titulo_match = re.search(r"^##\s*(.+)", contenido, re.MULTILINE)
-    descripcion_match = re.search(r"###\s*Descripción\.\s*\n+(.+?)(?=\n###|\Z)", contenido, re.DOTALL)
+EMBEDDINGS_POR_PAGINA = 50
 
-    titulo = titulo_match.group(1).strip() if titulo_match else ""
-    descripcion = descripcion_match.group(1).strip().replace("\n", " ") if descripcion_match else ""
-    texto_para_embedding = f"{titulo}. {descripcion}"
-    return titulo, descripcion, texto_para_embedding
+def _guardar_archivos(archivos, carpeta_destino):
+    """
+    Guarda cada archivo subido en disco por partes, sin leerlo completo en memoria.
+    El contenido se analiza después, en el trabajo de ingesta.
+    """
+    nombres = []
+    for archivo in archivos:
+        with open(os.path.join(carpeta_destino, archivo.name), 'wb+') as destino:
+            for chunk in archivo.chunks():
+                destino.write(chunk)
+        nombres.append(archivo.name)
+    return nombres
+
+def _contexto_listado(request, form):
+    """Arma el contexto de la página con el listado paginado de embeddings."""
+    categoria = request.GET.get('categoria') or None
+    paginator = Paginator(ListadoEmbeddings(categoria), EMBEDDINGS_POR_PAGINA)
+    page_obj = paginator.get_page(request.GET.get('page'))
+
+    query_params = request.GET.copy()
+    query_params.pop('page', None)
+
+    return {
+        'form': form,
+        'embeddings': page_obj.object_list,
+        'page_obj': page_obj,
+        'base_query': query_params.urlencode(),
+        'categoria': categoria or '',
+        'categorias': sorted(CATEGORIAS, key=lambda x: x[1]),
+        'trabajos': TrabajoIngesta.objects.all()[:5],
+    }
 
 def embeddings_view(request):
     if request.method == 'POST':
@@ -22,85 +49,45 @@ def embeddings_view(request):
             # Manejar borrado múltiple de embeddings
             embedding_ids = request.POST.getlist('borrar_ids')
             if embedding_ids:
-                borrados_exitosos = 0
-                for embedding_id in embedding_ids:
-                    if borrar_embedding(embedding_id):
-                        borrados_exitosos += 1
+                resultados = borrar_embeddings(embedding_ids)
+                borrados_exitosos = sum(resultados.values())
                 
                 if borrados_exitosos > 0:
                     messages.success(request, f'Se borraron {borrados_exitosos} embeddings exitosamente.')
                 else:
                     messages.error(request, 'No se pudo borrar ningún embedding.')
+                if 0 < borrados_exitosos < len(resultados):
+                    messages.warning(request, f'No se pudieron borrar {len(resultados) - borrados_exitosos} embeddings.')
                 
                 return redirect('embeddings:embeddings_view')
             else:
                 messages.warning(request, 'No se seleccionaron embeddings para borrar')
-                return render(request, 'embeddings.html', {
-                    'form': EmbeddingsForm(),
-                    'embeddings': listar_embeddings()
-                })
+                return render(request, 'embeddings.html', _contexto_listado(request, EmbeddingsForm()))
         
         form = EmbeddingsForm(request.POST, request.FILES)
         if form.is_valid():
             archivos = request.FILES.getlist('archivos_md')
             if not archivos:  # Si no hay archivos nuevos, solo mostrar la lista
-                embeddings = listar_embeddings()
-                return render(request, 'embeddings.html', {
-                    'form': form,
-                    'embeddings': embeddings
-                })
+                return render(request, 'embeddings.html', _contexto_listado(request, form))
             categoria = form.cleaned_data['categoria']
-            datos_estructurados = []
             carpeta_destino = os.path.join(settings.MEDIA_ROOT, 'Markdowns', categoria)
             os.makedirs(carpeta_destino, exist_ok=True)
 
-            for archivo in archivos:
-                nombre_archivo = archivo.name
-                ruta_archivo = os.path.join(carpeta_destino, nombre_archivo)
-
-                with open(ruta_archivo, 'wb+') as destino:
-                    for chunk in archivo.chunks():
-                        destino.write(chunk)
-
-                with open(ruta_archivo, 'r', encoding='utf-8') as f:
-                    contenido = f.read()
-                    titulo, descripcion, texto_para_embedding = extraer_datos_desde_md(contenido)
-
-                    datos_estructurados.append({
-                        "titulo": titulo,
-                        "descripcion": descripcion,
-                        "texto_para_embedding": texto_para_embedding,
-                        "nombre_archivo": nombre_archivo,
-                        "categoria": categoria
-                    })
+            nombres = _guardar_archivos(archivos, carpeta_destino)
 
-            # Guardar resultado JSON
-            json_output = os.path.join(settings.MEDIA_ROOT, 'Markdowns', categoria, 'datos_estructurados.json')
-            
-            # Asegurar que el directorio existe
-            os.makedirs(os.path.dirname(json_output), exist_ok=True)
-            
-            with open(json_output, 'w', encoding='utf-8') as json_file:
-                json.dump(datos_estructurados, json_file, ensure_ascii=False, indent=2)
-
-            # Procesar embeddings
-            try:
-                procesar_embeddings(json_output)
-                messages.success(request, f"Procesados {len(datos_estructurados)} archivos exitosamente.")
-            except Exception as e:
-                messages.error(request, f"Error al procesar embeddings: {str(e)}")
+            # Encolar la ingesta; los archivos se analizan y embeben fuera de la solicitud
+            trabajo = encolar_ingesta(categoria, nombres, request.user)
+            messages.success(
+                request,
+                f"Se recibieron {trabajo.total_documentos} archivos. La carga #{trabajo.pk} se está procesando."
+            )
             
             return redirect('embeddings:embeddings_view')
     else:
         form = EmbeddingsForm()
 
-    # Obtener lista de embeddings existentes
-    embeddings = listar_embeddings()
-    
-    return render(request, 'embeddings.html', {
-        'form': form,
-        'embeddings': embeddings
-    })
+    # Obtener la página actual de embeddings existentes
+    return render(request, 'embeddings.html', _contexto_listado(request, form))
 
 def delete_embeddings(request):
     if request.method == 'POST':
@@ -109,16 +96,20 @@ def delete_embeddings(request):
             messages.warning(request, 'No se seleccionaron embeddings para eliminar')
             return redirect('embeddings:embeddings_view')
         
-        borrados_exitosos = 0
-        for embedding_id in embedding_ids:
-            if borrar_embedding(embedding_id):
-                borrados_exitosos += 1
+        resultados = borrar_embeddings(embedding_ids)
+        borrados_exitosos = sum(resultados.values())
         
         if borrados_exitosos > 0:
             messages.success(request, f'Se eliminaron {borrados_exitosos} embeddings exitosamente.')
         else:
             messages.error(request, 'No se pudo eliminar ningún embedding.')
+        if 0 < borrados_exitosos < len(resultados):
+            messages.warning(request, f'No se pudieron eliminar {len(resultados) - borrados_exitosos} embeddings.')
         
         return redirect('embeddings:embeddings_view')
     
     return redirect('embeddings:embeddings_view')
+
+def estado_ingesta(request, trabajo_id):
+    trabajo = get_object_or_404(TrabajoIngesta, pk=trabajo_id)
+    return JsonResponse(trabajo.como_dict())
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from esp_web.models import EspecificacionImagen
+from esp_web.utils.imagenes_exportacion import preparar_para_exportacion
+
+
+class Command(BaseCommand):
+    help = 'Guarda las medidas y la copia para Word de las imágenes de especificaciones subidas antes de que existieran'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--todas',
+            action='store_true',
+            help='Vuelve a generar la copia de todas las imágenes (por ejemplo, al cambiar ESP_WEB_IMAGEN_EXPORTACION_DPI)',
+        )
+
+    def handle(self, *args, **options):
+        imagenes = EspecificacionImagen.objects.select_related('especificacion').order_by('pk')
+        if not options['todas']:
+            imagenes = imagenes.filter(ancho__isnull=True)
+
+        preparadas = 0
+        errores = 0
+        for imagen in imagenes.iterator():
+            try:
+                with imagen.imagen.open('rb') as archivo:
+                    img = Image.open(archivo)
+                    img = img.convert('RGB') if img.mode != 'RGB' else img
+                    img.load()
+                preparar_para_exportacion(imagen, img)
+                imagen.save(update_fields=['ancho', 'alto', 'imagen_exportacion'])
+                preparadas += 1
+            except Exception as e:
+                errores += 1
+                self.stdout.write(self.style.WARNING(f'Imagen #{imagen.pk}: {e}'))
+
+        self.stdout.write(self.style.SUCCESS(f'{preparadas} imágenes preparadas, {errores} con errores'))
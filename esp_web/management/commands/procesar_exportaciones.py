@@ -0,0 +1,11 @@
+from esp_web.utils.exportaciones import cola_exportaciones
+from main.utils.segundo_plano import ComandoProcesarCola
+
+
+class Command(ComandoProcesarCola):
+    help = 'Genera las exportaciones a Word pendientes (worker local, sin broker externo)'
+    trabajos = 'exportaciones a Word'
+    minutos_sin_avance = 15
+
+    def obtener_cola(self):
+        return cola_exportaciones
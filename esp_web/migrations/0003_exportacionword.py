@@ -0,0 +1,39 @@
+# Generated by Django 5.2 on 2026-10-18 17:10
+
+import django.db.models.deletion
+import esp_web.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('esp_web', '0002_especificacion_especificacion_tecnica'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportacionWord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(db_index=True, max_length=64, verbose_name='Clave')),
+                ('encabezado', models.JSONField(default=dict, verbose_name='Encabezado')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_proceso', 'En proceso'), ('completado', 'Completado'), ('error', 'Error')], db_index=True, default='pendiente', max_length=20, verbose_name='Estado')),
+                ('total_especificaciones', models.PositiveIntegerField(default=0, verbose_name='Total de Especificaciones')),
+                ('especificaciones_procesadas', models.PositiveIntegerField(default=0, verbose_name='Especificaciones Procesadas')),
+                ('archivo', models.FileField(blank=True, null=True, upload_to=esp_web.models.exportacion_word_upload_path, verbose_name='Archivo')),
+                ('error', models.TextField(blank=True, verbose_name='Error')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Fecha de Actualización')),
+                ('creado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='exportaciones_word', to=settings.AUTH_USER_MODEL, verbose_name='Creado por')),
+                ('proyecto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exportaciones_word', to='esp_web.proyecto')),
+            ],
+            options={
+                'verbose_name': 'Exportación a Word',
+                'verbose_name_plural': 'Exportaciones a Word',
+                'ordering': ['-fecha_creacion'],
+            },
+        ),
+    ]
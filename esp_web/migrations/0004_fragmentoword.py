@@ -0,0 +1,31 @@
+# Generated by Django 5.2 on 2026-10-18 18:05
+
+import django.db.models.deletion
+import esp_web.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('esp_web', '0003_exportacionword'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FragmentoWord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=64, unique=True)),
+                ('archivo', models.FileField(upload_to=esp_web.models.fragmento_word_upload_path)),
+                ('aciertos', models.PositiveIntegerField(default=0)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_ultimo_uso', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('especificacion', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='fragmentos_word', to='esp_web.especificacion')),
+            ],
+            options={
+                'verbose_name': 'Fragmento de Word',
+                'verbose_name_plural': 'Fragmentos de Word',
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-18 19:20
+
+import esp_web.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('esp_web', '0004_fragmentoword'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='especificacionimagen',
+            name='ancho',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Ancho (px)'),
+        ),
+        migrations.AddField(
+            model_name='especificacionimagen',
+            name='alto',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Alto (px)'),
+        ),
+        migrations.AddField(
+            model_name='especificacionimagen',
+            name='imagen_exportacion',
+            field=models.ImageField(blank=True, null=True, upload_to=esp_web.models.especificacion_imagen_exportacion_upload_path, verbose_name='Imagen para Word'),
+        ),
+    ]
@@ -50,6 +50,12 @@ def especificacion_imagen_upload_path(instance, filename):
     return f'especificaciones/{instance.especificacion.proyecto_id}/imagenes/{slug}-{timestamp}{ext}'
 
 
+def especificacion_imagen_exportacion_upload_path(instance, filename):
+    slug = slugify(instance.especificacion.titulo) or 'especificacion'
+    timestamp = timezone.now().strftime('%Y%m%d%H%M%S')
+    return f'especificaciones/{instance.especificacion.proyecto_id}/imagenes/word/{slug}-{timestamp}.jpg'
+
+
 class Especificacion(models.Model):
     proyecto = models.ForeignKey(
         Proyecto,
@@ -90,10 +96,21 @@ class Especificacion(models.Model):
     
     def tiene_imagenes(self):
         """Verifica si la especificación tiene imágenes asociadas"""
+        if hasattr(self, 'num_imagenes') or 'imagenes' in getattr(self, '_prefetched_objects_cache', {}):
+            return self.cantidad_imagenes() > 0
         return self.imagenes.exists()
     
     def cantidad_imagenes(self):
-        """Retorna la cantidad de imágenes asociadas"""
+        """
+        Retorna la cantidad de imágenes asociadas. Usa la anotación `num_imagenes`
+        o las imágenes precargadas con prefetch_related si están disponibles, para
+        no hacer una consulta por cada llamada desde los listados.
+        """
+        if hasattr(self, 'num_imagenes'):
+            return self.num_imagenes
+        precargadas = getattr(self, '_prefetched_objects_cache', {})
+        if 'imagenes' in precargadas:
+            return len(precargadas['imagenes'])
         return self.imagenes.count()
 
 
@@ -105,6 +122,14 @@ class EspecificacionImagen(models.Model):
     )
     imagen = models.ImageField(upload_to=especificacion_imagen_upload_path)
     descripcion = models.TextField(blank=True, verbose_name="Descripción")
+    ancho = models.PositiveIntegerField(null=True, blank=True, verbose_name="Ancho (px)")
+    alto = models.PositiveIntegerField(null=True, blank=True, verbose_name="Alto (px)")
+    imagen_exportacion = models.ImageField(
+        upload_to=especificacion_imagen_exportacion_upload_path,
+        blank=True,
+        null=True,
+        verbose_name="Imagen para Word"
+    )
     fecha_subida = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -149,12 +174,132 @@ class EspecificacionImagen(models.Model):
                     ContentFile(output.read()),
                     save=False
                 )
+                
+                # Guardar las medidas y la copia para Word, así la exportación no abre el original.
+                # Importación diferida: cargar los modelos no debe cargar la conversión a Word
+                from esp_web.utils.imagenes_exportacion import preparar_para_exportacion
+                preparar_para_exportacion(self, img)
+                if kwargs.get('update_fields') is not None:
+                    kwargs['update_fields'] = set(kwargs['update_fields']) | {'ancho', 'alto', 'imagen_exportacion'}
             except Exception as e:
                 # Si hay un error al optimizar, continuar con el guardado normal
                 print(f"Error al optimizar imagen: {e}")
         
         super().save(*args, **kwargs)
     
+    def eliminar_archivos(self):
+        """Elimina del almacenamiento la imagen y su copia para Word"""
+        if self.imagen:
+            self.imagen.delete(save=False)
+        if self.imagen_exportacion:
+            self.imagen_exportacion.delete(save=False)
+    
     def __str__(self):
         return f"Imagen de {self.especificacion.titulo}"
 
+
+
+def exportacion_word_upload_path(instance, filename):
+    return f'exportaciones/{instance.proyecto_id}/{instance.clave[:16]}-{instance.pk}.docx'
+
+
+class ExportacionWord(models.Model):
+    """
+    Exportación a Word de un proyecto que se genera fuera de la solicitud HTTP.
+    El archivo generado se reutiliza mientras no cambie la clave (contenido del
+    proyecto y valores del encabezado).
+    """
+    ESTADO_PENDIENTE = 'pendiente'
+    ESTADO_EN_PROCESO = 'en_proceso'
+    ESTADO_COMPLETADO = 'completado'
+    ESTADO_ERROR = 'error'
+    ESTADOS = [
+        (ESTADO_PENDIENTE, 'Pendiente'),
+        (ESTADO_EN_PROCESO, 'En proceso'),
+        (ESTADO_COMPLETADO, 'Completado'),
+        (ESTADO_ERROR, 'Error'),
+    ]
+
+    proyecto = models.ForeignKey(
+        Proyecto,
+        on_delete=models.CASCADE,
+        related_name='exportaciones_word'
+    )
+    clave = models.CharField(max_length=64, db_index=True, verbose_name='Clave')
+    encabezado = models.JSONField(default=dict, verbose_name='Encabezado')
+    estado = models.CharField(max_length=20, choices=ESTADOS, default=ESTADO_PENDIENTE, db_index=True, verbose_name='Estado')
+    total_especificaciones = models.PositiveIntegerField(default=0, verbose_name='Total de Especificaciones')
+    especificaciones_procesadas = models.PositiveIntegerField(default=0, verbose_name='Especificaciones Procesadas')
+    archivo = models.FileField(upload_to=exportacion_word_upload_path, blank=True, null=True, verbose_name='Archivo')
+    error = models.TextField(blank=True, verbose_name='Error')
+    creado_por = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='exportaciones_word',
+        verbose_name='Creado por'
+    )
+    fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')
+    fecha_actualizacion = models.DateTimeField(auto_now=True, verbose_name='Fecha de Actualización')
+
+    class Meta:
+        verbose_name = 'Exportación a Word'
+        verbose_name_plural = 'Exportaciones a Word'
+        ordering = ['-fecha_creacion']
+
+    def __str__(self):
+        return f"Exportación #{self.pk} - {self.proyecto.nombre} ({self.get_estado_display()})"
+
+    @property
+    def finalizado(self):
+        return self.estado in (self.ESTADO_COMPLETADO, self.ESTADO_ERROR)
+
+    @property
+    def nombre_archivo(self):
+        """Nombre con el que se descarga el documento."""
+        nombre = self.encabezado.get('proyecto') or self.proyecto.nombre
+        return f'{slugify(nombre)}_especificaciones.docx'
+
+    def como_dict(self):
+        """Representación del estado de la exportación para el endpoint de progreso."""
+        return {
+            'id': self.pk,
+            'estado': self.estado,
+            'estado_display': self.get_estado_display(),
+            'total_especificaciones': self.total_especificaciones,
+            'especificaciones_procesadas': self.especificaciones_procesadas,
+            'error': self.error,
+            'finalizado': self.finalizado,
+        }
+
+
+def fragmento_word_upload_path(instance, filename):
+    return f'exportaciones/fragmentos/{instance.clave[:2]}/{instance.clave}.docx'
+
+
+class FragmentoWord(models.Model):
+    """
+    Especificación ya renderizada a Word (contenido e imágenes), que la exportación
+    del proyecto inserta sin volver a procesar el Markdown. La clave cambia al
+    modificar el contenido, las imágenes o la plantilla.
+    """
+    clave = models.CharField(max_length=64, unique=True)
+    especificacion = models.ForeignKey(
+        Especificacion,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='fragmentos_word'
+    )
+    archivo = models.FileField(upload_to=fragmento_word_upload_path)
+    aciertos = models.PositiveIntegerField(default=0)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_ultimo_uso = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = 'Fragmento de Word'
+        verbose_name_plural = 'Fragmentos de Word'
+
+    def __str__(self):
+        return f"Fragmento {self.clave[:12]}"
@@ -1,4 +1,150 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.models import Count
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
 
+from esp_web.models import Especificacion, EspecificacionImagen, FragmentoWord, Proyecto
+from esp_web.utils.exportar_word import generar_documento_word
+from esp_web.utils.fragmentos_word import guardar_fragmentos
+from esp_web.utils.imagenes_exportacion import ancho_pulgadas
+
+
+def _jpeg(ancho, alto):
+    salida = BytesIO()
+    Image.new('RGB', (ancho, alto), (200, 100, 50)).save(salida, format='JPEG')
+    return SimpleUploadedFile('foto.jpg', salida.getvalue(), content_type='image/jpeg')
+
+
+class MediaTemporalTestCase(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        ajustes = override_settings(MEDIA_ROOT=media)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+
+class FragmentosWordTests(MediaTemporalTestCase):
+    @mock.patch('main.utils.cache_lru.CACHE_RECORTE_CADA', 1)
+    @mock.patch('esp_web.utils.fragmentos_word.ESP_WEB_FRAGMENTOS_WORD_MAX', 2)
+    def test_elimina_los_fragmentos_usados_hace_mas_tiempo_con_su_archivo(self):
+        for horas, clave in [(2, 'antiguo'), (1, 'reciente')]:
+            guardar_fragmentos([(clave, None, b'docx')])
+            FragmentoWord.objects.filter(clave=clave).update(fecha_ultimo_uso=timezone.now() - timedelta(hours=horas))
+        antiguo = FragmentoWord.objects.get(clave='antiguo')
+
+        guardar_fragmentos([('nuevo', None, b'docx')])
+
+        self.assertEqual(sorted(FragmentoWord.objects.values_list('clave', flat=True)), ['nuevo', 'reciente'])
+        self.assertFalse(antiguo.archivo.storage.exists(antiguo.archivo.name))
+
+
+class ImagenExportacionTests(MediaTemporalTestCase):
+    def test_guardar_una_imagen_crea_la_copia_reducida_para_word(self):
+        usuario = User.objects.create_user('autor')
+        proyecto = Proyecto.objects.create(nombre='Planta', solicitante='EMBOL', ubicacion='Cochabamba', creado_por=usuario)
+        especificacion = Especificacion.objects.create(proyecto=proyecto, titulo='Pintado de piso')
+
+        imagen = EspecificacionImagen.objects.create(especificacion=especificacion, imagen=_jpeg(2000, 1000))
+
+        self.assertEqual((imagen.ancho, imagen.alto), (1920, 960))
+        self.assertEqual(ancho_pulgadas(imagen), 3.0)
+        with Image.open(imagen.imagen_exportacion) as copia:
+            self.assertEqual(copia.size, (600, 300))
+
+
+# Sin pool de procesos: la conversión se hace en este proceso
+@mock.patch('esp_web.utils.exportar_word.ESP_WEB_EXPORTACION_PROCESOS', 1)
+class TieneImagenesTests(MediaTemporalTestCase):
+    def setUp(self):
+        super().setUp()
+        usuario = User.objects.create_user('autor')
+        proyecto = Proyecto.objects.create(nombre='Uno', solicitante='EMBOL', ubicacion='Cochabamba', creado_por=usuario)
+        self.especificacion = Especificacion.objects.create(proyecto=proyecto, titulo='Muro', contenido='## Muro')
+        EspecificacionImagen.objects.create(especificacion=self.especificacion, imagen=_jpeg(40, 30))
+
+    def test_usa_la_anotacion_o_las_imagenes_precargadas(self):
+        anotada = Especificacion.objects.annotate(num_imagenes=Count('imagenes')).get()
+        precargada = Especificacion.objects.prefetch_related('imagenes').get()
+        with self.assertNumQueries(0):
+            self.assertTrue(anotada.tiene_imagenes())
+            self.assertTrue(precargada.tiene_imagenes())
+
+    def test_sin_precarga_consulta_si_existe_alguna(self):
+        especificacion = Especificacion.objects.get()
+        with CaptureQueriesContext(connection) as contexto:
+            self.assertTrue(especificacion.tiene_imagenes())
+        self.assertEqual(len(contexto.captured_queries), 1)
+        self.assertNotIn('COUNT', contexto.captured_queries[0]['sql'].upper())
+
+
+class ConsultasPorProyectoTests(MediaTemporalTestCase):
+    """La cantidad de consultas no depende de cuántas especificaciones e imágenes tenga el proyecto."""
+
+    def setUp(self):
+        super().setUp()
+        self.usuario = User.objects.create_user('autor', first_name='Ana')
+        self.uno = self._proyecto('Uno', self.usuario, especificaciones=1, imagenes=1)
+
+    def _proyecto(self, nombre, usuario, especificaciones, imagenes, publico=False):
+        proyecto = Proyecto.objects.create(
+            nombre=nombre, solicitante='EMBOL', ubicacion='Cochabamba', creado_por=usuario, publico=publico
+        )
+        for i in range(especificaciones):
+            especificacion = Especificacion.objects.create(
+                proyecto=proyecto, titulo=f'{nombre} {i}', contenido=f'## {nombre} {i}\n\nTexto de la **especificación**.'
+            )
+            for _ in range(imagenes):
+                EspecificacionImagen.objects.create(especificacion=especificacion, imagen=_jpeg(400, 300), descripcion='Foto')
+        return proyecto
+
+    def _consultas(self, funcion):
+        with CaptureQueriesContext(connection) as contexto:
+            funcion()
+        return len(contexto.captured_queries)
+
+    def test_detalle_del_proyecto(self):
+        self.client.force_login(self.usuario)
+        variantes = ({}, {'spec_sort_by': 'usuario'})
+        consultas = []
+        for parametros in variantes:
+            self.client.get(f'/proyecto/{self.uno.pk}/', parametros)
+            consultas.append(self._consultas(lambda: self.client.get(f'/proyecto/{self.uno.pk}/', parametros)))
+
+        # Más especificaciones e imágenes en el proyecto y en el listado para copiar,
+        # que incluye los proyectos públicos de otros usuarios
+        varios = self._proyecto('Varios', self.usuario, especificaciones=5, imagenes=3)
+        for i in range(3):
+            otro_usuario = User.objects.create_user(f'revisor{i}')
+            self._proyecto(f'Público {i}', otro_usuario, especificaciones=2, imagenes=0, publico=True)
+
+        for parametros, esperadas in zip(variantes, consultas):
+            with self.subTest(**parametros):
+                with self.assertNumQueries(esperadas):
+                    respuesta = self.client.get(f'/proyecto/{varios.pk}/', parametros)
+                self.assertEqual(respuesta.status_code, 200)
+                self.assertEqual(len(respuesta.context['especificaciones']), 5)
+
+    def test_generar_documento_word(self):
+        varios = self._proyecto('Varios', self.usuario, especificaciones=5, imagenes=3)
+
+        # Sin fragmentos guardados: se renderizan y se guardan todos juntos
+        consultas = self._consultas(lambda: generar_documento_word(self.uno, {}))
+        with self.assertNumQueries(consultas):
+            generar_documento_word(varios, {})
+        self.assertEqual(FragmentoWord.objects.count(), 6)
+
+        # Con los fragmentos guardados
+        consultas = self._consultas(lambda: generar_documento_word(self.uno, {}))
+        with self.assertNumQueries(consultas):
+            generar_documento_word(varios, {})
@@ -24,5 +24,7 @@ urlpatterns = [
     path('especificacion/imagen/<int:imagen_id>/eliminar/', views.eliminar_imagen_especificacion_view, name='eliminar_imagen_especificacion'),
     path('especificacion/imagen/<int:imagen_id>/actualizar-descripcion/', views.actualizar_descripcion_imagen_view, name='actualizar_descripcion_imagen'),
     path('<int:proyecto_id>/exportar-word/', views.exportar_proyecto_word_view, name='exportar_proyecto_word'),
+    path('exportacion-word/<int:exportacion_id>/', views.estado_exportacion_word_view, name='estado_exportacion_word'),
+    path('exportacion-word/<int:exportacion_id>/descargar/', views.descargar_exportacion_word_view, name='descargar_exportacion_word'),
 ]
 
@@ -0,0 +1,185 @@
+import hashlib
+import json
+import os
+from datetime import timedelta
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils import timezone
+
+from esp_web.models import ExportacionWord, EspecificacionImagen
+from esp_web.utils.exportar_word import TEMPLATE_WORD_PATH, generar_documento_word
+from main.utils.segundo_plano import ColaTrabajos
+
+from rich.console import Console
+console = Console()
+
+# Incrementar al modificar el formato del documento para no reutilizar exportaciones anteriores
+VERSION_EXPORTACION = 2
+
+# Si es True, las exportaciones se generan en un pool de hilos del mismo proceso web.
+# Si es False, quedan pendientes hasta que las procese `python manage.py procesar_exportaciones`.
+ESP_WEB_EXPORTACION_EN_SEGUNDO_PLANO = getattr(settings, 'ESP_WEB_EXPORTACION_EN_SEGUNDO_PLANO', True)
+
+# Cantidad de exportaciones que se generan en paralelo dentro de cada proceso
+ESP_WEB_EXPORTACION_HILOS = getattr(settings, 'ESP_WEB_EXPORTACION_HILOS', 2)
+
+# Exportaciones guardadas por proyecto; al superarlas se eliminan las más antiguas con su archivo
+ESP_WEB_EXPORTACIONES_POR_PROYECTO = getattr(settings, 'ESP_WEB_EXPORTACIONES_POR_PROYECTO', 5)
+
+# Minutos sin avance tras los cuales una exportación en curso se da por interrumpida
+# y una nueva solicitud la reemplaza en lugar de esperarla
+ESP_WEB_EXPORTACION_MINUTOS_SIN_AVANCE = getattr(settings, 'ESP_WEB_EXPORTACION_MINUTOS_SIN_AVANCE', 10)
+
+def clave_exportacion(proyecto, encabezado: Dict[str, Optional[str]]) -> str:
+    """
+    Clave que identifica el contenido del documento exportado: cambia si se
+    modifica el proyecto, el encabezado, alguna especificación, imagen o
+    ubicación, el orden de las especificaciones o la plantilla de Word.
+
+    Además de las fechas de actualización se incluyen los IDs y el orden, porque
+    reordenar o eliminar especificaciones e imágenes no actualiza ninguna fecha.
+    """
+    especificaciones = list(
+        proyecto.especificaciones.order_by('orden', '-fecha_creacion')
+        .values_list('id', 'orden', 'fecha_actualizacion')
+    )
+    imagenes = list(
+        EspecificacionImagen.objects.filter(especificacion__proyecto=proyecto)
+        .order_by('id')
+        .values_list('id', 'especificacion_id', 'imagen', 'imagen_exportacion', 'descripcion')
+    )
+    ubicaciones = list(
+        proyecto.ubicaciones.order_by('-fecha_creacion').values_list('id', 'fecha_actualizacion')
+    )
+    plantilla = os.path.getmtime(TEMPLATE_WORD_PATH) if os.path.exists(TEMPLATE_WORD_PATH) else None
+
+    datos = json.dumps({
+        'version': VERSION_EXPORTACION,
+        'proyecto': [proyecto.pk, proyecto.fecha_actualizacion],
+        'encabezado': encabezado,
+        'especificaciones': especificaciones,
+        'imagenes': imagenes,
+        'ubicaciones': ubicaciones,
+        'plantilla': plantilla,
+    }, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(datos.encode('utf-8')).hexdigest()
+
+
+def _archivo_disponible(exportacion: ExportacionWord) -> bool:
+    return bool(exportacion.archivo) and exportacion.archivo.storage.exists(exportacion.archivo.name)
+
+
+def obtener_o_encolar_exportacion(proyecto, encabezado: Dict[str, Optional[str]], usuario=None) -> ExportacionWord:
+    """
+    Retorna la exportación del proyecto con el mismo contenido (terminada o en
+    curso) o, si no hay una, crea una nueva y la envía al pool de hilos.
+
+    Args:
+        proyecto: Instancia del modelo Proyecto
+        encabezado: Valores del encabezado del documento
+        usuario: Usuario que solicitó la exportación
+
+    Returns:
+        ExportacionWord: La exportación existente o la creada
+    """
+    clave = clave_exportacion(proyecto, encabezado)
+    existente = ExportacionWord.objects.filter(
+        proyecto=proyecto, clave=clave
+    ).exclude(estado=ExportacionWord.ESTADO_ERROR).order_by('-fecha_creacion').first()
+    if existente is not None:
+        if existente.estado == ExportacionWord.ESTADO_COMPLETADO:
+            if _archivo_disponible(existente):
+                return existente
+            # El archivo fue eliminado del almacenamiento: generarlo de nuevo
+            existente.delete()
+        elif existente.fecha_actualizacion >= timezone.now() - timedelta(minutes=ESP_WEB_EXPORTACION_MINUTOS_SIN_AVANCE):
+            return existente
+        else:
+            ExportacionWord.objects.filter(pk=existente.pk, estado=existente.estado).update(
+                estado=ExportacionWord.ESTADO_ERROR,
+                error='Exportación interrumpida',
+                fecha_actualizacion=timezone.now()
+            )
+
+    exportacion = ExportacionWord.objects.create(
+        proyecto=proyecto,
+        clave=clave,
+        encabezado=encabezado,
+        creado_por=usuario if usuario is not None and usuario.is_authenticated else None
+    )
+
+    cola_exportaciones.encolar(exportacion.pk)
+    return exportacion
+
+
+def ejecutar_exportacion(exportacion_id: int) -> bool:
+    """
+    Genera el documento de una exportación pendiente, actualizando su progreso
+    después de cada especificación.
+
+    Args:
+        exportacion_id: ID de la exportación
+
+    Returns:
+        bool: False si la exportación no estaba pendiente (otro proceso la tomó), True en caso contrario
+    """
+    if not cola_exportaciones.tomar(exportacion_id):
+        return False
+
+    exportacion = ExportacionWord.objects.select_related('proyecto').get(pk=exportacion_id)
+    proyecto = exportacion.proyecto
+    total = proyecto.especificaciones.count()
+    ExportacionWord.objects.filter(pk=exportacion_id).update(total_especificaciones=total)
+    console.print(f"[green]Exportación #{exportacion_id}: generando {total} especificaciones de '{proyecto.nombre}'[/green]")
+
+    def al_avanzar(procesadas: int) -> None:
+        ExportacionWord.objects.filter(pk=exportacion_id).update(
+            especificaciones_procesadas=procesadas,
+            fecha_actualizacion=timezone.now()
+        )
+
+    contenido = generar_documento_word(proyecto, exportacion.encabezado, al_avanzar=al_avanzar)
+    exportacion.archivo.save(f'{exportacion.clave[:16]}.docx', ContentFile(contenido), save=False)
+    ExportacionWord.objects.filter(pk=exportacion_id).update(
+        archivo=exportacion.archivo.name,
+        estado=ExportacionWord.ESTADO_COMPLETADO,
+        fecha_actualizacion=timezone.now()
+    )
+
+    console.print(f"[green]Exportación #{exportacion_id}: completada[/green]")
+    eliminar_antiguas(proyecto)
+    return True
+
+
+def eliminar_antiguas(proyecto) -> int:
+    """
+    Elimina las exportaciones finalizadas del proyecto que superan
+    ESP_WEB_EXPORTACIONES_POR_PROYECTO, junto con sus archivos.
+
+    Returns:
+        int: Cantidad de exportaciones eliminadas
+    """
+    sobrantes = list(
+        ExportacionWord.objects.filter(
+            proyecto=proyecto,
+            estado__in=[ExportacionWord.ESTADO_COMPLETADO, ExportacionWord.ESTADO_ERROR]
+        ).order_by('-fecha_creacion')[ESP_WEB_EXPORTACIONES_POR_PROYECTO:]
+    )
+    for exportacion in sobrantes:
+        if exportacion.archivo:
+            exportacion.archivo.delete(save=False)
+        exportacion.delete()
+    return len(sobrantes)
+
+
+cola_exportaciones = ColaTrabajos(
+    ExportacionWord,
+    ejecutar_exportacion,
+    hilos=ESP_WEB_EXPORTACION_HILOS,
+    nombre_hilos='exportacion-word',
+    en_segundo_plano=ESP_WEB_EXPORTACION_EN_SEGUNDO_PLANO,
+    reinicio={'especificaciones_procesadas': 0},
+    campos_error=lambda exportacion_id, e: {'error': str(e)},
+)
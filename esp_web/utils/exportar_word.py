@@ -0,0 +1,631 @@
+import os
+import io
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from copy import deepcopy
+from itertools import count
+from typing import Callable, Dict, List, Optional
+
+from django.conf import settings
+from docx import Document
+from docx.shared import Inches, Pt, RGBColor
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+from markdown import markdown
+from bs4 import BeautifulSoup
+
+from esp_web.utils.fragmentos_word import buscar_fragmentos, clave_fragmento, guardar_fragmentos
+from esp_web.utils.imagenes_exportacion import ancho_pulgadas
+from esp_web.utils.markdown_word import (
+    MAX_IMAGEN_CONTENIDO,
+    ancho_imagen,
+    markdown_a_instrucciones,
+    preparar_especificacion,
+)
+
+from rich.console import Console
+console = Console()
+
+# Plantilla con encabezados y pies de página del documento exportado
+TEMPLATE_WORD_PATH = os.path.join(settings.BASE_DIR, 'esp_web', 'templates', 'word_templates', 'template_especificaciones.docx')
+
+# Incrementar al modificar cómo se renderiza una especificación para no reutilizar fragmentos anteriores
+VERSION_FRAGMENTO = 1
+
+# Procesos que convierten el Markdown de las especificaciones en paralelo; 1 desactiva el pool
+ESP_WEB_EXPORTACION_PROCESOS = getattr(settings, 'ESP_WEB_EXPORTACION_PROCESOS', min(4, os.cpu_count() or 1))
+
+# Especificaciones sin fragmento guardado a partir de las cuales conviene usar el pool
+ESP_WEB_EXPORTACION_MIN_PARALELO = getattr(settings, 'ESP_WEB_EXPORTACION_MIN_PARALELO', 4)
+
+_pool: ProcessPoolExecutor = None
+_pool_lock = threading.Lock()
+
+
+def replace_header_placeholders(doc, proyecto, proyecto_nombre=None, solicitante=None, servicio=None, revision="1", fecha=None):
+    """
+    Reemplaza los placeholders en el encabezado del documento Word con datos del proyecto.
+    
+    Args:
+        doc: Documento Word
+        proyecto: Instancia del modelo Proyecto
+        proyecto_nombre: Nombre del proyecto personalizado (opcional)
+        solicitante: Solicitante personalizado (opcional)
+        servicio: Servicio personalizado (opcional)
+        revision: Número de revisión (por defecto "1")
+        fecha: Fecha personalizada (opcional, formato DD/MM/YYYY)
+    """
+    # Usar valores personalizados si se proporcionan, sino usar los del proyecto
+    proyecto_val = proyecto_nombre if proyecto_nombre is not None else (proyecto.nombre or '')
+    solicitante_val = solicitante if solicitante is not None else (proyecto.solicitante or '')
+    servicio_val = servicio if servicio is not None else (proyecto.descripcion or proyecto.ubicacion or '')
+    fecha_val = fecha if fecha is not None else (proyecto.fecha_creacion.strftime("%d/%m/%Y") if proyecto.fecha_creacion else '')
+    
+    # Mapeo de placeholders a valores
+    replacements = {
+        '<<PROYECTO>>': proyecto_val,
+        '<<SOLICITANTE>>': solicitante_val,
+        '<<SERVICIO>>': servicio_val,
+        '<<REV>>': revision,
+        '<<REV.>>': revision,  # Por si tiene punto
+        '<<FECHA>>': fecha_val,
+    }
+    
+    def replace_in_element(element):
+        """Función auxiliar para reemplazar placeholders en un elemento"""
+        # Si es un párrafo, trabajar con su texto completo
+        if hasattr(element, 'runs'):
+            # Primero obtener todo el texto del párrafo
+            full_text = ''.join([run.text for run in element.runs])
+            
+            # Si hay algún placeholder, reemplazar
+            if any(ph in full_text for ph in replacements.keys()):
+                # Aplicar reemplazos
+                new_text = full_text
+                for placeholder, value in replacements.items():
+                    new_text = new_text.replace(placeholder, value)
+                
+                # Limpiar todos los runs y agregar el texto reemplazado
+                # Preservar el formato del primer run si existe
+                if element.runs:
+                    # Guardar formato del primer run
+                    first_run = element.runs[0]
+                    # Limpiar todos los runs
+                    for run in element.runs:
+                        run.text = ''
+                    # Agregar texto con el formato del primer run
+                    first_run.text = new_text
+                else:
+                    element.add_run(new_text)
+        elif hasattr(element, 'text'):
+            # Para otros elementos con texto directo
+            if element.text:
+                for placeholder, value in replacements.items():
+                    if placeholder in element.text:
+                        element.text = element.text.replace(placeholder, value)
+    
+    # Reemplazar en todas las secciones del documento
+    for section in doc.sections:
+        # Reemplazar en el encabezado
+        header = section.header
+        
+        # Reemplazar en párrafos del encabezado
+        for paragraph in header.paragraphs:
+            replace_in_element(paragraph)
+        
+        # También buscar en tablas del encabezado
+        for table in header.tables:
+            for row in table.rows:
+                for cell in row.cells:
+                    for paragraph in cell.paragraphs:
+                        replace_in_element(paragraph)
+
+def _quitar_bordes(table):
+    """Elimina los bordes de todas las celdas de una tabla"""
+    for row in table.rows:
+        for cell in row.cells:
+            tcPr = cell._element.tcPr
+            if tcPr is None:
+                tcPr = OxmlElement('w:tcPr')
+                cell._element.append(tcPr)
+            
+            tcBorders = tcPr.find(qn('w:tcBorders'))
+            if tcBorders is None:
+                tcBorders = OxmlElement('w:tcBorders')
+                tcPr.append(tcBorders)
+            
+            for border_name in ['top', 'left', 'bottom', 'right']:
+                border = tcBorders.find(qn(f'w:{border_name}'))
+                if border is None:
+                    border = OxmlElement(f'w:{border_name}')
+                    tcBorders.append(border)
+                border.set(qn('w:val'), 'nil')
+                border.set(qn('w:sz'), '0')
+                border.set(qn('w:space'), '0')
+
+
+def _agregar_pie(doc, texto):
+    """Agrega un pie de figura centrado, en cursiva y de 9 pt"""
+    caption_para = doc.add_paragraph()
+    caption_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    run = caption_para.add_run(texto)
+    run.font.size = Pt(9)
+    run.italic = True
+    return caption_para
+
+
+def filtrar_plus_codes(texto):
+    """
+    Filtra Plus Codes de Google Maps (como "6VF4+2G4") del texto.
+    Los Plus Codes tienen formato: letras/números cortos con + seguido de más letras/números.
+    """
+    if not texto:
+        return texto
+    
+    import re
+    # Patrón principal para detectar Plus Codes completos con el símbolo +
+    # Formato típico: 4-6 caracteres alfanuméricos + 2-4 caracteres alfanuméricos
+    # Ejemplos: "6VF4+2G4", "6VF4+2G", "ABC123+XY"
+    patron_plus_code = r'\b[A-Z0-9]{4,6}\+[A-Z0-9]{2,4}\b'
+    texto_limpio = re.sub(patron_plus_code, '', texto)
+    
+    # También filtrar códigos cortos que parecen parte de Plus Codes sin el +
+    # Solo si están aislados (rodeados de espacios, comas, puntos, etc.)
+    # Ejemplos: "6VF4", "ABC123" cuando están solos y no son parte de direcciones
+    def filtrar_codigo_aislado(match):
+        codigo = match.group(0)
+        # No eliminar si tiene más de 6 caracteres (probablemente no es Plus Code)
+        if len(codigo) > 6:
+            return codigo
+        
+        # Obtener contexto alrededor del código
+        inicio = max(0, match.start() - 30)
+        fin = min(len(texto), match.end() + 30)
+        contexto = texto[inicio:fin].lower()
+        
+        # No eliminar si está cerca de palabras de dirección comunes
+        palabras_direccion = ['avenida', 'av.', 'av ', 'calle', 'ruta', 'carretera', 
+                             'km', 'nro', 'número', 'numero', 'dirección', 'direccion',
+                             'barrio', 'zona', 'distrito']
+        if any(palabra in contexto for palabra in palabras_direccion):
+            return codigo
+        
+        # No eliminar si está después de "N°", "Nro", "Número", etc.
+        if re.search(r'(n[°ºo]|numero|nro|número)\s*' + re.escape(codigo), contexto, re.IGNORECASE):
+            return codigo
+        
+        # Eliminar si es un código corto alfanumérico aislado (probablemente Plus Code)
+        return ''
+    
+    # Buscar códigos de 4-6 caracteres alfanuméricos que estén aislados
+    patron_codigo_aislado = r'\b[A-Z0-9]{4,6}\b(?=\s|$|,|\.|;|:|\n)'
+    texto_limpio = re.sub(patron_codigo_aislado, filtrar_codigo_aislado, texto_limpio)
+    
+    # Limpiar espacios múltiples pero preservar estructura de tablas markdown
+    # No reemplazar espacios múltiples dentro de líneas de tabla (que empiezan con |)
+    lineas = texto_limpio.split('\n')
+    lineas_limpias = []
+    for linea in lineas:
+        # Si es una línea de tabla (contiene |), preservarla tal cual
+        if '|' in linea:
+            lineas_limpias.append(linea)
+        else:
+            # Para otras líneas, limpiar espacios múltiples
+            linea_limpia = re.sub(r' +', ' ', linea)
+            lineas_limpias.append(linea_limpia)
+    
+    texto_limpio = '\n'.join(lineas_limpias)
+    
+    # Limpiar saltos de línea múltiples pero preservar al menos uno entre secciones
+    texto_limpio = re.sub(r'\n{3,}', '\n\n', texto_limpio)
+    
+    return texto_limpio.strip()
+
+
+def _agregar_runs(para, runs):
+    """Agrega al párrafo los runs con formato de las instrucciones"""
+    for datos in runs:
+        run = para.add_run(datos['texto'])
+        if datos.get('negrita'):
+            run.bold = True
+        if datos.get('cursiva'):
+            run.italic = True
+        if datos.get('subrayado'):
+            run.underline = True
+        if datos.get('fuente'):
+            run.font.name = datos['fuente']
+        if datos.get('enlace'):
+            run.font.color.rgb = RGBColor(0, 0, 255)
+            run.underline = True
+
+
+def _agregar_galeria(doc, imagenes):
+    """Agrega las imágenes de una especificación en una tabla de 2 columnas sin bordes"""
+    doc.add_paragraph()
+    
+    num_imagenes = len(imagenes)
+    num_filas = (num_imagenes + 1) // 2
+    
+    # Crear tabla con 2 columnas sin bordes
+    table = doc.add_table(rows=num_filas, cols=2)
+    _quitar_bordes(table)
+    
+    # Llenar la tabla con las imágenes
+    celdas = [cell for row in table.rows for cell in row.cells]
+    for cell, imagen in zip(celdas, imagenes):
+        if not imagen['existe']:
+            continue
+        try:
+            if imagen['ancho'] is None:
+                raise ValueError(f"No se pudo leer la imagen {imagen['ruta']}")
+            
+            paragraph = cell.paragraphs[0]
+            paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
+            
+            run = paragraph.add_run()
+            run.add_picture(imagen['ruta'], width=Inches(imagen['ancho']))
+            
+            if imagen['descripcion']:
+                desc_para = cell.add_paragraph()
+                desc_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
+                desc_para.add_run(imagen['descripcion']).font.size = Pt(9)
+        except Exception as e:
+            error_para = cell.paragraphs[0]
+            error_para.add_run('[Error al cargar imagen]')
+            error_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    
+    doc.add_paragraph()
+
+
+def aplicar_instrucciones(doc, instrucciones: List[Dict]) -> None:
+    """
+    Agrega al documento las instrucciones generadas por
+    esp_web.utils.markdown_word (párrafos, títulos, pies, tablas, imágenes y galerías).
+    """
+    for instruccion in instrucciones:
+        tipo = instruccion['tipo']
+        
+        if tipo == 'titulo':
+            heading = doc.add_heading(level=instruccion['nivel'])
+            _agregar_runs(heading, instruccion['runs'])
+        
+        elif tipo == 'parrafo':
+            para = doc.add_paragraph(style=instruccion['estilo'])
+            if instruccion['centrado']:
+                para.alignment = WD_ALIGN_PARAGRAPH.CENTER
+            _agregar_runs(para, instruccion['runs'])
+        
+        elif tipo == 'pie':
+            _agregar_pie(doc, instruccion['texto'])
+        
+        elif tipo == 'tabla':
+            filas = instruccion['filas']
+            table = doc.add_table(rows=len(filas), cols=instruccion['columnas'])
+            table.style = 'Light Grid Accent 1'
+            
+            # Llenar la tabla
+            for row_idx, celdas in enumerate(filas):
+                for col_idx, runs in enumerate(celdas):
+                    word_cell = table.rows[row_idx].cells[col_idx]
+                    # Limpiar párrafos existentes
+                    word_cell.text = ''
+                    _agregar_runs(word_cell.paragraphs[0], runs)
+            
+            # Eliminar bordes de la tabla
+            _quitar_bordes(table)
+        
+        elif tipo == 'imagen':
+            para = doc.add_paragraph()
+            para.alignment = WD_ALIGN_PARAGRAPH.CENTER
+            try:
+                para.add_run().add_picture(instruccion['ruta'], width=Inches(instruccion['ancho']))
+            except Exception as e:
+                # Si hay error, agregar texto alternativo
+                para.add_run(f'[Imagen: {instruccion["alt"] if instruccion["alt"] else "No disponible"}]')
+        
+        elif tipo == 'galeria':
+            _agregar_galeria(doc, instruccion['imagenes'])
+
+
+def _nuevo_documento():
+    """Documento basado en la plantilla (si existe), con el estilo Normal configurado"""
+    if os.path.exists(TEMPLATE_WORD_PATH):
+        # Cargar el template (conserva encabezados y pies de página)
+        doc = Document(TEMPLATE_WORD_PATH)
+    else:
+        # Crear documento nuevo sin template
+        doc = Document()
+    
+    # Configurar estilos
+    style = doc.styles['Normal']
+    font = style.font
+    font.name = 'Arial'
+    font.size = Pt(11)
+    return doc
+
+
+def _version_plantilla():
+    return os.path.getmtime(TEMPLATE_WORD_PATH) if os.path.exists(TEMPLATE_WORD_PATH) else None
+
+
+def renderizar_fragmento(instrucciones: List[Dict]) -> bytes:
+    """
+    Arma con python-docx el fragmento de una especificación: un documento Word
+    propio (sin encabezado ni título), que luego se inserta en la exportación del
+    proyecto con _insertar_fragmento.
+
+    Args:
+        instrucciones: Resultado de markdown_word.preparar_especificacion
+
+    Returns:
+        bytes: Contenido del archivo .docx del fragmento
+    """
+    doc = _nuevo_documento()
+    
+    # Conservar solo las propiedades de sección de la plantilla
+    body = doc.element.body
+    for elemento in list(body.iterchildren()):
+        if elemento.tag != qn('w:sectPr'):
+            body.remove(elemento)
+    
+    aplicar_instrucciones(doc, instrucciones)
+    
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def _insertar_fragmento(doc, contenido: bytes, ids_dibujos) -> None:
+    """
+    Copia el cuerpo de un fragmento al final del documento. Las imágenes se
+    vuelven a agregar al documento de destino (se reutilizan si ya estaban) y se
+    renumeran los IDs de los dibujos para que no se repitan.
+
+    Args:
+        doc: Documento de destino
+        contenido: Archivo .docx del fragmento
+        ids_dibujos: Iterador de IDs libres para los dibujos
+    """
+    fragmento = Document(io.BytesIO(contenido))
+    body = doc.element.body
+    sectPr = body.find(qn('w:sectPr'))
+    
+    for elemento in fragmento.element.body.iterchildren():
+        if elemento.tag == qn('w:sectPr'):
+            continue
+        copia = deepcopy(elemento)
+        
+        for blip in copia.iter(qn('a:blip')):
+            rId = blip.get(qn('r:embed'))
+            if rId is None:
+                continue
+            imagen = fragmento.part.related_parts[rId]
+            nuevo_rId, _ = doc.part.get_or_add_image(io.BytesIO(imagen.blob))
+            blip.set(qn('r:embed'), nuevo_rId)
+        
+        for doc_pr in copia.iter(qn('wp:docPr')):
+            doc_pr.set('id', str(next(ids_dibujos)))
+        
+        if sectPr is not None:
+            sectPr.addprevious(copia)
+        else:
+            body.append(copia)
+
+
+def _obtener_pool() -> Optional[ProcessPoolExecutor]:
+    """Pool de procesos para convertir el Markdown de las especificaciones (None si está deshabilitado)"""
+    global _pool
+    
+    if ESP_WEB_EXPORTACION_PROCESOS <= 1:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # spawn: los procesos no heredan hilos ni conexiones a la base de datos del worker web
+            _pool = ProcessPoolExecutor(
+                max_workers=ESP_WEB_EXPORTACION_PROCESOS,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _pool
+
+
+def _descartar_pool() -> None:
+    global _pool
+    
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _imagen_galeria(imagen):
+    """
+    (ruta, descripción, ancho en pulgadas) de una imagen de la galería: la copia
+    reducida para Word si existe y el ancho calculado con las medidas guardadas,
+    para no abrir el archivo original.
+    """
+    archivo = imagen.imagen_exportacion if imagen.imagen_exportacion else imagen.imagen
+    return (archivo.path, imagen.descripcion, ancho_pulgadas(imagen))
+
+
+def _argumentos_especificacion(especificacion, imagenes):
+    """Argumentos (solo tipos básicos) de preparar_especificacion para otro proceso"""
+    return (
+        especificacion.contenido,
+        [_imagen_galeria(imagen) for imagen in imagenes],
+        settings.MEDIA_ROOT,
+    )
+
+
+def _convertir_en_paralelo(argumentos_faltantes) -> List[Optional[Future]]:
+    """
+    Envía al pool de procesos la conversión de las especificaciones sin fragmento
+    guardado. Retorna un futuro por especificación (None si se convierte en este proceso).
+    """
+    pool = _obtener_pool() if len(argumentos_faltantes) >= ESP_WEB_EXPORTACION_MIN_PARALELO else None
+    if pool is None:
+        return [None] * len(argumentos_faltantes)
+    
+    console.print(f"[exportar_word] Convirtiendo {len(argumentos_faltantes)} especificaciones en {ESP_WEB_EXPORTACION_PROCESOS} procesos", style="blue")
+    try:
+        return [pool.submit(preparar_especificacion, *argumentos) for argumentos in argumentos_faltantes]
+    except BrokenProcessPool:
+        _descartar_pool()
+        return [None] * len(argumentos_faltantes)
+
+
+def _instrucciones(futuro: Optional[Future], argumentos) -> List[Dict]:
+    if futuro is not None:
+        try:
+            return futuro.result()
+        except BrokenProcessPool:
+            console.print("[exportar_word] El pool de procesos se detuvo; se continúa en este proceso", style="yellow")
+            _descartar_pool()
+    return preparar_especificacion(*argumentos)
+
+
+def generar_documento_word(proyecto, encabezado: Dict[str, Optional[str]], al_avanzar: Optional[Callable[[int], None]] = None) -> bytes:
+    """
+    Genera el documento Word con la ubicación y todas las especificaciones del proyecto.
+
+    Cada especificación se renderiza una sola vez como fragmento y se reutiliza
+    mientras no cambien su contenido ni sus imágenes; aquí solo se unen los
+    fragmentos sobre la plantilla.
+
+    Args:
+        proyecto: Instancia del modelo Proyecto
+        encabezado: Valores del encabezado (proyecto, solicitante, servicio, revision, fecha)
+        al_avanzar: Función llamada con la cantidad de especificaciones agregadas
+
+    Returns:
+        bytes: Contenido del archivo .docx
+    """
+    # Obtener todas las especificaciones ordenadas
+    especificaciones = list(
+        proyecto.especificaciones.prefetch_related('imagenes').order_by('orden', '-fecha_creacion')
+    )
+    
+    # Obtener la primera ubicación del proyecto
+    ubicacion = proyecto.ubicaciones.first()
+    
+    # Crear directorio si no existe
+    os.makedirs(os.path.dirname(TEMPLATE_WORD_PATH), exist_ok=True)
+    
+    doc = _nuevo_documento()
+    if os.path.exists(TEMPLATE_WORD_PATH):
+        # Reemplazar placeholders en el encabezado con datos del proyecto (o valores personalizados)
+        replace_header_placeholders(
+            doc, 
+            proyecto,
+            proyecto_nombre=encabezado.get('proyecto'),
+            solicitante=encabezado.get('solicitante'),
+            servicio=encabezado.get('servicio'),
+            revision=encabezado.get('revision') or "1",
+            fecha=encabezado.get('fecha')
+        )
+    
+    # Título del documento
+    title = doc.add_heading(proyecto.nombre, level=1)
+    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    
+    doc.add_paragraph()  # Espacio
+    
+    # Agregar contenido de ubicación al principio si existe
+    if ubicacion is not None:
+        if ubicacion.contenido:
+            # Título de sección de ubicación
+            ubicacion_heading = doc.add_heading("Ubicación del Sitio", level=2)
+            
+            # Filtrar Plus Codes del contenido antes de procesarlo
+            contenido_limpio = filtrar_plus_codes(ubicacion.contenido)
+            
+            # Verificar si hay imágenes en el contenido markdown limpio
+            # Si hay imágenes en el markdown, asumimos que la imagen del mapa ya está incluida
+            imagen_en_markdown = False
+            if contenido_limpio:
+                contenido_html_temp = markdown(contenido_limpio, extensions=['extra'])
+                soup_temp = BeautifulSoup(contenido_html_temp, 'html.parser')
+                imagenes_en_markdown = soup_temp.find_all('img')
+                if imagenes_en_markdown:
+                    # Si hay al menos una imagen en el markdown, asumimos que es la del mapa
+                    imagen_en_markdown = True
+            
+            # Procesar el contenido markdown de la ubicación, omitiendo títulos específicos
+            aplicar_instrucciones(doc, markdown_a_instrucciones(
+                contenido_limpio,
+                settings.MEDIA_ROOT,
+                omitir_titulos=['Coordenadas del Sitio', 'Descripción de Acceso']
+            ))
+            
+            # Agregar imagen del mapa solo si existe y NO está ya en el contenido markdown
+            # (si el markdown ya tiene imágenes, no agregar la imagen manualmente)
+            if ubicacion.mapa_imagen and ubicacion.mapa_imagen.name and not imagen_en_markdown:
+                try:
+                    mapa_path = ubicacion.mapa_imagen.path
+                    if os.path.exists(mapa_path):
+                        doc.add_paragraph()
+                        para = doc.add_paragraph()
+                        para.alignment = WD_ALIGN_PARAGRAPH.CENTER
+                        
+                        run = para.add_run()
+                        run.add_picture(mapa_path, width=Inches(ancho_imagen(mapa_path, *MAX_IMAGEN_CONTENIDO)))
+                        
+                        # Agregar pie de figura
+                        _agregar_pie(doc, f"Mapa satelital del sitio {ubicacion.nombre}")
+                except Exception as e:
+                    # Si hay error al agregar la imagen, continuar sin ella
+                    pass
+            
+            # Espacio después de la ubicación
+            doc.add_paragraph()
+            doc.add_paragraph('─' * 50)
+            doc.add_paragraph()
+    
+    # Buscar los fragmentos guardados y convertir en paralelo las especificaciones que no tienen
+    version_plantilla = _version_plantilla()
+    preparadas = []
+    for especificacion in especificaciones:
+        # Lista materializada: el prefetch de imágenes evita consultas adicionales
+        imagenes = list(especificacion.imagenes.all())
+        clave = clave_fragmento(especificacion, imagenes, VERSION_FRAGMENTO, version_plantilla)
+        preparadas.append((especificacion, clave, _argumentos_especificacion(especificacion, imagenes)))
+    
+    # Una sola consulta para los fragmentos de todas las especificaciones
+    guardados = buscar_fragmentos([clave for _, clave, _ in preparadas])
+    preparadas = [
+        (especificacion, clave, guardados.get(clave), argumentos)
+        for especificacion, clave, argumentos in preparadas
+    ]
+    
+    faltantes = [(i, argumentos) for i, (_, _, contenido, argumentos) in enumerate(preparadas) if contenido is None]
+    futuros = dict(zip(
+        [i for i, _ in faltantes],
+        _convertir_en_paralelo([argumentos for _, argumentos in faltantes])
+    ))
+    
+    # Agregar cada especificación (el armado con python-docx se hace en este hilo, en orden)
+    ids_dibujos = count(doc.part.next_id)
+    nuevos = []
+    for i, (especificacion, clave, contenido, argumentos) in enumerate(preparadas):
+        if contenido is None:
+            contenido = renderizar_fragmento(_instrucciones(futuros[i], argumentos))
+            nuevos.append((clave, especificacion, contenido))
+        _insertar_fragmento(doc, contenido, ids_dibujos)
+        
+        # Espacio entre especificaciones
+        doc.add_paragraph()
+        doc.add_paragraph('─' * 50)
+        doc.add_paragraph()
+        
+        if al_avanzar is not None:
+            al_avanzar(i + 1)
+    
+    # Los fragmentos nuevos se guardan juntos, con una cantidad fija de consultas
+    guardar_fragmentos(nuevos)
+    
+    # Guardar el documento en memoria
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
@@ -0,0 +1,112 @@
+import hashlib
+import json
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models import F
+from django.utils import timezone
+
+from esp_web.models import FragmentoWord
+from main.utils.cache_lru import registrar_insercion
+
+from rich.console import Console
+console = Console()
+
+# Cantidad máxima de fragmentos guardados; al superarla se eliminan los usados hace más tiempo
+ESP_WEB_FRAGMENTOS_WORD_MAX = getattr(settings, 'ESP_WEB_FRAGMENTOS_WORD_MAX', 3000)
+
+
+def clave_fragmento(especificacion, imagenes: List, version: int, version_plantilla: Optional[float]) -> str:
+    """
+    Clave del fragmento de una especificación: hash de su contenido y del conjunto
+    de imágenes (ID, archivos, medidas y descripción, en el orden en que se insertan).
+    """
+    datos = json.dumps({
+        'version': version,
+        'plantilla': version_plantilla,
+        'contenido': especificacion.contenido or '',
+        'imagenes': [
+            [imagen.pk, imagen.imagen.name, imagen.imagen_exportacion.name or '', imagen.ancho, imagen.alto, imagen.descripcion]
+            for imagen in imagenes
+        ],
+    }, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(datos.encode('utf-8')).hexdigest()
+
+
+def buscar_fragmentos(claves: List[str]) -> Dict[str, bytes]:
+    """
+    Retorna los archivos .docx de los fragmentos guardados con las claves indicadas,
+    con una sola consulta para todo el documento. Las claves sin fragmento no se incluyen.
+    """
+    encontrados = {}
+    usados = []
+    for fragmento in FragmentoWord.objects.filter(clave__in=set(claves)):
+        try:
+            with fragmento.archivo.open('rb') as archivo:
+                encontrados[fragmento.clave] = archivo.read()
+        except (FileNotFoundError, ValueError):
+            # El archivo ya no está en el almacenamiento: descartar la entrada
+            fragmento.delete()
+            continue
+        usados.append(fragmento.pk)
+
+    if usados:
+        FragmentoWord.objects.filter(pk__in=usados).update(
+            aciertos=F('aciertos') + 1, fecha_ultimo_uso=timezone.now()
+        )
+    return encontrados
+
+
+def guardar_fragmentos(nuevos: List[Tuple[str, object, bytes]]) -> None:
+    """
+    Guarda los fragmentos renderizados en una exportación, dados como tuplas
+    (clave, especificación, contenido), con la misma cantidad de consultas sin
+    importar cuántos sean, y elimina los más antiguos si se supera el máximo.
+    """
+    if not nuevos:
+        return
+
+    existentes = set(
+        FragmentoWord.objects.filter(clave__in={clave for clave, _, _ in nuevos}).values_list('clave', flat=True)
+    )
+    fragmentos = []
+    for clave, especificacion, contenido in nuevos:
+        if clave in existentes:
+            continue
+        # Dos especificaciones iguales del mismo proyecto comparten el fragmento
+        existentes.add(clave)
+        fragmento = FragmentoWord(clave=clave, especificacion=especificacion)
+        try:
+            fragmento.archivo.save(f'{clave}.docx', ContentFile(contenido), save=False)
+        except Exception as e:
+            console.print(f"[fragmentos_word] Error al guardar el fragmento: {str(e)}", style="bold red")
+            continue
+        fragmentos.append(fragmento)
+
+    if not fragmentos:
+        return
+
+    try:
+        FragmentoWord.objects.bulk_create(fragmentos, ignore_conflicts=True)
+    except Exception as e:
+        console.print(f"[fragmentos_word] Error al guardar los fragmentos: {str(e)}", style="bold red")
+        for fragmento in fragmentos:
+            fragmento.archivo.delete(save=False)
+        return
+
+    # Otra exportación pudo guardar los mismos fragmentos al mismo tiempo: eliminar
+    # los archivos que no quedaron registrados
+    registrados = set(
+        FragmentoWord.objects.filter(clave__in=[f.clave for f in fragmentos]).values_list('archivo', flat=True)
+    )
+    for fragmento in fragmentos:
+        if fragmento.archivo.name not in registrados:
+            fragmento.archivo.delete(save=False)
+
+    registrar_insercion(
+        FragmentoWord,
+        ESP_WEB_FRAGMENTOS_WORD_MAX,
+        al_eliminar=lambda sobrante: sobrante.archivo.delete(save=False),
+        cantidad=len(fragmentos)
+    )
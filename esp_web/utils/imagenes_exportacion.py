@@ -0,0 +1,49 @@
+from io import BytesIO
+from typing import Optional
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image
+
+from esp_web.utils.markdown_word import DPI_PREDETERMINADO, MAX_IMAGEN_GALERIA, ancho_en_pulgadas
+
+# Resolución (puntos por pulgada) de las copias de las imágenes que se insertan en el documento Word
+ESP_WEB_IMAGEN_EXPORTACION_DPI = getattr(settings, 'ESP_WEB_IMAGEN_EXPORTACION_DPI', 200)
+
+
+def ancho_pulgadas(imagen) -> Optional[float]:
+    """
+    Ancho con el que una EspecificacionImagen se inserta en la galería del
+    documento Word (None si no tiene medidas guardadas).
+    """
+    if not imagen.ancho or not imagen.alto:
+        return None
+    return ancho_en_pulgadas(imagen.ancho, imagen.alto, DPI_PREDETERMINADO, *MAX_IMAGEN_GALERIA)
+
+
+def preparar_para_exportacion(imagen, img) -> None:
+    """
+    Guarda en una EspecificacionImagen (sin llamar a save) las medidas de la imagen
+    y una copia reducida al tamaño con el que se imprime en el documento Word (a
+    ESP_WEB_IMAGEN_EXPORTACION_DPI). Si la imagen ya es más chica, no se crea la
+    copia y se usa la original.
+
+    Args:
+        imagen: Instancia de EspecificacionImagen
+        img: Imagen de PIL ya convertida a RGB
+    """
+    imagen.ancho, imagen.alto = img.size
+    if imagen.imagen_exportacion:
+        imagen.imagen_exportacion.delete(save=False)
+
+    ancho_px = round(ancho_pulgadas(imagen) * ESP_WEB_IMAGEN_EXPORTACION_DPI)
+    if ancho_px >= img.width:
+        return
+
+    copia = img.resize(
+        (ancho_px, max(1, round(img.height * ancho_px / img.width))),
+        Image.Resampling.LANCZOS
+    )
+    output = BytesIO()
+    copia.save(output, format='JPEG', quality=85, optimize=True)
+    imagen.imagen_exportacion.save('imagen.jpg', ContentFile(output.getvalue()), save=False)
@@ -0,0 +1,342 @@
+"""
+Conversión de Markdown a instrucciones para armar un documento Word.
+
+Las instrucciones son listas de diccionarios (párrafos, títulos, pies de figura,
+tablas, imágenes y galerías) que solo contienen tipos básicos, de modo que la
+conversión puede ejecutarse en otro proceso. python-docx se usa únicamente al
+aplicarlas (ver esp_web.utils.exportar_word.aplicar_instrucciones).
+
+Este módulo no depende de Django para poder importarse en los procesos del pool.
+"""
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from markdown import markdown
+from bs4 import BeautifulSoup
+from PIL import Image
+
+# Ancho y alto máximos (pulgadas) de las imágenes del contenido y de la galería
+MAX_IMAGEN_CONTENIDO = (5.0, 4.0)
+MAX_IMAGEN_GALERIA = (3.0, 3.0)
+
+
+# Resolución que se asume cuando la imagen no la indica
+DPI_PREDETERMINADO = 96
+
+
+def ancho_en_pulgadas(ancho_px, alto_px, dpi, max_width_inches, max_height_inches):
+    """Ancho en pulgadas de una imagen de ancho_px x alto_px, respetando sus proporciones y los máximos"""
+    width_inches = ancho_px / dpi
+    height_inches = alto_px / dpi
+
+    if width_inches > max_width_inches or height_inches > max_height_inches:
+        ratio = min(max_width_inches / width_inches, max_height_inches / height_inches)
+        width_inches *= ratio
+
+    return width_inches
+
+
+def ancho_imagen(imagen_path, max_width_inches, max_height_inches):
+    """Ancho en pulgadas con el que se inserta la imagen, leyendo sus medidas del archivo"""
+    img = Image.open(imagen_path)
+
+    try:
+        dpi = img.info.get('dpi', (DPI_PREDETERMINADO, DPI_PREDETERMINADO))[0]
+    except:
+        dpi = DPI_PREDETERMINADO
+
+    return ancho_en_pulgadas(img.width, img.height, dpi, max_width_inches, max_height_inches)
+
+
+def _es_pie_figura(texto):
+    return bool(texto) and ('Figura' in texto or 'figura' in texto)
+
+
+def _parrafo(runs=None, estilo=None, centrado=False) -> Dict:
+    return {'tipo': 'parrafo', 'runs': runs or [], 'estilo': estilo, 'centrado': centrado}
+
+
+def _pie(texto) -> Dict:
+    return {'tipo': 'pie', 'texto': texto}
+
+
+def _runs(elem) -> List[Dict]:
+    """Runs con formato (negritas, cursivas, etc.) de un elemento y sus hijos"""
+    if isinstance(elem, str):
+        return [{'texto': str(elem)}]
+
+    if not hasattr(elem, 'name') or elem.name is None:
+        text = str(elem)
+        return [{'texto': text}] if text and text.strip() else []
+
+    tag_name = elem.name.lower() if elem.name else None
+    if not tag_name:
+        return []
+
+    runs = []
+    # Procesar según el tipo de elemento
+    if tag_name in ['strong', 'b', 'em', 'i']:
+        # Negritas o cursivas (solo sobre el texto directo, como en Word)
+        formato = 'negrita' if tag_name in ['strong', 'b'] else 'cursiva'
+        for child in elem.children:
+            if isinstance(child, str):
+                runs.append({'texto': str(child), formato: True})
+            elif hasattr(child, 'name') and child.name:
+                runs.extend(_runs(child))
+            else:
+                text = str(child).strip()
+                if text:
+                    runs.append({'texto': text, formato: True})
+    elif tag_name == 'code':
+        text = elem.get_text()
+        if text:
+            runs.append({'texto': text, 'fuente': 'Courier New'})
+    elif tag_name == 'a':
+        href = elem.get('href', '')
+        text = elem.get_text()
+        if text:
+            runs.append({'texto': text if not href else f"{text} ({href})", 'enlace': True})
+    elif tag_name in ['u']:
+        text = elem.get_text()
+        if text:
+            runs.append({'texto': text, 'subrayado': True})
+    else:
+        for child in elem.children:
+            runs.extend(_runs(child))
+    return runs
+
+
+def _runs_hijos(elem) -> List[Dict]:
+    runs = []
+    for child in elem.children:
+        runs.extend(_runs(child))
+    return runs
+
+
+def _ruta_imagen(src, media_root):
+    """Ruta del archivo de una imagen a partir del src del Markdown"""
+    # Si es una URL relativa (media), convertir a ruta de archivo
+    if src.startswith('/media/'):
+        # Remover /media/ del inicio
+        return os.path.join(media_root, src.replace('/media/', ''))
+    if src.startswith('media/'):
+        return os.path.join(media_root, src.replace('media/', ''))
+    # Intentar como ruta absoluta o relativa
+    if not os.path.isabs(src):
+        return os.path.join(media_root, src)
+    return src
+
+
+def markdown_a_instrucciones(contenido_markdown, media_root, omitir_titulos=None) -> List[Dict]:
+    """
+    Convierte contenido Markdown en instrucciones para el documento Word.
+
+    Args:
+        contenido_markdown: Contenido en formato markdown
+        media_root: Directorio de archivos subidos (para las imágenes del contenido)
+        omitir_titulos: Lista de títulos a omitir (por defecto, None)
+
+    Returns:
+        List[Dict]: Instrucciones en el orden en que se agregan al documento
+    """
+    instrucciones = []
+    if not contenido_markdown or not contenido_markdown.strip():
+        return instrucciones
+
+    # Convertir markdown a HTML y luego procesar
+    contenido_html = markdown(contenido_markdown, extensions=['extra'])
+    soup = BeautifulSoup(contenido_html, 'html.parser')
+
+    # Lista de títulos a omitir (si no se proporciona, usar lista vacía)
+    if omitir_titulos is None:
+        omitir_titulos = []
+
+    # Función recursiva para procesar elementos
+    def process_element(elem):
+        if not hasattr(elem, 'name') or elem.name is None:
+            text = str(elem).strip()
+            if text and text not in ['\n', '\r', '\t', '']:
+                clean_text = ' '.join(text.split())
+                if clean_text:
+                    instrucciones.append(_parrafo([{'texto': clean_text}]))
+            return
+
+        tag_name = elem.name.lower() if elem.name else None
+        if not tag_name:
+            return
+
+        # Detectar headings (h1-h6)
+        if tag_name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
+            # Solo agregar el heading si NO está en la lista de omitir
+            if elem.get_text().strip() not in omitir_titulos:
+                # Limitar el nivel máximo a 2 (heading 2)
+                level = min(int(tag_name[1]), 2)
+                instrucciones.append({'tipo': 'titulo', 'nivel': level, 'runs': _runs_hijos(elem)})
+
+        # Detectar párrafos
+        elif tag_name == 'p':
+            # Verificar si este párrafo ya fue procesado (marcado con _processed)
+            if elem.get('_processed'):
+                return
+
+            # Verificar si este párrafo contiene una imagen
+            img_in_p = elem.find('img')
+            if img_in_p:
+                # Si hay una imagen en el párrafo, procesarla primero
+                process_element(img_in_p)
+                # Luego procesar el resto del contenido del párrafo (si hay texto después de la imagen)
+                for child in elem.children:
+                    if child != img_in_p and child.name != 'img':
+                        if isinstance(child, str):
+                            text = child.strip()
+                            if text:
+                                instrucciones.append(_parrafo([{'texto': text}]))
+                        elif hasattr(child, 'name') and child.name:
+                            # Si es texto en cursiva que parece un pie de figura, agregarlo como pie
+                            if child.name.lower() in ['em', 'i'] and _es_pie_figura(child.get_text().strip()):
+                                instrucciones.append(_pie(child.get_text().strip()))
+                            else:
+                                instrucciones.append(_parrafo(_runs(child)))
+            else:
+                # Verificar si este párrafo es un pie de figura (texto en cursiva que contiene "Figura")
+                em_or_i = elem.find(['em', 'i'])
+                if em_or_i:
+                    text = em_or_i.get_text().strip()
+                    if _es_pie_figura(text):
+                        # Es un pie de figura si el elemento anterior es una imagen (ya procesada)
+                        prev_elem = elem.find_previous_sibling(['p', 'img'])
+                        if prev_elem and (prev_elem.name == 'img' or prev_elem.find('img')):
+                            instrucciones.append(_pie(text))
+                            return
+
+                # Procesamiento normal del párrafo
+                instrucciones.append(_parrafo(_runs_hijos(elem)))
+
+        # Detectar listas
+        elif tag_name in ['ul', 'ol']:
+            estilo = 'List Bullet' if tag_name == 'ul' else 'List Number'
+            for li in elem.find_all('li', recursive=False):
+                instrucciones.append(_parrafo(_runs_hijos(li), estilo=estilo))
+
+        elif tag_name == 'li':
+            instrucciones.append(_parrafo(_runs_hijos(elem), estilo='List Bullet'))
+
+        elif tag_name == 'br':
+            instrucciones.append(_parrafo())
+
+        # Detectar tablas
+        elif tag_name == 'table':
+            rows = elem.find_all('tr', recursive=False)
+            if rows:
+                # Contar columnas de la primera fila
+                num_cols = len(rows[0].find_all(['td', 'th'], recursive=False))
+                if num_cols > 0:
+                    filas = [
+                        [_runs_hijos(cell) for cell in row.find_all(['td', 'th'], recursive=False)[:num_cols]]
+                        for row in rows
+                    ]
+                    instrucciones.append({'tipo': 'tabla', 'columnas': num_cols, 'filas': filas})
+
+        # Detectar imágenes
+        elif tag_name == 'img':
+            src = elem.get('src', '')
+            alt = elem.get('alt', '')
+            if src:
+                try:
+                    imagen_path = _ruta_imagen(src, media_root)
+                    if os.path.exists(imagen_path):
+                        instrucciones.append({
+                            'tipo': 'imagen',
+                            'ruta': imagen_path,
+                            'ancho': ancho_imagen(imagen_path, *MAX_IMAGEN_CONTENIDO),
+                            'alt': alt,
+                        })
+
+                        # Buscar si hay un párrafo siguiente con texto en cursiva que contenga "Figura"
+                        # Primero buscar en el mismo párrafo (si la imagen está dentro de un párrafo)
+                        parent_p = elem.find_parent('p')
+                        if parent_p:
+                            # Buscar texto en cursiva después de la imagen en el mismo párrafo
+                            em_or_i_after = None
+                            for sibling in elem.next_siblings:
+                                if hasattr(sibling, 'name'):
+                                    if sibling.name in ['em', 'i']:
+                                        em_or_i_after = sibling
+                                        break
+                                    elif sibling.name == 'p':
+                                        break
+
+                            if em_or_i_after and _es_pie_figura(em_or_i_after.get_text().strip()):
+                                instrucciones.append(_pie(em_or_i_after.get_text().strip()))
+                                return
+
+                            # Si no está en el mismo párrafo, buscar en el siguiente párrafo hermano
+                            next_p = parent_p.find_next_sibling('p')
+                        else:
+                            # Si la imagen no está dentro de un párrafo, buscar el siguiente elemento hermano
+                            next_p = elem.find_next_sibling('p')
+
+                        if next_p:
+                            em_or_i = next_p.find(['em', 'i'])
+                            if em_or_i and _es_pie_figura(em_or_i.get_text().strip()):
+                                instrucciones.append(_pie(em_or_i.get_text().strip()))
+                                # Marcar este elemento para que no se procese de nuevo
+                                next_p['_processed'] = True
+                                return
+
+                        # Si no hay pie de figura siguiente, usar el texto alternativo si existe
+                        if alt:
+                            instrucciones.append(_pie(alt))
+                except Exception as e:
+                    # Si hay error, agregar texto alternativo
+                    instrucciones.append(_parrafo([{'texto': f'[Imagen: {alt if alt else "No disponible"}]'}], centrado=True))
+
+        else:
+            if hasattr(elem, 'children') and list(elem.children):
+                for child in elem.children:
+                    process_element(child)
+            else:
+                if elem.get_text().strip():
+                    instrucciones.append(_parrafo(_runs(elem)))
+
+    # Procesar todos los hijos directos del soup para mantener el orden
+    for element in soup.children:
+        if hasattr(element, 'name') and element.name:
+            process_element(element)
+        elif isinstance(element, str) and element.strip():
+            # Procesar texto suelto
+            instrucciones.append(_parrafo([{'texto': element.strip()}]))
+
+    return instrucciones
+
+
+def preparar_especificacion(contenido_markdown, imagenes: Sequence[Tuple[str, str, Optional[float]]], media_root) -> List[Dict]:
+    """
+    Instrucciones de una especificación completa: su contenido y la galería de
+    imágenes. Se ejecuta en el pool de procesos de la exportación.
+
+    Args:
+        contenido_markdown: Contenido de la especificación
+        imagenes: (ruta, descripción, ancho en pulgadas) de cada imagen de la galería,
+            en orden. Si el ancho es None se calcula abriendo el archivo.
+        media_root: Directorio de archivos subidos
+
+    Returns:
+        List[Dict]: Instrucciones para renderizar el fragmento
+    """
+    instrucciones = markdown_a_instrucciones(contenido_markdown, media_root)
+
+    if imagenes:
+        galeria = []
+        for ruta, descripcion, ancho in imagenes:
+            # Las imágenes cuyo archivo no existe dejan la celda vacía
+            imagen = {'ruta': ruta, 'existe': os.path.exists(ruta), 'ancho': ancho, 'descripcion': descripcion}
+            if imagen['existe'] and ancho is None:
+                try:
+                    imagen['ancho'] = ancho_imagen(ruta, *MAX_IMAGEN_GALERIA)
+                except Exception:
+                    pass
+            galeria.append(imagen)
+        instrucciones.append({'tipo': 'galeria', 'imagenes': galeria})
+
+    return instrucciones
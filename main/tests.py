@@ -1,4 +1,89 @@
+from datetime import timedelta
+
 from django.test import TestCase
+from django.utils import timezone
+
+from embeddings.models import EmbeddingCache, TrabajoIngesta
+from main.utils.cache_lru import recortar_cache
+from main.utils.segundo_plano import ColaTrabajos
+
+
+class RecortarCacheTests(TestCase):
+    def test_elimina_las_entradas_usadas_hace_mas_tiempo(self):
+        ahora = timezone.now()
+        for i in range(5):
+            entrada = EmbeddingCache.objects.create(clave=f'clave-{i}', modelo='modelo', vector=[0.0])
+            # ultimo_uso usa auto_now: fijarlo con update
+            EmbeddingCache.objects.filter(pk=entrada.pk).update(ultimo_uso=ahora - timedelta(minutes=i))
+
+        eliminadas = recortar_cache(EmbeddingCache, 3, campo_uso='ultimo_uso')
+
+        self.assertEqual(eliminadas, 2)
+        self.assertEqual(
+            sorted(EmbeddingCache.objects.values_list('clave', flat=True)),
+            ['clave-0', 'clave-1', 'clave-2']
+        )
+
+    def test_no_elimina_nada_si_no_supera_el_maximo(self):
+        EmbeddingCache.objects.create(clave='clave', modelo='modelo', vector=[0.0])
+
+        self.assertEqual(recortar_cache(EmbeddingCache, 3, campo_uso='ultimo_uso'), 0)
+        self.assertEqual(EmbeddingCache.objects.count(), 1)
+
+
+class ColaTrabajosTests(TestCase):
+    def setUp(self):
+        self.ejecutados = []
+        self.cola = ColaTrabajos(
+            TrabajoIngesta, self._ejecutar, hilos=1, nombre_hilos='prueba',
+            en_segundo_plano=False, reinicio={'documentos_procesados': 0}
+        )
+
+    def _ejecutar(self, trabajo_id):
+        if not self.cola.tomar(trabajo_id):
+            return False
+        self.ejecutados.append(trabajo_id)
+        return True
+
+    def test_cada_trabajo_pendiente_se_ejecuta_una_vez(self):
+        primero = TrabajoIngesta.objects.create(categoria='Pisos')
+        segundo = TrabajoIngesta.objects.create(categoria='Pisos')
+
+        self.assertEqual(self.cola.procesar_pendientes(), 2)
+        self.assertEqual(self.cola.procesar_pendientes(), 0)
+        self.assertFalse(self._ejecutar(primero.pk))
+        self.assertEqual(self.ejecutados, [primero.pk, segundo.pk])
+
+    def test_reencola_solo_los_trabajos_sin_avance(self):
+        detenido = TrabajoIngesta.objects.create(
+            categoria='Pisos', estado=TrabajoIngesta.ESTADO_EN_PROCESO, documentos_procesados=3
+        )
+        activo = TrabajoIngesta.objects.create(categoria='Pisos', estado=TrabajoIngesta.ESTADO_EN_PROCESO)
+        TrabajoIngesta.objects.filter(pk=detenido.pk).update(fecha_actualizacion=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(self.cola.reencolar_interrumpidos(30), 1)
+
+        detenido.refresh_from_db()
+        self.assertEqual(detenido.estado, TrabajoIngesta.ESTADO_PENDIENTE)
+        self.assertEqual(detenido.documentos_procesados, 0)
+        activo.refresh_from_db()
+        self.assertEqual(activo.estado, TrabajoIngesta.ESTADO_EN_PROCESO)
+
+    def test_un_trabajo_que_falla_queda_como_error(self):
+        def fallar(trabajo_id):
+            self.cola.tomar(trabajo_id)
+            raise RuntimeError('Sin conexión')
+
+        self.cola.ejecutar = fallar
+        self.cola.campos_error = lambda trabajo_id, e: {'errores': [{'archivos': [], 'error': str(e)}]}
+        fallido = TrabajoIngesta.objects.create(categoria='Pisos')
+        siguiente = TrabajoIngesta.objects.create(categoria='Pisos')
 
-# Create your tests here.
+        # Un trabajo fallido no detiene el resto ni la ejecución en el hilo
+        self.assertEqual(self.cola.procesar_pendientes(), 2)
+        self.cola._ejecutar_en_hilo(fallido.pk)
 
+        for trabajo in (fallido, siguiente):
+            trabajo.refresh_from_db()
+            self.assertEqual(trabajo.estado, TrabajoIngesta.ESTADO_ERROR)
+            self.assertEqual(trabajo.errores, [{'archivos': [], 'error': 'Sin conexión'}])
@@ -0,0 +1,59 @@
+import threading
+from collections import Counter
+from typing import Callable, Optional
+
+from django.conf import settings
+
+# Cantidad de inserciones en una caché entre cada recorte de sus entradas menos usadas
+CACHE_RECORTE_CADA = getattr(settings, 'CACHE_RECORTE_CADA', 100)
+
+_inserciones = Counter()
+_inserciones_lock = threading.Lock()
+
+
+def recortar_cache(modelo, maximo: int, campo_uso: str = 'fecha_ultimo_uso',
+                   al_eliminar: Optional[Callable] = None) -> int:
+    """
+    Elimina las entradas de una caché en base de datos usadas hace más tiempo
+    cuando superan `maximo`.
+
+    Args:
+        modelo: Modelo de la caché
+        maximo: Cantidad de entradas que se conservan
+        campo_uso: Campo con la fecha del último uso (debe tener índice)
+        al_eliminar: Función opcional llamada con cada entrada antes de eliminarla,
+            por ejemplo para borrar su archivo
+
+    Returns:
+        int: Cantidad de entradas eliminadas
+    """
+    # Fecha de la primera entrada que queda fuera del máximo (una sola fila)
+    limite = list(
+        modelo.objects.order_by(f'-{campo_uso}').values_list(campo_uso, flat=True)[maximo:maximo + 1]
+    )
+    if not limite:
+        return 0
+
+    sobrantes = modelo.objects.filter(**{f'{campo_uso}__lte': limite[0]})
+    if al_eliminar is not None:
+        for entrada in sobrantes.iterator():
+            al_eliminar(entrada)
+    eliminadas, _ = sobrantes.delete()
+    return eliminadas
+
+
+def registrar_insercion(modelo, maximo: int, campo_uso: str = 'fecha_ultimo_uso',
+                        al_eliminar: Optional[Callable] = None, cantidad: int = 1) -> int:
+    """
+    Cuenta las entradas agregadas a una caché y la recorta cada CACHE_RECORTE_CADA
+    inserciones, en lugar de revisar su tamaño en cada escritura.
+
+    Returns:
+        int: Cantidad de entradas eliminadas (0 si no correspondía recortar)
+    """
+    with _inserciones_lock:
+        _inserciones[modelo] += cantidad
+        if _inserciones[modelo] < CACHE_RECORTE_CADA:
+            return 0
+        _inserciones[modelo] = 0
+    return recortar_cache(modelo, maximo, campo_uso, al_eliminar)
@@ -0,0 +1,179 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Callable, Dict, Optional
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from rich.console import Console
+console = Console()
+
+class ColaTrabajos:
+    """
+    Trabajos guardados en un modelo que se ejecutan fuera de la solicitud HTTP,
+    sin broker externo: en un pool de hilos del mismo proceso web o, si está
+    deshabilitado, con un comando de management (ver ComandoProcesarCola).
+
+    El modelo debe tener los campos `estado` y `fecha_actualizacion` y las
+    constantes ESTADO_PENDIENTE, ESTADO_EN_PROCESO y ESTADO_ERROR.
+    """
+
+    def __init__(self, modelo, ejecutar: Callable[[int], bool], hilos: int, nombre_hilos: str,
+                 en_segundo_plano: bool = True, reinicio: Optional[Dict] = None,
+                 campos_error: Optional[Callable[[int, Exception], Dict]] = None):
+        """
+        Args:
+            modelo: Modelo de los trabajos
+            ejecutar: Función que recibe el ID de un trabajo, lo toma con `tomar` y lo
+                ejecuta; retorna False si otro proceso ya lo había tomado
+            hilos: Cantidad de trabajos que se ejecutan en paralelo dentro de cada proceso
+            nombre_hilos: Prefijo del nombre de los hilos del pool
+            en_segundo_plano: Si es False, los trabajos quedan pendientes hasta que los
+                procese el comando de management
+            reinicio: Campos de progreso que se reinician al reencolar un trabajo interrumpido
+            campos_error: Función opcional que recibe el ID del trabajo y la excepción, y
+                retorna los campos con los que se registra el error en el trabajo
+        """
+        self.modelo = modelo
+        self.ejecutar = ejecutar
+        self.hilos = hilos
+        self.nombre_hilos = nombre_hilos
+        self.en_segundo_plano = en_segundo_plano
+        self.reinicio = reinicio or {}
+        self.campos_error = campos_error
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    def _obtener_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.hilos, thread_name_prefix=self.nombre_hilos)
+            return self._executor
+
+    def encolar(self, trabajo_id: int) -> None:
+        """Envía un trabajo ya creado al pool de hilos (si está habilitado)."""
+        if self.en_segundo_plano:
+            # Esperar a que el trabajo esté confirmado en la base de datos antes de ejecutarlo
+            transaction.on_commit(lambda: self._obtener_executor().submit(self._ejecutar_en_hilo, trabajo_id))
+
+    def _ejecutar_en_hilo(self, trabajo_id: int) -> None:
+        try:
+            self._ejecutar(trabajo_id)
+        finally:
+            # Cada hilo tiene su propia conexión; cerrarla al terminar
+            close_old_connections()
+
+    def _ejecutar(self, trabajo_id: int) -> bool:
+        """
+        Ejecuta un trabajo y, si falla, lo marca como error con el mensaje de la
+        excepción, para que no quede en proceso indefinidamente.
+
+        Returns:
+            bool: False si el trabajo no estaba pendiente (otro proceso lo tomó)
+        """
+        try:
+            return self.ejecutar(trabajo_id)
+        except Exception as e:
+            console.print(f"[red]{self.nombre_hilos} #{trabajo_id}: error: {str(e)}[/red]")
+            campos = self.campos_error(trabajo_id, e) if self.campos_error is not None else {}
+            self.modelo.objects.filter(
+                pk=trabajo_id, estado=self.modelo.ESTADO_EN_PROCESO
+            ).update(estado=self.modelo.ESTADO_ERROR, fecha_actualizacion=timezone.now(), **campos)
+            return True
+
+    def tomar(self, trabajo_id: int) -> bool:
+        """
+        Pasa un trabajo pendiente a en proceso de forma atómica, para que no lo
+        ejecuten dos procesos.
+
+        Returns:
+            bool: False si el trabajo no estaba pendiente
+        """
+        return bool(self.modelo.objects.filter(
+            pk=trabajo_id, estado=self.modelo.ESTADO_PENDIENTE
+        ).update(estado=self.modelo.ESTADO_EN_PROCESO, fecha_actualizacion=timezone.now()))
+
+    def reencolar_interrumpidos(self, minutos: int) -> int:
+        """
+        Vuelve a dejar como pendientes los trabajos que quedaron en proceso sin
+        avanzar (por ejemplo, si el worker que los ejecutaba fue reiniciado).
+
+        Args:
+            minutos: Minutos sin actualización para considerar un trabajo interrumpido
+
+        Returns:
+            int: Cantidad de trabajos reencolados
+        """
+        limite = timezone.now() - timedelta(minutes=minutos)
+        return self.modelo.objects.filter(
+            estado=self.modelo.ESTADO_EN_PROCESO, fecha_actualizacion__lt=limite
+        ).update(estado=self.modelo.ESTADO_PENDIENTE, **self.reinicio)
+
+    def procesar_pendientes(self) -> int:
+        """
+        Ejecuta, en orden de creación, todos los trabajos pendientes.
+
+        Returns:
+            int: Cantidad de trabajos ejecutados
+        """
+        ejecutados = 0
+        pendientes = self.modelo.objects.filter(
+            estado=self.modelo.ESTADO_PENDIENTE
+        ).order_by('fecha_creacion').values_list('pk', flat=True)
+        for trabajo_id in list(pendientes):
+            if self._ejecutar(trabajo_id):
+                ejecutados += 1
+        return ejecutados
+
+
+class ComandoProcesarCola(BaseCommand):
+    """
+    Comando de management que procesa los trabajos pendientes de una ColaTrabajos
+    (worker local, sin broker externo). Las subclases definen `help`, `trabajos`
+    (nombre en plural para los mensajes) y `obtener_cola`.
+    """
+
+    trabajos = 'trabajos'
+    minutos_sin_avance = 30
+
+    def obtener_cola(self) -> ColaTrabajos:
+        raise NotImplementedError
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--una-vez',
+            action='store_true',
+            help='Procesa los trabajos pendientes y termina, en lugar de seguir esperando nuevos',
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=int,
+            default=5,
+            help='Segundos entre cada revisión de trabajos pendientes (default: 5)',
+        )
+        parser.add_argument(
+            '--reintentar-interrumpidos',
+            type=int,
+            default=self.minutos_sin_avance,
+            help=f'Minutos sin avance tras los cuales un trabajo en proceso se vuelve a encolar (default: {self.minutos_sin_avance})',
+        )
+
+    def handle(self, *args, **options):
+        cola = self.obtener_cola()
+        self.stdout.write(f'Esperando {self.trabajos}...')
+
+        while True:
+            reencolados = cola.reencolar_interrumpidos(options['reintentar_interrumpidos'])
+            if reencolados:
+                self.stdout.write(self.style.WARNING(f'{self.trabajos}: {reencolados} interrumpidos reencolados'))
+
+            ejecutados = cola.procesar_pendientes()
+            if ejecutados:
+                self.stdout.write(self.style.SUCCESS(f'{self.trabajos}: {ejecutados} procesados'))
+
+            if options['una_vez']:
+                return
+            time.sleep(options['intervalo'])
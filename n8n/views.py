@@ -1,4 +1,4 @@
-import requests
+import httpx
 import json
 import markdown
 import logging
@@ -18,6 +18,21 @@ N8N_WEBHOOK_ADICIONALES_URL = 'https://jaimemc.app.n8n.cloud/webhook/adicionales
 N8N_WEBHOOK_FINAL_URL = 'https://jaimemc.app.n8n.cloud/webhook/final'
 
 
+async def _post_webhook(url, payload, timeout=60):
+    """
+    Envía un POST JSON a un webhook de n8n sin bloquear el event loop mientras
+    se espera la respuesta (los flujos de n8n llaman a un LLM y tardan varios segundos).
+    """
+    async with httpx.AsyncClient(timeout=timeout) as cliente:
+        return await cliente.post(
+            url,
+            json=payload,
+            headers={
+                'Content-Type': 'application/json'
+            }
+        )
+
+
 @login_required
 def n8n_pasos_view(request):
     """
@@ -130,7 +145,7 @@ def guardar_paso1_view(request):
 
 @login_required
 @require_http_methods(["POST"])
-def enviar_especificacion_view(request):
+async def enviar_especificacion_view(request):
     """
     Vista AJAX para enviar título y descripción a la API de n8n
     Guarda primero en el modelo EspecificacionTecnica antes de enviar a la API
@@ -149,11 +164,11 @@ def enviar_especificacion_view(request):
         
         # Guardar en el modelo EspecificacionTecnica antes de enviar a la API
         try:
-            especificacion = EspecificacionTecnica.objects.create(
+            especificacion = await EspecificacionTecnica.objects.acreate(
                 titulo=titulo,
                 descripcion=descripcion,
                 tipo_servicio=tipo_servicio,
-                creado_por=request.user
+                creado_por=await request.auser()
             )
             logger.info(f"EspecificacionTecnica guardada con ID: {especificacion.id}")
         except Exception as e:
@@ -173,14 +188,7 @@ def enviar_especificacion_view(request):
         # Enviar POST request a la API webhook y esperar respuesta
         # Usar timeout de 60 segundos para evitar que Gunicorn mate al worker
         try:
-            response = requests.post(
-                N8N_WEBHOOK_URL,
-                json=payload,
-                headers={
-                    'Content-Type': 'application/json'
-                },
-                timeout=60  # Timeout de 60 segundos para evitar timeout de Gunicorn
-            )
+            response = await _post_webhook(N8N_WEBHOOK_URL, payload)
             
             # Verificar si la respuesta fue exitosa
             response.raise_for_status()
@@ -193,10 +201,10 @@ def enviar_especificacion_view(request):
                 logger.warning(f"Respuesta no es JSON válido: {str(e)}")
                 # Si no es JSON, usar el texto de la respuesta
                 response_data = {'text': response.text, 'status_code': response.status_code}
-        except requests.exceptions.Timeout:
+        except httpx.TimeoutException:
             logger.error(f"Timeout al enviar a {N8N_WEBHOOK_URL}")
             raise
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Error al comunicarse con la API {N8N_WEBHOOK_URL}: {str(e)}", exc_info=True)
             raise
         
@@ -217,13 +225,13 @@ def enviar_especificacion_view(request):
             'has_output': bool(response_data.get('output')) if isinstance(response_data, dict) else False,
         })
         
-    except requests.exceptions.Timeout:
+    except httpx.TimeoutException:
         logger.error("Timeout en enviar_especificacion_view")
         return JsonResponse({
             'success': False,
             'error': 'La solicitud tardó demasiado tiempo. Por favor, intente nuevamente.'
         }, status=408)
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         logger.error(f"RequestException en enviar_especificacion_view: {str(e)}", exc_info=True)
         return JsonResponse({
             'success': False,
@@ -245,7 +253,7 @@ def enviar_especificacion_view(request):
 
 @login_required
 @require_http_methods(["POST"])
-def enviar_actividades_view(request):
+async def enviar_actividades_view(request):
     """
     Vista AJAX para guardar actividades adicionales seleccionadas en el modelo y luego enviar a la API
     """
@@ -270,7 +278,7 @@ def enviar_actividades_view(request):
         
         # Buscar la EspecificacionTecnica por ID
         try:
-            especificacion_tecnica = EspecificacionTecnica.objects.get(id=especificacion_id)
+            especificacion_tecnica = await EspecificacionTecnica.objects.aget(id=especificacion_id)
         except EspecificacionTecnica.DoesNotExist:
             return JsonResponse({
                 'success': False,
@@ -281,7 +289,7 @@ def enviar_actividades_view(request):
         # Guardar las actividades seleccionadas en el modelo ActividadesAdicionales
         for actividad in actividades_seleccionadas:
             try:
-                actividad_obj = ActividadesAdicionales.objects.create(
+                actividad_obj = await ActividadesAdicionales.objects.acreate(
                     especificacion_tecnica=especificacion_tecnica,
                     nombre=actividad.get('nombre', ''),
                     unidad_medida=actividad.get('unidad_medida', ''),
@@ -296,12 +304,12 @@ def enviar_actividades_view(request):
         logger.info(f"Actividades guardadas exitosamente: {len(actividades_guardadas)} actividades")
         
         # Refrescar la especificación técnica desde la BD para asegurar datos actualizados
-        especificacion_tecnica.refresh_from_db()
+        await especificacion_tecnica.arefresh_from_db()
         
         # Obtener TODOS los parámetros técnicos guardados relacionados con esta especificación técnica desde la BD
         parametros_tecnicos = especificacion_tecnica.parametros.all()
         parametros_formateados = []
-        for param in parametros_tecnicos:
+        async for param in parametros_tecnicos:
             parametros_formateados.append({
                 'parametro': param.parametro,
                 'valor_recomendado': param.valor or '',
@@ -314,7 +322,7 @@ def enviar_actividades_view(request):
         # Obtener TODAS las actividades adicionales guardadas relacionadas con esta especificación técnica desde la BD
         actividades_adicionales_bd = especificacion_tecnica.actividades_adicionales.all()
         actividades_formateadas = []
-        for actividad_obj in actividades_adicionales_bd:
+        async for actividad_obj in actividades_adicionales_bd:
             actividades_formateadas.append({
                 'nombre': actividad_obj.nombre,
                 'unidad_medida': actividad_obj.unidad_medida or '',
@@ -343,14 +351,7 @@ def enviar_actividades_view(request):
         raw_markdown_para_respuesta = None
         
         try:
-            final_response = requests.post(
-                N8N_WEBHOOK_FINAL_URL,
-                json=payload_final,
-                headers={
-                    'Content-Type': 'application/json'
-                },
-                timeout=60
-            )
+            final_response = await _post_webhook(N8N_WEBHOOK_FINAL_URL, payload_final)
             
             logger.info(f"Respuesta de URL final - Status Code: {final_response.status_code}")
             
@@ -387,7 +388,7 @@ def enviar_actividades_view(request):
                 # Guardar el markdown en el modelo si existe
                 if markdown_resultado:
                     especificacion_tecnica.resultado_markdown = markdown_resultado
-                    especificacion_tecnica.save(update_fields=['resultado_markdown'])
+                    await especificacion_tecnica.asave(update_fields=['resultado_markdown'])
                     logger.info(f"Markdown guardado en el modelo: {len(markdown_resultado)} caracteres")
                     
                     # Convertir markdown a HTML para la respuesta
@@ -421,13 +422,13 @@ def enviar_actividades_view(request):
             except json.JSONDecodeError as e:
                 final_response_str = f"Status Code: {final_response.status_code}\n\nRespuesta:\n{final_response.text}"
                 logger.warning(f"Respuesta no JSON de URL final: {str(e)}")
-        except requests.exceptions.Timeout as e:
+        except httpx.TimeoutException as e:
             # Si hay timeout, registrar el error
             error_msg = f"Timeout al enviar a la URL final: {str(e)}"
             logger.error(error_msg, exc_info=True)
             final_response_str = error_msg
             final_response_data = {'error': error_msg, 'type': 'timeout'}
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             # Si falla el POST a la URL final, registrar el error pero no fallar completamente
             error_msg = f"Error al enviar a la URL final ({N8N_WEBHOOK_FINAL_URL}): {str(e)}"
             logger.error(error_msg, exc_info=True)
@@ -493,12 +494,12 @@ def enviar_actividades_view(request):
         
         return JsonResponse(response_dict)
         
-    except requests.exceptions.Timeout:
+    except httpx.TimeoutException:
         return JsonResponse({
             'success': False,
             'error': 'La solicitud tardó demasiado tiempo. Por favor, intente nuevamente.'
         }, status=408)
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         logger.error(f"RequestException en enviar_actividades_view: {str(e)}", exc_info=True)
         return JsonResponse({
             'success': False,
@@ -520,7 +521,7 @@ def enviar_actividades_view(request):
 
 @login_required
 @require_http_methods(["POST"])
-def enviar_parametros_seleccionados_view(request):
+async def enviar_parametros_seleccionados_view(request):
     """
     Vista AJAX para enviar parámetros seleccionados a la API
     """
@@ -541,7 +542,7 @@ def enviar_parametros_seleccionados_view(request):
         
         # Buscar la EspecificacionTecnica por ID
         try:
-            especificacion_tecnica = EspecificacionTecnica.objects.get(id=especificacion_id)
+            especificacion_tecnica = await EspecificacionTecnica.objects.aget(id=especificacion_id)
         except EspecificacionTecnica.DoesNotExist:
             return JsonResponse({
                 'success': False,
@@ -553,7 +554,7 @@ def enviar_parametros_seleccionados_view(request):
         parametros_guardados = []
         for param in parametros_seleccionados:
             try:
-                parametro_obj = Parametros.objects.create(
+                parametro_obj = await Parametros.objects.acreate(
                     especificacion_tecnica=especificacion_tecnica,
                     parametro=param.get('parametro', ''),
                     valor=param.get('valor_recomendado', ''),
@@ -585,14 +586,7 @@ def enviar_parametros_seleccionados_view(request):
         
         # Enviar POST request a la API
         try:
-            response = requests.post(
-                N8N_WEBHOOK_TITULO_URL,
-                json=payload,
-                headers={
-                    'Content-Type': 'application/json'
-                },
-                timeout=60  # Timeout de 60 segundos para evitar timeout de Gunicorn
-            )
+            response = await _post_webhook(N8N_WEBHOOK_TITULO_URL, payload)
             
             response.raise_for_status()
             
@@ -603,10 +597,10 @@ def enviar_parametros_seleccionados_view(request):
             except json.JSONDecodeError as e:
                 logger.warning(f"Respuesta no es JSON válido en enviar_parametros_seleccionados_view: {str(e)}")
                 response_data_str = f"Status Code: {response.status_code}\n\nRespuesta:\n{response.text}"
-        except requests.exceptions.Timeout:
+        except httpx.TimeoutException:
             logger.error(f"Timeout al enviar a {N8N_WEBHOOK_TITULO_URL}")
             raise
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Error al comunicarse con la API {N8N_WEBHOOK_TITULO_URL}: {str(e)}", exc_info=True)
             raise
         
@@ -630,13 +624,13 @@ def enviar_parametros_seleccionados_view(request):
             'parametros_guardados': len(parametros_guardados),
         })
         
-    except requests.exceptions.Timeout:
+    except httpx.TimeoutException:
         logger.error("Timeout en enviar_parametros_seleccionados_view")
         return JsonResponse({
             'success': False,
             'error': 'La solicitud tardó demasiado tiempo. Por favor, intente nuevamente.'
         }, status=408)
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         logger.error(f"RequestException en enviar_parametros_seleccionados_view: {str(e)}", exc_info=True)
         return JsonResponse({
             'success': False,
@@ -658,7 +652,7 @@ def enviar_parametros_seleccionados_view(request):
 
 @login_required
 @require_http_methods(["POST"])
-def enviar_titulo_ajustado_view(request):
+async def enviar_titulo_ajustado_view(request):
     """
     Vista AJAX para enviar el título ajustado (aceptado o rechazado)
     Si se acepta la sugerencia, actualiza el título en EspecificacionTecnica
@@ -686,7 +680,7 @@ def enviar_titulo_ajustado_view(request):
         
         # Buscar la EspecificacionTecnica por ID
         try:
-            especificacion_tecnica = EspecificacionTecnica.objects.get(id=especificacion_id)
+            especificacion_tecnica = await EspecificacionTecnica.objects.aget(id=especificacion_id)
         except EspecificacionTecnica.DoesNotExist:
             return JsonResponse({
                 'success': False,
@@ -697,14 +691,14 @@ def enviar_titulo_ajustado_view(request):
         if aceptar:
             # Actualizar el título usando PATCH (actualización parcial)
             especificacion_tecnica.titulo = titulo_final
-            especificacion_tecnica.save(update_fields=['titulo'])
+            await especificacion_tecnica.asave(update_fields=['titulo'])
             # Refrescar desde la BD para obtener el título actualizado
-            especificacion_tecnica.refresh_from_db()
+            await especificacion_tecnica.arefresh_from_db()
         
         # Obtener los parámetros técnicos guardados relacionados con esta especificación técnica desde la BD
         parametros_tecnicos = especificacion_tecnica.parametros.all()
         parametros_formateados = []
-        for param in parametros_tecnicos:
+        async for param in parametros_tecnicos:
             parametros_formateados.append({
                 'parametro': param.parametro,
                 'valor_recomendado': param.valor or '',
@@ -724,14 +718,7 @@ def enviar_titulo_ajustado_view(request):
         
         # Enviar POST directamente a la URL de adicionales
         try:
-            adicionales_response = requests.post(
-                N8N_WEBHOOK_ADICIONALES_URL,
-                json=adicionales_payload,
-                headers={
-                    'Content-Type': 'application/json'
-                },
-                timeout=60
-            )
+            adicionales_response = await _post_webhook(N8N_WEBHOOK_ADICIONALES_URL, adicionales_payload)
             
             adicionales_response.raise_for_status()
             
@@ -744,10 +731,10 @@ def enviar_titulo_ajustado_view(request):
                 logger.warning(f"Respuesta no es JSON válido en enviar_titulo_ajustado_view: {str(e)}")
                 adicionales_response_str = f"Status Code: {adicionales_response.status_code}\n\nRespuesta:\n{adicionales_response.text}"
                 adicionales_response_data = {'text': adicionales_response.text, 'status_code': adicionales_response.status_code}
-        except requests.exceptions.Timeout:
+        except httpx.TimeoutException:
             logger.error(f"Timeout al enviar a {N8N_WEBHOOK_ADICIONALES_URL}")
             raise
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Error al comunicarse con la API {N8N_WEBHOOK_ADICIONALES_URL}: {str(e)}", exc_info=True)
             raise
         
@@ -760,14 +747,7 @@ def enviar_titulo_ajustado_view(request):
                     'aceptar': aceptar
                 }
                 
-                resume_response = requests.post(
-                    resume_url,
-                    json=resume_payload,
-                    headers={
-                        'Content-Type': 'application/json'
-                    },
-                    timeout=60
-                )
+                resume_response = await _post_webhook(resume_url, resume_payload)
                 
                 resume_response.raise_for_status()
                 
@@ -777,7 +757,7 @@ def enviar_titulo_ajustado_view(request):
                     logger.warning(f"Respuesta de resume_url no es JSON válido: {str(e)}")
                     resume_response_data = {'text': resume_response.text, 'status_code': resume_response.status_code}
                     
-            except requests.exceptions.RequestException as e:
+            except (httpx.HTTPError, httpx.InvalidURL) as e:
                 # Si falla el POST a resume_url, solo registrar el error pero no fallar
                 logger.warning(f"Error al enviar a resume_url: {str(e)}", exc_info=True)
                 resume_response_data = {'error': str(e)}
@@ -791,13 +771,13 @@ def enviar_titulo_ajustado_view(request):
             'resume_response': resume_response_data,
         })
         
-    except requests.exceptions.Timeout:
+    except httpx.TimeoutException:
         logger.error("Timeout en enviar_titulo_ajustado_view")
         return JsonResponse({
             'success': False,
             'error': 'La solicitud tardó demasiado tiempo. Por favor, intente nuevamente.'
         }, status=408)
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         logger.error(f"RequestException en enviar_titulo_ajustado_view: {str(e)}", exc_info=True)
         return JsonResponse({
             'success': False,
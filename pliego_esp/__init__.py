@@ -1,3 +1,3 @@
 # Este archivo se ejecuta cuando se inicia la aplicación
-# Los grafos se cargarán a través del método ready() de la clase PliegoEspConfig
+# Los grafos se compilan en el primer uso (ver pliego_esp.compile_graphs.get_workflow)
 # No es necesario importar compile_graphs aquí
@@ -1,3 +1,26 @@
 from django.contrib import admin
+from .models import ConsumoConversacion, EspecificacionGeneradaCache, TituloMejoradoCache
 
-# Register your models here.
+
+@admin.register(TituloMejoradoCache)
+class TituloMejoradoCacheAdmin(admin.ModelAdmin):
+    list_display = ('titulo_normalizado', 'titulo_mejorado', 'modelo', 'version_prompt', 'aciertos', 'fecha_ultimo_uso')
+    list_filter = ('modelo', 'version_prompt')
+    search_fields = ('titulo_normalizado', 'titulo_mejorado')
+    readonly_fields = ('clave', 'fecha_creacion', 'fecha_ultimo_uso')
+
+
+@admin.register(EspecificacionGeneradaCache)
+class EspecificacionGeneradaCacheAdmin(admin.ModelAdmin):
+    list_display = ('titulo', 'modelo', 'token_cost', 'aciertos', 'fecha_creacion', 'fecha_ultimo_uso')
+    list_filter = ('modelo',)
+    search_fields = ('titulo',)
+    readonly_fields = ('clave', 'clave_base', 'entrada', 'fecha_creacion', 'fecha_ultimo_uso')
+    exclude = ('vector',)
+
+
+@admin.register(ConsumoConversacion)
+class ConsumoConversacionAdmin(admin.ModelAdmin):
+    list_display = ('thread_id', 'costo', 'total_tokens', 'ejecuciones', 'fecha_actualizacion')
+    search_fields = ('thread_id',)
+    readonly_fields = ('thread_id', 'por_nodo', 'fecha_creacion', 'fecha_actualizacion')
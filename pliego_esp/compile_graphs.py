@@ -1,51 +1,91 @@
 # compile_graphs.py
-from asgiref.sync import async_to_sync
+import threading
+import time
 
-from langgraph.checkpoint.memory import MemorySaver
-from langgraph.graph.state import CompiledStateGraph
+from asgiref.sync import sync_to_async
+from django.conf import settings
 
-from pliego_esp.graph.graph import create_workflow
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.graph.state import CompiledStateGraph
 
 from rich.console import Console
 console = Console()
 
+# Tiempo máximo esperado (en milisegundos) para importar los nodos y compilar el
+# grafo la primera vez; si se supera se muestra una advertencia
+PLIEGO_GRAFO_PRESUPUESTO_MS = getattr(settings, 'PLIEGO_GRAFO_PRESUPUESTO_MS', 3000)
+
 # Variables globales para almacenar los grafos compilados
 workflow: CompiledStateGraph = None
-memory_saver: MemorySaver = None
+memory_saver: BaseCheckpointSaver = None
+_compilacion_lock = threading.Lock()
 
 def initialize_graphs():
     """
-    Inicializa los grafos una sola vez al inicio de la aplicación.
-    Esta función debe ser llamada desde el método ready() de la AppConfig.
-    """
-    global workflow, memory_saver
-    
-    try:
-        console.print("[compile_graphs.py] Iniciando compilación de grafos...", style="bold blue")
-        
-        # Crear el memory_saver una sola vez
-        memory_saver = MemorySaver()
-        
-        # Compilar el workflow
-        workflow = async_to_sync(create_workflow)(memory_saver)
-        
-        return True
-        
-    except Exception as e:
-        console.print(f"[compile_graphs.py] Error al compilar los grafos: {str(e)}", style="bold red")
-        return False
+    Compila el grafo de inmediato (por ejemplo, para precalentar un worker).
+    No es necesario llamarla: get_workflow compila el grafo la primera vez que se usa.
+    """
+    return get_workflow() is not None
 
 def get_workflow():
     """
-    Retorna el workflow compilado.
-    Si no está inicializado, retorna None.
+    Retorna el workflow compilado, compilándolo la primera vez que se usa.
+    Si no se puede compilar (por ejemplo, falta OPENAI_API_KEY), retorna None
+    y se vuelve a intentar en la próxima llamada.
     """
+    global workflow
+
+    if workflow is not None:
+        return workflow
+
+    with _compilacion_lock:
+        if workflow is not None:
+            return workflow
+        try:
+            inicio = time.perf_counter()
+            # Importación diferida: los nodos cargan LangChain y los prompts, lo que
+            # no deben pagar migrate, collectstatic ni los comandos que no usan el grafo
+            from pliego_esp.graph.graph import construir_workflow
+            importado = time.perf_counter()
+
+            workflow = construir_workflow(get_memory_saver())
+
+            fin = time.perf_counter()
+            total_ms = (fin - inicio) * 1000
+            console.print(
+                f"[compile_graphs.py] Grafo compilado en {total_ms:.0f} ms "
+                f"(importación {(importado - inicio) * 1000:.0f} ms, compilación {(fin - importado) * 1000:.0f} ms)",
+                style="bold blue"
+            )
+            if total_ms > PLIEGO_GRAFO_PRESUPUESTO_MS:
+                console.print(
+                    f"[compile_graphs.py] La carga del grafo superó el presupuesto de {PLIEGO_GRAFO_PRESUPUESTO_MS} ms",
+                    style="bold yellow"
+                )
+        except Exception as e:
+            console.print(f"[compile_graphs.py] Error al compilar los grafos: {str(e)}", style="bold red")
+
     return workflow
 
+async def aget_workflow():
+    """
+    Versión para código asíncrono: la primera compilación se hace en un hilo
+    para no bloquear el event loop.
+    """
+    if workflow is not None:
+        return workflow
+    return await sync_to_async(get_workflow, thread_sensitive=False)()
+
 def get_memory_saver():
     """
-    Retorna el memory_saver.
-    Si no está inicializado, retorna None.
+    Retorna el checkpointer del workflow (DjangoCheckpointSaver), creándolo la
+    primera vez que se usa.
     """
-    return memory_saver
+    global memory_saver
 
+    if memory_saver is None:
+        # Checkpointer en base de datos: las conversaciones interrumpidas se pueden
+        # reanudar desde cualquier worker
+        from pliego_esp.utils.checkpointer import DjangoCheckpointSaver
+        memory_saver = DjangoCheckpointSaver()
+    return memory_saver
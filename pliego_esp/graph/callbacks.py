@@ -1,4 +1,115 @@
+import threading
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
 from langchain_community.callbacks.openai_info import OpenAICallbackHandler
+from langchain_core.callbacks import BaseCallbackHandler, BaseCallbackManager
+from langchain_core.outputs import LLMResult
+from langchain_core.runnables import RunnableConfig
+
+# Nombre usado para las llamadas al modelo hechas fuera de un nodo del grafo
+SIN_NODO = "__sin_nodo__"
+
+
+class ConsumoTokens(BaseCallbackHandler):
+    """
+    Acumula tokens y costo de una ejecución del grafo, separados por nodo.
+
+    Se crea una instancia por ejecución (ver PliegoEspService.process_pliego) y se
+    pasa en los callbacks del RunnableConfig, de modo que las ejecuciones
+    concurrentes de distintos usuarios no se mezclan.
+    """
+
+    # Ejecutar en el mismo hilo del event loop: el registro es barato y así se
+    # conserva el orden inicio/fin de cada llamada
+    run_inline = True
+
+    def __init__(self, thread_id: Optional[str] = None):
+        self.thread_id = thread_id
+        self._por_nodo: Dict[str, OpenAICallbackHandler] = {}
+        self._nodo_por_llamada: Dict[UUID, str] = {}
+        self._lock = threading.Lock()
+
+    def _registrar_llamada(self, run_id: UUID, metadata: Optional[Dict[str, Any]]) -> None:
+        nodo = (metadata or {}).get("langgraph_node") or SIN_NODO
+        with self._lock:
+            self._nodo_por_llamada[run_id] = nodo
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID,
+                     metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        self._registrar_llamada(run_id, metadata)
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *, run_id: UUID,
+                            metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        self._registrar_llamada(run_id, metadata)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            nodo = self._nodo_por_llamada.pop(run_id, SIN_NODO)
+            contador = self._por_nodo.get(nodo)
+            if contador is None:
+                contador = self._por_nodo[nodo] = OpenAICallbackHandler()
+        # OpenAICallbackHandler calcula el costo según el modelo y tiene su propio lock
+        contador.on_llm_end(response, **kwargs)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            self._nodo_por_llamada.pop(run_id, None)
+
+    def costo_nodo(self, nodo: str) -> float:
+        with self._lock:
+            contador = self._por_nodo.get(nodo)
+        return contador.total_cost if contador else 0.0
+
+    @property
+    def total_cost(self) -> float:
+        with self._lock:
+            contadores = list(self._por_nodo.values())
+        return sum(c.total_cost for c in contadores)
+
+    @property
+    def total_tokens(self) -> int:
+        with self._lock:
+            contadores = list(self._por_nodo.values())
+        return sum(c.total_tokens for c in contadores)
+
+    def resumen(self) -> Dict[str, Dict[str, float]]:
+        """Tokens y costo de la ejecución por nodo."""
+        with self._lock:
+            por_nodo = dict(self._por_nodo)
+        return {
+            nodo: {
+                "prompt_tokens": c.prompt_tokens,
+                "completion_tokens": c.completion_tokens,
+                "total_tokens": c.total_tokens,
+                "llamadas": c.successful_requests,
+                "costo": c.total_cost,
+            }
+            for nodo, c in por_nodo.items()
+        }
+
+
+def consumo_de_config(config: Optional[RunnableConfig]) -> Optional[ConsumoTokens]:
+    """Busca el ConsumoTokens de la ejecución entre los callbacks del config."""
+    callbacks = (config or {}).get("callbacks")
+    if isinstance(callbacks, BaseCallbackManager):
+        handlers = callbacks.handlers + callbacks.inheritable_handlers
+    else:
+        handlers = callbacks or []
+
+    for handler in handlers:
+        if isinstance(handler, ConsumoTokens):
+            return handler
+    return None
+
 
-# Crear un único callback_handler compartido para toda la aplicación
-shared_callback_handler = OpenAICallbackHandler() 
\ No newline at end of file
+def costo_del_nodo(config: RunnableConfig) -> float:
+    """
+    Costo acumulado por el nodo en curso durante esta ejecución. Debe llamarse
+    con el config que LangGraph entrega al nodo.
+    """
+    consumo = consumo_de_config(config)
+    if consumo is None:
+        return 0.0
+    nodo = (config.get("metadata") or {}).get("langgraph_node") or SIN_NODO
+    return consumo.costo_nodo(nodo)
@@ -1,12 +1,13 @@
 from __future__ import annotations
-from pathlib import Path
 from dataclasses import dataclass, field, fields
-from typing import Annotated, Any, Literal, Optional, Type, TypeVar
+from typing import TYPE_CHECKING, Annotated, Any, Literal, Optional, Type, TypeVar
 
-from langchain_openai import OpenAIEmbeddings
-from langchain_chroma import Chroma
 from langchain_core.runnables import RunnableConfig, ensure_config
 
+if TYPE_CHECKING:
+    from langchain_openai import OpenAIEmbeddings
+    from langchain_chroma import Chroma
+
 from rich.console import Console
 console = Console()
 
@@ -20,21 +21,15 @@ class IndexConfiguration:
     retriever provider choice, and search parameters.
     """
 
-    embeddings: OpenAIEmbeddings = field(
-        default_factory=lambda: OpenAIEmbeddings(
-            model="text-embedding-3-small"
-        ),
+    # Ningún nodo los usa por defecto: se reciben en configurable si hacen falta.
+    # Crearlos en cada from_runnable_config abría Chroma y exigía OPENAI_API_KEY en cada nodo.
+    embeddings: Optional[OpenAIEmbeddings] = field(
+        default=None,
         metadata={"description": "The OpenAI embeddings model configuration."}
     )
 
-    vectorstore: Chroma = field(
-        default_factory=lambda: Chroma(
-            collection_name="langchain",
-            embedding_function=OpenAIEmbeddings(
-                model="text-embedding-3-small"
-            ),
-            persist_directory=str(Path(__file__).parent.parent.parent / "chroma_db")
-        ),
+    vectorstore: Optional[Chroma] = field(
+        default=None,
         metadata={"description": "The Chroma vector store configuration."}
     )
 
@@ -85,6 +80,12 @@ class Configuration(IndexConfiguration):
     # llm_chat: Literal["gpt-4o-mini", "gpt-3.5-turbo"] = field(default="gpt-4o-mini", metadata={"description": "Modelo de lenguaje a utilizar para chat."})
 
     chat_model: Literal["gpt-4o-mini", "gpt-4.1-nano", "gpt-4.1-mini" ] = field(default="gpt-4o-mini", metadata={"description": "Modelo de lenguaje a utilizar para chat."})
+
+    max_llamadas_concurrentes: int = field(default=8, metadata={"description": "Cantidad máxima de llamadas al modelo que un nodo ejecuta en paralelo."})
+
+    modo_revision_parametros: Literal["lote", "individual"] = field(default="lote", metadata={"description": "Revisar los parámetros no asignados en una sola llamada por lote o con una llamada por parámetro."})
+
+    parametros_por_lote: int = field(default=15, metadata={"description": "Cantidad máxima de parámetros que se revisan en una misma llamada en el modo por lote."})
         
     connection_kwargs: dict = field(default_factory=lambda: {
         "autocommit": True,
@@ -1,12 +1,9 @@
 import os
-from pathlib import Path
-from dotenv import load_dotenv
 from langgraph.graph import StateGraph, END
 from langgraph.graph.state import CompiledStateGraph
 
 from langchain_core.runnables import RunnableConfig
-from graph_retriever.strategies import Eager
-from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.base import BaseCheckpointSaver
 
 from pliego_esp.graph.nodes.add_finales import add_finales
 from pliego_esp.graph.nodes.add_other_adicionales import add_other_adicionales
@@ -15,6 +12,7 @@ from pliego_esp.graph.nodes.add_unassigned_parameters import add_unassigned_para
 from pliego_esp.graph.nodes.review_unassigned_parameters import review_unassigned_parameters
 from pliego_esp.graph.nodes.process_pliego import process_pliego
 from pliego_esp.graph.state import State
+from pliego_esp.graph.llm import usa_llm_externo
 
 from pliego_esp.graph.nodes.clean_and_capture_sections import clean_and_capture_sections
 from pliego_esp.graph.nodes.parse_adicionales import parse_adicionales
@@ -26,18 +24,25 @@ from pliego_esp.graph.nodes.unassigned_parameters import unassigned_parameters
 from rich.console import Console
 console = Console()
 
-# Cargar variables de entorno
-env_path = Path(__file__).resolve().parent.parent.parent / '.env'
-console.print(f"[graph.py] Intentando cargar .env desde: {env_path}", style="bold red")
-load_dotenv(env_path, override=True)
+def verificar_api_key() -> None:
+    """
+    Verifica que OPENAI_API_KEY esté configurada (config.base la carga desde .env).
+    Se llama al compilar el workflow por primera vez, no al importar el módulo,
+    para que migrate, collectstatic y las pruebas no la necesiten.
+    """
+    if usa_llm_externo():
+        return
+    if not os.getenv('OPENAI_API_KEY'):
+        raise ValueError("OPENAI_API_KEY no está configurada en las variables de entorno")
 
-# Verificar la API key al importar el módulo
-api_key = os.getenv('OPENAI_API_KEY')
-if not api_key:
-    raise ValueError("OPENAI_API_KEY no está configurada en las variables de entorno")
-console.print(f"[graph.py] OPENAI_API_KEY: {api_key[:10] + '...' if api_key else 'No encontrada'}", style="bold red")
 
-async def create_workflow(memory_saver: MemorySaver) -> CompiledStateGraph:
+async def create_workflow(memory_saver: BaseCheckpointSaver) -> CompiledStateGraph:
+    return construir_workflow(memory_saver)
+
+
+def construir_workflow(memory_saver: BaseCheckpointSaver) -> CompiledStateGraph:
+    verificar_api_key()
+
     # Crear el grafo de estado que maneja el flujo de trabajo
     workflow = StateGraph(State)
 
@@ -81,10 +86,15 @@ async def create_workflow(memory_saver: MemorySaver) -> CompiledStateGraph:
     
     # Flujo final
     workflow.add_edge("clean_and_capture_sections", "process_pliego")
+
+    # Las revisiones de parámetros y adicionales solo leen la especificación generada:
+    # se ejecutan en paralelo y convergen antes de los nodos que la editan
     workflow.add_edge("process_pliego", "review_unassigned_parameters")
-    workflow.add_edge("review_unassigned_parameters", "add_unassigned_parameters")
-    workflow.add_edge("add_unassigned_parameters", "review_other_adicionales")
-    workflow.add_edge("review_other_adicionales", "add_other_adicionales")
+    workflow.add_edge("process_pliego", "review_other_adicionales")
+    workflow.add_edge(
+        ["review_unassigned_parameters", "review_other_adicionales"],
+        "add_unassigned_parameters")
+    workflow.add_edge("add_unassigned_parameters", "add_other_adicionales")
     # workflow.add_edge("add_unassigned_parameters", "add_other_adicionales")
     # workflow.set_entry_point("review_unassigned_parameters")
     # workflow.add_edge("review_unassigned_parameters", "add_unassigned_parameters")
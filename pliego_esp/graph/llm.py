@@ -0,0 +1,33 @@
+from typing import Optional
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from langchain_core.language_models.chat_models import BaseChatModel
+
+
+def _fabrica() -> Optional[str]:
+    """
+    Ruta de PLIEGO_LLM_FABRICA: una función fabrica(model, temperature) -> BaseChatModel
+    que reemplaza a ChatOpenAI (por ejemplo, un modelo falso en las pruebas). Se lee
+    en cada llamada para que override_settings la pueda cambiar.
+    """
+    return getattr(settings, 'PLIEGO_LLM_FABRICA', None)
+
+
+def usa_llm_externo() -> bool:
+    """True si los nodos usan un modelo configurado en PLIEGO_LLM_FABRICA en lugar de OpenAI."""
+    return bool(_fabrica())
+
+
+def crear_chat_model(model: str, temperature: float) -> BaseChatModel:
+    """Modelo de chat que usan los nodos del grafo y los procesadores de documentos."""
+    fabrica = _fabrica()
+    if fabrica:
+        return import_string(fabrica)(model=model, temperature=temperature)
+
+    # Importación diferida: langchain_openai solo se carga al ejecutar un nodo
+    from langchain_openai import ChatOpenAI
+    # stream_usage: cuando el grafo se ejecuta con stream_mode "messages" el modelo
+    # responde por streaming, y sin esta opción OpenAI no informa los tokens usados
+    # (ConsumoTokens registraría 0 tokens y costo 0)
+    return ChatOpenAI(model=model, temperature=temperature, stream_usage=True)
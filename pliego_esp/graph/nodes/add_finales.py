@@ -1,7 +1,7 @@
 from pliego_esp.graph.state import State
 from rich.console import Console
 from langchain_core.runnables import RunnableConfig
-import re
+from embeddings.utils.secciones_md import parsear_markdown
 console = Console()
 
 PARRAFO_FINAL_PROCEDIMIENTO = """
@@ -12,25 +12,17 @@ Los trabajos deben ser realizados por personal calificado y capacitado, siguiend
 
 def agregar_parrafo_a_procedimiento(texto, parrafo):
     
-    # Buscar todas las secciones que comienzan con ## o ### y sus posiciones
-    secciones = list(re.finditer(r"^#{2,3} (.+?)(?:\.|\n)", texto, flags=re.MULTILINE))
+    # Buscar la sección Procedimiento en el árbol de secciones (## o ###)
+    seccion = parsear_markdown(texto).seccion("procedimiento")
     
+    # Si no se encuentra la sección, devolver texto original
+    if seccion is None:
+        return texto
     
-    for i, match in enumerate(secciones):
-    
-        if match.group(1).strip().lower() == "procedimiento":
-    
-            inicio = match.end()  # después de '## Procedimiento.'
-            fin = secciones[i + 1].start() if i + 1 < len(secciones) else len(texto)
-            contenido_original = texto[inicio:fin].rstrip()
-    
-            nuevo_contenido = f"{contenido_original}\n\n{parrafo}\n"
-    
-            return texto[:inicio] + nuevo_contenido + texto[fin:]
-
+    contenido_original = texto[seccion.inicio_contenido:seccion.fin].rstrip()
+    nuevo_contenido = f"{contenido_original}\n\n{parrafo}\n"
     
-    # Si no se encuentra la sección, devolver texto original
-    return texto
+    return texto[:seccion.inicio_contenido] + nuevo_contenido + texto[seccion.fin:]
 
 async def add_finales(state: State, *, config: RunnableConfig) -> State:
     console.print("------ add_finales ------", style="bold cyan")
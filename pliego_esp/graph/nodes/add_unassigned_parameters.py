@@ -2,12 +2,13 @@
 
 from pliego_esp.graph.state import State
 from rich.console import Console
-from langchain_openai import ChatOpenAI
+from pliego_esp.graph.llm import crear_chat_model
 from langchain_core.prompts import ChatPromptTemplate
 from pliego_esp.graph.configuration import Configuration
 from langchain_core.runnables import RunnableConfig
-from pliego_esp.graph.callbacks import shared_callback_handler
+from pliego_esp.graph.callbacks import costo_del_nodo
 from langgraph.types import interrupt
+from pliego_esp.graph.nodes.process_pliego import limpiar_bloque_markdown
 
 console = Console()
 
@@ -53,14 +54,10 @@ async def add_unassigned_parameters(state: State, *, config: RunnableConfig) ->
 
     configuration = Configuration.from_runnable_config(config)
     
-    llm = ChatOpenAI(
+    llm = crear_chat_model(
         model=configuration.chat_model,
-        temperature=0.0,
-        callbacks=[shared_callback_handler]
+        temperature=0.0
     )
-    
-    costo_inicial = shared_callback_handler.total_cost
-    console.print(f"Costo inicial: ${costo_inicial:.6f}", style="cyan")
 
     if len(state["evaluaciones_otros_parametros"]) > 0:
 
@@ -96,21 +93,20 @@ async def add_unassigned_parameters(state: State, *, config: RunnableConfig) ->
                 especificacion_generada=state.get("especificacion_generada", "")
             ).to_messages()
         
-            especificacion_con_parametros = await llm.ainvoke(prompt)
+            especificacion_con_parametros = await llm.ainvoke(prompt, config)
         
             # Calcular el costo del nodo
-            costo_nodo = shared_callback_handler.total_cost - costo_inicial
+            costo_nodo = costo_del_nodo(config)
             console.print(f"Costo total del nodo add_unassigned_parameters: ${costo_nodo:.6f}", style="bold cyan")
-            console.print(f"Costo acumulado hasta ahora: ${shared_callback_handler.total_cost:.6f}", style="cyan")
 
             return {
-                "especificacion_generada": especificacion_con_parametros.content,
-                "token_cost": shared_callback_handler.total_cost,
+                "especificacion_generada": limpiar_bloque_markdown(especificacion_con_parametros.content),
+                "token_cost": costo_nodo,
             }
         
         else:
             console.print("No hay parametros para integrar", style="red")
-            return state
+            return {}
     else:
         console.print("No hay parametros para integrar", style="red")
-        return state
+        return {}
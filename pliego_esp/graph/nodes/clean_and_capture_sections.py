@@ -1,7 +1,6 @@
 # graph/nodes/inicio.py
-import re
-
 from pliego_esp.graph.state import State
+from embeddings.utils.secciones_md import parsear_markdown
 
 from rich.console import Console
 console = Console()
@@ -10,7 +9,7 @@ async def clean_and_capture_sections(state: State) -> State:
     console.print("-----clean_and_capture_sections-----", style="italic white")
     
     # Eliminar desde la sección "### Parámetros Técnicos Recomendados" en adelante
-    texto_recortado = re.split(r"### Parámetros Técnicos", state["pliego_base"])[0].strip()
+    texto_recortado = parsear_markdown(state["pliego_base"]).texto_antes_de("Parámetros Técnicos", prefijo=True).strip()
     state["pliego_base"] = texto_recortado
     
     # console.print(state["pliego_base"], style="white")
@@ -1,8 +1,8 @@
-from langchain_openai import ChatOpenAI
+from pliego_esp.graph.llm import crear_chat_model
 from langchain_core.prompts import ChatPromptTemplate
 from pliego_esp.graph.configuration import Configuration
 from langchain_core.runnables import RunnableConfig
-from pliego_esp.graph.callbacks import shared_callback_handler
+from pliego_esp.graph.callbacks import costo_del_nodo
 
 from rich.console import Console
 import json
@@ -63,16 +63,12 @@ Devuelve la lista `adicionales_finales` y `other_adicionales` según corresponda
 
 async def match_adicionales(state: dict, *, config: RunnableConfig) -> dict:
     console.print("----- match_adicionales -----", style="bold green")
-    costo_inicial = shared_callback_handler.total_cost
-    
-    console.print(f"Costo inicial: ${costo_inicial:.6f}", style="green")
 
     configuration = Configuration.from_runnable_config(config)
     
-    llm = ChatOpenAI(
+    llm = crear_chat_model(
         model=configuration.chat_model,
-        temperature=0.0,
-        callbacks=[shared_callback_handler]
+        temperature=0.0
     )
 
     match_chain = prompt_template | llm.with_structured_output(MatchAdicionales)
@@ -89,18 +85,15 @@ async def match_adicionales(state: dict, *, config: RunnableConfig) -> dict:
         response = await match_chain.ainvoke({
             "actividades_adicionales": actividades_compatibles_json,
             "actividad_propuesta": actividad_propuesta
-        })
+        }, config)
 
         if response.adicionales_finales:
             adicionales_finales.extend(response.adicionales_finales)
         else:
             otros.extend(response.other_adicionales)
-        
-        console.print(f"Costo parcial después de procesar '{actividad_propuesta}': ${shared_callback_handler.total_cost:.6f}", style="green")
 
-    costo_nodo = shared_callback_handler.total_cost - costo_inicial
+    costo_nodo = costo_del_nodo(config)
     console.print(f"Costo total del nodo match_adicionales: ${costo_nodo:.6f}", style="green")
-    console.print(f"Costo acumulado hasta ahora: ${shared_callback_handler.total_cost:.6f}", style="green")
     
     # Guardar resultados en el state
     state["adicionales_finales"] = [a.model_dump() for a in adicionales_finales]
@@ -112,5 +105,6 @@ async def match_adicionales(state: dict, *, config: RunnableConfig) -> dict:
     console.print(20*"-", style="green")
     return {
         "adicionales_finales": adicionales_finales,
-        "other_adicionales": otros
+        "other_adicionales": otros,
+        "token_cost": costo_nodo
     }
\ No newline at end of file
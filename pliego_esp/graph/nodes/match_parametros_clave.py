@@ -1,11 +1,13 @@
+import asyncio
+
 from langchain_core.runnables import RunnableConfig
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
+from pliego_esp.graph.llm import crear_chat_model
 from langchain_core.output_parsers import StrOutputParser
 
 from pliego_esp.graph.state import State
 from pliego_esp.graph.configuration import Configuration
-from pliego_esp.graph.callbacks import shared_callback_handler
+from pliego_esp.graph.callbacks import costo_del_nodo
 
 from rich.console import Console
 
@@ -32,35 +34,39 @@ Y evalúa si **alguno de los siguientes valores clave del proyecto representa un
 No expliques nada más.
 """)
 
+async def _process_fila(chain, semaforo, fila, parametros_clave, config):
+    async with semaforo:
+        salida = await chain.ainvoke({
+            "parametro": fila["Parámetro Técnico"],
+            "opciones_validas": fila["Opciones Válidas"],
+            "parametros_clave": parametros_clave
+            }, config)
+    return salida
+
 async def match_parametros_clave(state: State, *, config: RunnableConfig) -> State:
     console.print("------ match_parametros_clave ------", style="bold blue")
-    costo_inicial = shared_callback_handler.total_cost
-    
-    console.print(f"Costo inicial: ${costo_inicial:.6f}", style="blue")
     
     configuration = Configuration.from_runnable_config(config)
     
     # Cambiar a gpt-3.5-turbo que tiene mejor soporte para seguimiento de tokens
-    llm = ChatOpenAI(
+    llm = crear_chat_model(
         model=configuration.chat_model,
-        temperature=0.0,
-        callbacks=[shared_callback_handler]
+        temperature=0.0
     )
     
+    chain = fila_prompt | llm | StrOutputParser()
+    semaforo = asyncio.Semaphore(max(1, configuration.max_llamadas_concurrentes))
+
+    # Evaluar todas las filas concurrentemente; gather conserva el orden de la tabla
+    salidas = await asyncio.gather(*[
+        _process_fila(chain, semaforo, fila, state["parametros_clave"], config)
+        for fila in state["parsed_parametros"]
+    ])
+    
     tabla_actualizada = []
     parametros_usados = set()
 
-    for fila in state["parsed_parametros"]:
-        
-        chain = fila_prompt | llm | StrOutputParser()
-        
-        salida = await chain.ainvoke({
-            "parametro": fila["Parámetro Técnico"],
-            "opciones_validas": fila["Opciones Válidas"],
-            "parametros_clave": state["parametros_clave"]
-            })
-        
-        console.print(f"Costo parcial después de procesar '{fila['Parámetro Técnico']}': ${shared_callback_handler.total_cost:.6f}", style="blue")
+    for fila, salida in zip(state["parsed_parametros"], salidas):
         if salida != "-" and salida in state["parametros_clave"]:
             parametros_usados.add(salida)
         
@@ -68,9 +74,8 @@ async def match_parametros_clave(state: State, *, config: RunnableConfig) -> Sta
         tabla_actualizada.append(fila)
 
     # Calcular el costo total de este nodo
-    costo_nodo = shared_callback_handler.total_cost - costo_inicial
+    costo_nodo = costo_del_nodo(config)
     console.print(f"Costo total del nodo match_parametros_clave: ${costo_nodo:.6f}", style="bold blue")
-    console.print(f"Costo acumulado hasta ahora: ${shared_callback_handler.total_cost:.6f}", style="bold blue")
 
     console.print(tabla_actualizada, style="blue")
     
@@ -90,6 +95,7 @@ async def match_parametros_clave(state: State, *, config: RunnableConfig) -> Sta
     return {
         "parsed_parametros": tabla_actualizada,
         "parametros_no_asignados": parametros_no_asignados,
-        "parametros_clave": state["parametros_clave"]
+        "parametros_clave": state["parametros_clave"],
+        "token_cost": costo_nodo
         }
     
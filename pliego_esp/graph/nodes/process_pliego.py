@@ -1,10 +1,10 @@
 from pliego_esp.graph.state import State
 from rich.console import Console
-from langchain_openai import ChatOpenAI
+from pliego_esp.graph.llm import crear_chat_model
 from langchain_core.prompts import ChatPromptTemplate
 from pliego_esp.graph.configuration import Configuration
 from langchain_core.runnables import RunnableConfig
-from pliego_esp.graph.callbacks import shared_callback_handler
+from pliego_esp.graph.callbacks import costo_del_nodo
 from langchain_core.messages import HumanMessage
 
 console = Console()
@@ -19,15 +19,10 @@ def limpiar_bloque_markdown(texto):
 async def process_pliego(state: State, *, config: RunnableConfig) -> State:
     console.print("------ process_pliego ------", style="bold white")
 
-    # Guardar el costo inicial
-    costo_inicial = shared_callback_handler.total_cost
-    console.print(f"Costo inicial: ${costo_inicial:.6f}", style="white")
-
     configuration = Configuration.from_runnable_config(config)
-    llm = ChatOpenAI(
+    llm = crear_chat_model(
         model="gpt-4o",
-        temperature=0.4,
-        callbacks=[shared_callback_handler]
+        temperature=0.4
     )
 
     # Preparar el prompt para generar la especificación técnica
@@ -123,19 +118,18 @@ El resultado debe ser una especificación técnica **clara, profesional y lista
         especificacion_base=state.get("pliego_base", "")
     ).to_messages()
 
-    especificacion_generada = await llm.ainvoke(prompt)
+    especificacion_generada = await llm.ainvoke(prompt, config)
     
     resultado_limpio = limpiar_bloque_markdown(especificacion_generada.content)
 
     console.print(resultado_limpio, style="white")
     
-    costo_nodo = shared_callback_handler.total_cost - costo_inicial
+    costo_nodo = costo_del_nodo(config)
     console.print(f"Costo total del nodo process_pliego: ${costo_nodo:.6f}", style="bold white")
-    console.print(f"Costo acumulado hasta ahora: ${shared_callback_handler.total_cost:.6f}", style="white")
     
     console.print(20*"-", style="bold white")
 
     return {
         "especificacion_generada": resultado_limpio,
-        "token_cost": shared_callback_handler.total_cost
+        "token_cost": costo_nodo
     }
\ No newline at end of file
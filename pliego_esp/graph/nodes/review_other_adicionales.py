@@ -1,10 +1,10 @@
 from pliego_esp.graph.state import State
 from rich.console import Console
-from langchain_openai import ChatOpenAI
+from pliego_esp.graph.llm import crear_chat_model
 from langchain_core.prompts import ChatPromptTemplate
 from pliego_esp.graph.configuration import Configuration
 from langchain_core.runnables import RunnableConfig
-from pliego_esp.graph.callbacks import shared_callback_handler
+from pliego_esp.graph.callbacks import costo_del_nodo
 import asyncio
 from functools import partial
 
@@ -42,12 +42,12 @@ class ReviewOtherAdicionales(BaseModel):
     comentario: str = Field(description="Una única oración breve y objetiva que indique si la actividad adicional es complementaria y aplicable técnicamente. Aclarar que debe ser una relación técnica, no de otra naturaleza.")
     corresponde: Literal["Sí", "No", "Parcialmente"] = Field(description="Indica si la actividad adicional corresponde (Sí / No / Parcialmente)")
 
-async def _process_adicional(review_chain, adicional, especificacion_generada):
+async def _process_adicional(review_chain, adicional, especificacion_generada, config):
     try:
         evaluacion = await review_chain.ainvoke({
             "especificacion_generada": especificacion_generada,
             "descripcion_adicional": adicional.get("descripcion", "")
-        })
+        }, config)
         return evaluacion.model_dump()
     except Exception as e:
         console.print(f"Error procesando adicional: {str(e)}", style="bold red")
@@ -56,15 +56,11 @@ async def _process_adicional(review_chain, adicional, especificacion_generada):
 async def review_other_adicionales(state: State, *, config: RunnableConfig) -> State:
     console.print("------ review_other_adicionales ------", style="bold green")
 
-    costo_inicial = shared_callback_handler.total_cost
-    console.print(f"Costo inicial: ${costo_inicial:.6f}", style="green")
-
     configuration = Configuration.from_runnable_config(config)
     
-    llm = ChatOpenAI(
+    llm = crear_chat_model(
         model=configuration.chat_model,
-        temperature=0.0,
-        callbacks=[shared_callback_handler]
+        temperature=0.0
     )
 
     review_chain = prompt_template | llm.with_structured_output(ReviewOtherAdicionales)
@@ -79,7 +75,8 @@ async def review_other_adicionales(state: State, *, config: RunnableConfig) -> S
         _process_adicional(
             review_chain,
             adicional,
-            state["especificacion_generada"]
+            state["especificacion_generada"],
+            config
         )
         for adicional in adicionales_filtrados
     ]
@@ -91,8 +88,7 @@ async def review_other_adicionales(state: State, *, config: RunnableConfig) -> S
     evaluaciones = [e for e in evaluaciones if e is not None]
     
     console.print(evaluaciones, style="bold green")    
-    costo_nodo = shared_callback_handler.total_cost - costo_inicial
+    costo_nodo = costo_del_nodo(config)
     console.print(f"Costo total del nodo review_unassigned_parameters: ${costo_nodo:.6f}", style="green")
-    console.print(f"Costo acumulado hasta ahora: ${shared_callback_handler.total_cost:.6f}", style="green")
 
-    return {"evaluaciones_adicionales": evaluaciones}
\ No newline at end of file
+    return {"evaluaciones_adicionales": evaluaciones, "token_cost": costo_nodo}
\ No newline at end of file
@@ -1,12 +1,13 @@
 from pliego_esp.graph.state import State
 from rich.console import Console
-from langchain_openai import ChatOpenAI
+from pliego_esp.graph.llm import crear_chat_model
 from langchain_core.prompts import ChatPromptTemplate
 from pliego_esp.graph.configuration import Configuration
 from langchain_core.runnables import RunnableConfig
-from pliego_esp.graph.callbacks import shared_callback_handler
+from pliego_esp.graph.callbacks import costo_del_nodo
+import asyncio
 
-from typing import Optional, Literal
+from typing import List, Optional, Literal
 
 from pydantic import BaseModel, Field
 
@@ -33,7 +34,31 @@ Evalúa si el parámetro técnico entregado puede aplicarse de forma técnica y
 
 Debes proporcionar tu respuesta en formato estructurado según el modelo definido.
 """)
-    
+
+lote_prompt_template = ChatPromptTemplate.from_template("""
+Eres un asistente experto en construcción y redacción de especificaciones técnicas.
+
+A continuación se presenta una especificación técnica y una lista de parámetros técnicos con su valor asignado. Tu tarea es evaluar, para cada parámetro por separado, si es **aplicable técnicamente** al contexto de la especificación.
+
+---
+
+## Especificación técnica:
+
+{especificacion_generada}
+
+## Parámetros Técnicos:
+
+{parametros_tecnicos}
+
+---
+
+Evalúa cada parámetro técnico entregado: si puede aplicarse de forma técnica y coherente dentro del contexto del ítem descrito (materiales, procesos, resultados, requisitos funcionales o estéticos).
+
+Devuelve exactamente una evaluación por parámetro, en el mismo orden de la lista y con el nombre y valor tal como aparecen.
+
+Debes proporcionar tu respuesta en formato estructurado según el modelo definido.
+""")
+
 class ReviewUnassignedParameters(BaseModel):
     parametro: str = Field(description="El nombre del parámetro técnico")
     valor: str = Field(description="El valor asignado al parámetro")
@@ -41,50 +66,114 @@ class ReviewUnassignedParameters(BaseModel):
     corresponde: Literal["Sí", "No", "Parcialmente"] = Field(description="Indica si el parámetro corresponde (Sí / No / Parcialmente)")
     calificacion: int = Field(description="Una calificación entre 1 (no aplicable) y 10 (totalmente aplicable) basada en la relevancia del parámetro en el contexto técnico de la especificación")
 
+class ReviewUnassignedParametersLote(BaseModel):
+    evaluaciones: List[ReviewUnassignedParameters] = Field(description="Una evaluación por cada parámetro técnico de la lista, en el mismo orden")
+
+async def _process_parametro(review_chain, semaforo, parametro, especificacion_generada, config) -> Optional[dict]:
+    async with semaforo:
+        try:
+            evaluacion = await review_chain.ainvoke({
+                "especificacion_generada": especificacion_generada,
+                "parametro_tecnico": parametro["nombre"],
+                "valor_asignado": parametro["valor"]
+            }, config)
+        except Exception as e:
+            console.print(f"Error procesando parámetro '{parametro['nombre']}': {str(e)}", style="bold red")
+            return None
+
+    return evaluacion.model_dump()
+
+async def _process_lote(lote_chain, review_chain, semaforo, lote, especificacion_generada, config) -> List[Optional[dict]]:
+    """
+    Evalúa un lote de parámetros en una sola llamada. Los parámetros que el modelo
+    omita en la respuesta se evalúan individualmente.
+    """
+    lista = "\n".join(f"{i}. {p['nombre']}: {p['valor']}" for i, p in enumerate(lote, start=1))
+
+    async with semaforo:
+        try:
+            respuesta = await lote_chain.ainvoke({
+                "especificacion_generada": especificacion_generada,
+                "parametros_tecnicos": lista
+            }, config)
+            recibidas = respuesta.evaluaciones
+        except Exception as e:
+            console.print(f"Error procesando lote de parámetros: {str(e)}", style="bold red")
+            recibidas = []
+
+    # Asociar cada evaluación a su parámetro por nombre (el orden puede no respetarse)
+    por_nombre = {}
+    for evaluacion in recibidas:
+        por_nombre.setdefault(evaluacion.parametro.strip().casefold(), evaluacion)
+
+    resultados = []
+    faltantes = []
+    for i, parametro in enumerate(lote):
+        evaluacion = por_nombre.pop(parametro["nombre"].casefold(), None)
+        if evaluacion is not None:
+            resultados.append(evaluacion.model_dump())
+        else:
+            resultados.append(None)
+            faltantes.append(i)
+
+    if faltantes:
+        console.print(f"Reintentando {len(faltantes)} parámetros omitidos en el lote", style="yellow")
+        reintentos = await asyncio.gather(*[
+            _process_parametro(review_chain, semaforo, lote[i], especificacion_generada, config)
+            for i in faltantes
+        ])
+        for i, evaluacion in zip(faltantes, reintentos):
+            resultados[i] = evaluacion
+
+    return resultados
+
 async def review_unassigned_parameters(state: State, *, config: RunnableConfig) -> State:
     console.print("------ review_unassigned_parameters ------", style="bold green")
 
-    costo_inicial = shared_callback_handler.total_cost
-    console.print(f"Costo inicial: ${costo_inicial:.6f}", style="green")
-
     configuration = Configuration.from_runnable_config(config)
-    llm = ChatOpenAI(
+    llm = crear_chat_model(
         model=configuration.chat_model,
-        temperature=0.5,
-        callbacks=[shared_callback_handler]
+        temperature=0.5
     )
 
     # Usar with_structured_output en lugar de StrOutputParser
     review_chain = prompt_template | llm.with_structured_output(ReviewUnassignedParameters)
-
-    evaluaciones = []
-    cost = 0
+    semaforo = asyncio.Semaphore(max(1, configuration.max_llamadas_concurrentes))
 
     parametros_clave = state.get("parametros_clave", [])
     # Filtra parámetros clave con recomendación no vacía
-    parametros_filtrados = [p for p in parametros_clave if not p.get("recomendacion")]
-    
+    parametros_filtrados = [
+        {"nombre": p.get("nombre", "").strip(), "valor": p.get("valor", "").strip()}
+        for p in parametros_clave if not p.get("recomendacion")
+    ]
+
     console.print(parametros_filtrados, style="red")
-    for parametro in parametros_filtrados:
-        parametro_nombre = parametro.get("nombre", "").strip()
-        valor_asignado = parametro.get("valor", "").strip()
-
-        evaluacion = await review_chain.ainvoke({
-            "especificacion_generada": state["especificacion_generada"],
-            "parametro_tecnico": parametro_nombre,
-            "valor_asignado": valor_asignado
-        })
-        
-        console.print(f"Costo parcial después de procesar '{parametro_nombre}': ${shared_callback_handler.total_cost:.6f}", style="green")
-
-        evaluaciones.append(
-            evaluacion.model_dump()
-        )
-        cost += shared_callback_handler.total_cost
-    
-    console.print(evaluaciones, style="bold green")    
-    costo_nodo = shared_callback_handler.total_cost - costo_inicial
+    especificacion_generada = state["especificacion_generada"]
+
+    if configuration.modo_revision_parametros == "lote":
+        # La especificación se envía una vez por lote en lugar de una vez por parámetro
+        lote_chain = lote_prompt_template | llm.with_structured_output(ReviewUnassignedParametersLote)
+        tamano_lote = max(1, configuration.parametros_por_lote)
+        lotes = [
+            parametros_filtrados[i:i + tamano_lote]
+            for i in range(0, len(parametros_filtrados), tamano_lote)
+        ]
+        resultados = await asyncio.gather(*[
+            _process_lote(lote_chain, review_chain, semaforo, lote, especificacion_generada, config)
+            for lote in lotes
+        ])
+        evaluaciones = [e for resultado in resultados for e in resultado]
+    else:
+        evaluaciones = await asyncio.gather(*[
+            _process_parametro(review_chain, semaforo, parametro, especificacion_generada, config)
+            for parametro in parametros_filtrados
+        ])
+
+    # Filtrar resultados None
+    evaluaciones = [e for e in evaluaciones if e is not None]
+
+    console.print(evaluaciones, style="bold green")
+    costo_nodo = costo_del_nodo(config)
     console.print(f"Costo total del nodo review_unassigned_parameters: ${costo_nodo:.6f}", style="green")
-    console.print(f"Costo acumulado hasta ahora: ${shared_callback_handler.total_cost:.6f}", style="green")
 
-    return {"evaluaciones_otros_parametros": evaluaciones}
\ No newline at end of file
+    return {"evaluaciones_otros_parametros": evaluaciones, "token_cost": costo_nodo}
@@ -1,11 +1,11 @@
-from langchain_openai import ChatOpenAI
+from pliego_esp.graph.llm import crear_chat_model
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_community.callbacks.openai_info import OpenAICallbackHandler
 
 from pliego_esp.graph.state import State
 from pliego_esp.graph.configuration import Configuration
 from langchain_core.runnables import RunnableConfig
-from pliego_esp.graph.callbacks import shared_callback_handler
+from pliego_esp.graph.callbacks import costo_del_nodo
 
 from rich.console import Console
 
@@ -14,15 +14,10 @@ console = Console()
 async def unassigned_parameters(state: State, *, config: RunnableConfig) -> State:
     console.print("------ unassigned_parameters ------", style="bold magenta")
 
-    # Guardar el costo inicial
-    costo_inicial = shared_callback_handler.total_cost
-    console.print(f"Costo inicial: ${costo_inicial:.6f}", style="magenta")
-
     configuration = Configuration.from_runnable_config(config)
-    llm = ChatOpenAI(
+    llm = crear_chat_model(
         model=configuration.chat_model,
-        temperature=0.0,
-        callbacks=[shared_callback_handler]
+        temperature=0.0
     )
 
     nombre_prompt = ChatPromptTemplate.from_template("""
@@ -47,12 +42,11 @@ Tu tarea es sugerir un nombre técnico **de una sola palabra**, clara y neutra,
 - Si no puedes generar una palabra adecuada, responde con: "Otros"
 - Responde solo con una palabra, sin explicaciones ni puntuación.
 """)
-    cost = 0
     nuevos = []
     console.print(f"Nuevos parametros: {len(state['parametros_no_asignados'])}", style="bold magenta")
     for clave in state["parametros_no_asignados"]:
         prompt = nombre_prompt.format_prompt(parametro_clave=clave).to_messages()
-        sugerido = llm.invoke(prompt).content.strip()
+        sugerido = llm.invoke(prompt, config).content.strip()
 
         if sugerido.lower() == "otros" or sugerido == "":
             nombre_param = "Otros"
@@ -66,15 +60,10 @@ Tu tarea es sugerir un nombre técnico **de una sola palabra**, clara y neutra,
             "Valor Asignado": clave
         }
         nuevos.append(nueva_fila)
-        
-        cost += shared_callback_handler.total_cost
-        
-        console.print(f"Costo parcial después de procesar '{clave}': ${shared_callback_handler.total_cost:.6f}", style="magenta")
     
     # Calcular el costo total de este nodo
-    costo_nodo = shared_callback_handler.total_cost - costo_inicial
+    costo_nodo = costo_del_nodo(config)
     console.print(f"Costo total del nodo add_other_parametros: ${costo_nodo:.6f}", style="bold magenta")
-    console.print(f"Costo acumulado hasta ahora: ${shared_callback_handler.total_cost:.6f}", style="magenta")
     
     console.print(f"Nuevos parametros: {len(nuevos)}", style="magenta")
     for fila in nuevos:
@@ -83,4 +72,5 @@ Tu tarea es sugerir un nombre técnico **de una sola palabra**, clara y neutra,
     console.print(20*"-", style="bold magenta")
     return {
         "other_parametros": nuevos,
+        "token_cost": costo_nodo
         }
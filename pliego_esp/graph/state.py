@@ -46,6 +46,7 @@ class State(MessagesState):
         metadata={"description": "Otros parámetros clave que no coinciden en ninguno de los parametros del pliego base"}
         )
     
+    # Solo lo escribe review_unassigned_parameters (rama paralela a review_other_adicionales)
     evaluaciones_otros_parametros: List[Dict[str, str]] = field(
         default_factory=list,
         metadata={"description": "Tabla de evaluaciones de parámetros en formato lista de diccionarios"}
@@ -82,6 +83,7 @@ class State(MessagesState):
         metadata={"description": "Otros adicionales para la nueva especificación"}
         )
     
+    # Solo lo escribe review_other_adicionales (rama paralela a review_unassigned_parameters)
     evaluaciones_adicionales: List[Dict[str, str]] = field(
         default_factory=list,
         metadata={"description": "Evaluaciones de actividades adicionales en formato lista de diccionarios"}
@@ -98,6 +100,13 @@ class State(MessagesState):
         metadata={"description": "Especificación generada en formato Markdown."}
         )
     
+    # Entrada y modelo con los que se inició la conversación: al terminar (aunque
+    # se haya reanudado tras una interrupción) la especificación se guarda con su clave
+    entrada_cache: Dict[str, Any] = field(
+        default_factory=dict,
+        metadata={"description": "Entrada original y modelo para la caché de especificaciones"}
+        )
+    
     def __getitem__(self, key):
         """Método para acceder a los elementos del estado como diccionario."""
         if hasattr(self, key):
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from pliego_esp.utils.checkpointer import DjangoCheckpointSaver, PLIEGO_CHECKPOINT_TTL_HORAS
+
+
+class Command(BaseCommand):
+    help = 'Elimina los checkpoints de las conversaciones de pliegos sin actividad reciente'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--horas',
+            type=int,
+            default=PLIEGO_CHECKPOINT_TTL_HORAS,
+            help=f'Horas sin actividad para considerar vencida una conversación (default: {PLIEGO_CHECKPOINT_TTL_HORAS})',
+        )
+
+    def handle(self, *args, **options):
+        eliminados = DjangoCheckpointSaver().podar(options['horas'])
+        self.stdout.write(self.style.SUCCESS(f'{eliminados} conversaciones eliminadas'))
@@ -0,0 +1,49 @@
+# Generated by Django 5.2 on 2026-10-18 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pliego_esp', '0002_alter_tokencost_user'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CheckpointGrafo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('thread_id', models.CharField(max_length=255)),
+                ('checkpoint_ns', models.CharField(blank=True, default='', max_length=255)),
+                ('checkpoint_id', models.CharField(max_length=255)),
+                ('parent_checkpoint_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('tipo', models.CharField(max_length=50)),
+                ('checkpoint', models.BinaryField()),
+                ('tipo_metadata', models.CharField(max_length=50)),
+                ('metadata', models.BinaryField()),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('thread_id', 'checkpoint_ns', 'checkpoint_id'), name='checkpoint_grafo_unico')],
+            },
+        ),
+        migrations.CreateModel(
+            name='EscrituraCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('thread_id', models.CharField(max_length=255)),
+                ('checkpoint_ns', models.CharField(blank=True, default='', max_length=255)),
+                ('checkpoint_id', models.CharField(max_length=255)),
+                ('task_id', models.CharField(max_length=255)),
+                ('task_path', models.CharField(blank=True, default='', max_length=255)),
+                ('idx', models.IntegerField()),
+                ('canal', models.CharField(max_length=255)),
+                ('tipo', models.CharField(max_length=50)),
+                ('valor', models.BinaryField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('thread_id', 'checkpoint_ns', 'checkpoint_id', 'task_id', 'idx'), name='escritura_checkpoint_unica')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2 on 2026-10-18 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pliego_esp', '0003_checkpointgrafo_escrituracheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TituloMejoradoCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=64, unique=True)),
+                ('titulo_normalizado', models.TextField()),
+                ('modelo', models.CharField(max_length=100)),
+                ('version_prompt', models.PositiveIntegerField()),
+                ('titulo_mejorado', models.TextField()),
+                ('aciertos', models.PositiveIntegerField(default=0)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_ultimo_uso', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
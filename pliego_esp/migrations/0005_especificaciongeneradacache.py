@@ -0,0 +1,30 @@
+# Generated by Django 5.2 on 2026-10-18 16:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pliego_esp', '0004_titulomejoradocache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EspecificacionGeneradaCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=64, unique=True)),
+                ('clave_base', models.CharField(db_index=True, max_length=64)),
+                ('modelo', models.CharField(max_length=100)),
+                ('titulo', models.CharField(max_length=255)),
+                ('entrada', models.JSONField()),
+                ('vector', models.JSONField(blank=True, null=True)),
+                ('especificacion_generada', models.TextField()),
+                ('token_cost', models.FloatField(default=0)),
+                ('aciertos', models.PositiveIntegerField(default=0)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_ultimo_uso', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
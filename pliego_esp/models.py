@@ -21,3 +21,115 @@ class TokenCost(models.Model):
             return f"TokenCost: Usuario anónimo - {self.total_cost}"
     
     
+class EspecificacionGeneradaCache(models.Model):
+    """
+    Especificaciones generadas por el grafo, por combinación de pliego base, título,
+    parámetros clave y adicionales (ver pliego_esp.utils.cache_especificaciones).
+    """
+    clave = models.CharField(max_length=64, unique=True)
+    clave_base = models.CharField(max_length=64, db_index=True)
+    modelo = models.CharField(max_length=100)
+    titulo = models.CharField(max_length=255)
+    entrada = models.JSONField()
+    vector = models.JSONField(null=True, blank=True)
+    especificacion_generada = models.TextField()
+    token_cost = models.FloatField(default=0)
+    aciertos = models.PositiveIntegerField(default=0)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_ultimo_uso = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.titulo} ({self.modelo})"
+
+
+class ConsumoConversacion(models.Model):
+    """
+    Tokens y costo acumulados de una conversación del grafo (thread_id), sumando
+    la ejecución inicial y cada reanudación tras una interrupción.
+    """
+    thread_id = models.CharField(max_length=255, unique=True)
+    prompt_tokens = models.PositiveIntegerField(default=0)
+    completion_tokens = models.PositiveIntegerField(default=0)
+    total_tokens = models.PositiveIntegerField(default=0)
+    costo = models.FloatField(default=0)
+    ejecuciones = models.PositiveIntegerField(default=0)
+    por_nodo = models.JSONField(default=dict)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Consumo {self.thread_id} - {self.costo}"
+
+    def como_dict(self):
+        return {
+            'thread_id': self.thread_id,
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'total_tokens': self.total_tokens,
+            'costo': self.costo,
+            'ejecuciones': self.ejecuciones,
+            'por_nodo': self.por_nodo,
+        }
+
+
+class CheckpointGrafo(models.Model):
+    """Checkpoint del grafo de pliegos (ver pliego_esp.utils.checkpointer)."""
+    thread_id = models.CharField(max_length=255)
+    checkpoint_ns = models.CharField(max_length=255, blank=True, default='')
+    checkpoint_id = models.CharField(max_length=255)
+    parent_checkpoint_id = models.CharField(max_length=255, null=True, blank=True)
+    tipo = models.CharField(max_length=50)
+    checkpoint = models.BinaryField()
+    tipo_metadata = models.CharField(max_length=50)
+    metadata = models.BinaryField()
+    fecha_creacion = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['thread_id', 'checkpoint_ns', 'checkpoint_id'],
+                name='checkpoint_grafo_unico'
+            )
+        ]
+
+    def __str__(self):
+        return f"Checkpoint {self.thread_id} - {self.checkpoint_id}"
+
+
+class EscrituraCheckpoint(models.Model):
+    """Escrituras pendientes de un checkpoint (resultados de nodos, interrupciones)."""
+    thread_id = models.CharField(max_length=255)
+    checkpoint_ns = models.CharField(max_length=255, blank=True, default='')
+    checkpoint_id = models.CharField(max_length=255)
+    task_id = models.CharField(max_length=255)
+    task_path = models.CharField(max_length=255, blank=True, default='')
+    idx = models.IntegerField()
+    canal = models.CharField(max_length=255)
+    tipo = models.CharField(max_length=50)
+    valor = models.BinaryField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['thread_id', 'checkpoint_ns', 'checkpoint_id', 'task_id', 'idx'],
+                name='escritura_checkpoint_unica'
+            )
+        ]
+
+    def __str__(self):
+        return f"Escritura {self.thread_id} - {self.checkpoint_id} - {self.canal}"
+
+
+class TituloMejoradoCache(models.Model):
+    """Respuestas de amejorar_titulo_especificacion (ver pliego_esp.utils.cache_titulos)."""
+    clave = models.CharField(max_length=64, unique=True)
+    titulo_normalizado = models.TextField()
+    modelo = models.CharField(max_length=100)
+    version_prompt = models.PositiveIntegerField()
+    titulo_mejorado = models.TextField()
+    aciertos = models.PositiveIntegerField(default=0)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_ultimo_uso = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.titulo_normalizado} -> {self.titulo_mejorado}"
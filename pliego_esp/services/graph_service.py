@@ -1,12 +1,16 @@
 # graph_service.py
 
-from typing import Optional
+from typing import AsyncIterator, Optional
 from langchain_core.runnables import RunnableConfig
 
 from pliego_esp.graph.state import State
 from pliego_esp.models import TokenCost
-from pliego_esp.compile_graphs import get_workflow, get_memory_saver
-from pliego_esp.graph.callbacks import shared_callback_handler
+from pliego_esp.compile_graphs import aget_workflow
+from pliego_esp.graph.callbacks import ConsumoTokens
+from pliego_esp.graph.configuration import Configuration
+from pliego_esp.utils.cache_especificaciones import buscar_especificacion, guardar_especificacion
+from pliego_esp.utils.consumo_conversaciones import acumular_consumo
+from pliego_esp.utils.streaming import FiltroBloqueMarkdown
 
 from rich.console import Console
 from asgiref.sync import sync_to_async
@@ -56,19 +60,67 @@ El **pago** se efectuará en función del avance efectivamente medido y aprobado
 class PliegoEspService:
         # Variables de clase para guardar temporalmente
     saved_config: Optional[RunnableConfig] = None
-    workflow = get_workflow()
     
     
+    # Nodos cuyo texto generado se envía al cliente token a token
+    NODOS_CON_TEXTO = {"process_pliego", "add_unassigned_parameters", "add_other_adicionales"}
+
     @staticmethod
     async def process_pliego(input: dict, config: RunnableConfig, user=None, resume_data=False ) -> dict:
+        """
+        Ejecuta el workflow hasta la siguiente interrupción (o hasta el final) y
+        retorna solo ese resultado. Ver stream_pliego para recibir el avance.
+        """
+        resultado = None
+        async for evento in PliegoEspService.stream_pliego(input, config, user, resume_data):
+            if evento["type"] in ("__interrupt__", "final", "error"):
+                resultado = evento
+        return resultado
+
+    @staticmethod
+    async def stream_pliego(input: dict, config: RunnableConfig, user=None, resume_data=False ) -> AsyncIterator[dict]:
+        """
+        Ejecuta el workflow emitiendo eventos a medida que ocurren:
+
+        - {"type": "inicio"}: apenas comienza la ejecución
+        - {"type": "token", "nodo", "content"}: fragmento de la especificación que genera un nodo
+        - {"type": "nodo", "nodo"}: un nodo terminó
+        - {"type": "__interrupt__", "action", "items", "config"}: se necesita la respuesta del usuario
+        - {"type": "final", "content", "token_cost", "conversation_id", "desde_cache", "consumo"}: especificación
+          terminada, con los tokens y el costo acumulados de la conversación (ver acumular_consumo)
+        - {"type": "error", "response", "token_cost"}: no se pudo ejecutar
+
+        Si la misma entrada ya se generó antes (ver cache_especificaciones), se
+        responde con esa especificación sin ejecutar el workflow y con costo cero.
+        """
+        thread_id = config["configurable"]["thread_id"]
+        modelo = config["configurable"].get("chat_model") or Configuration.chat_model
 
-        workflow = PliegoEspService.workflow
+        if resume_data is False:
+            en_cache = await sync_to_async(buscar_especificacion)(input, modelo)
+            if en_cache is not None:
+                console.print(f"Especificación obtenida de la caché (similitud {en_cache['similitud']:.3f})", style="bold blue")
+                yield {"type": "inicio", "conversation_id": thread_id}
+                yield {
+                    "type": "final",
+                    "content": en_cache["especificacion_generada"],
+                    "token_cost": 0.0,
+                    "conversation_id": thread_id,
+                    "desde_cache": True,
+                    "consumo": None
+                }
+                return
+
+        # El grafo se compila en el primer uso (ver compile_graphs.get_workflow)
+        workflow = await aget_workflow()
         
         if workflow is None:
-            return {
+            yield {
+                "type": "error",
                 "response": "Error: El sistema no está inicializado correctamente. Por favor, contacte al administrador.",
                 "token_cost": 0
             }
+            return
         
         # Solo intentar obtener TokenCost si el usuario está autenticado
         if user and hasattr(user, 'is_authenticated') and user.is_authenticated:
@@ -79,10 +131,12 @@ class PliegoEspService:
                 total_cost = token_cost.total_cost
                 ratio = total_cost/credits*100
                 if ratio > 100:
-                    return {
+                    yield {
+                        "type": "error",
                         "response": "No tienes suficientes créditos para continuar. Por favor, actualiza tu plan.",
                         "token_cost": 0
                     }
+                    return
             except TokenCost.DoesNotExist:
                 # Si no existe un registro para este usuario, usamos los valores por defecto
                 pass
@@ -95,17 +149,7 @@ class PliegoEspService:
                 parametros_clave=input["parametros_clave"],
                 adicionales=input["adicionales"],
                 token_cost=0.0,
-                
-                
-                # # TODO: Solo es para el grafo resumido, se debe eliminar
-                # especificacion_generada=esp_generada,
-                # other_parametros=[
-                # {'Parámetro Técnico': 'Color', 'Opciones válidas': '-', 'Valor por defecto': '-', 'Valor Asignado': 'Pintura de 3 colores'},
-                # {'Parámetro Técnico': 'Revoque', 'Opciones válidas': '-', 'Valor por defecto': '-', 'Valor Asignado': 'Realizar revoque'}
-                #     ],
-                # other_adicionales=[
-                #     {'actividad': 'Otros', 'descripcion': 'colocación de barreras de protección para evitar choque de los montacargas'}
-                #     ]
+                entrada_cache={"entrada": input, "modelo": modelo},
                 )
 
             PliegoEspService.saved_config = config
@@ -113,30 +157,88 @@ class PliegoEspService:
         else:
             run_input = Command(resume=input)
             
-        final_response = None
-        # Primera invocación del workflow
-        async for event in workflow.astream(run_input, config):
-            clave = next(iter(event))
+        # Registro de tokens y costo propio de esta ejecución; no se agrega al config
+        # original porque éste se devuelve al cliente en las interrupciones
+        consumo = ConsumoTokens(thread_id=thread_id)
+        config_ejecucion = {**config, "callbacks": [consumo]}
+
+        yield {"type": "inicio", "conversation_id": thread_id}
+
+        # Un filtro por nodo: los tokens se envían sin el bloque ```markdown que el
+        # nodo quita del texto completo (ver limpiar_bloque_markdown)
+        filtros = {}
+
+        # "updates" informa el fin de cada nodo; "messages" entrega los tokens de los LLM
+        async for modo, datos in workflow.astream(run_input, config_ejecucion, stream_mode=["updates", "messages"]):
+            if modo == "messages":
+                chunk, metadata = datos
+                nodo = metadata.get("langgraph_node")
+                if nodo in PliegoEspService.NODOS_CON_TEXTO and isinstance(chunk.content, str) and chunk.content:
+                    filtro = filtros.setdefault(nodo, FiltroBloqueMarkdown())
+                    contenido = filtro.agregar(chunk.content)
+                    if contenido:
+                        yield {"type": "token", "nodo": nodo, "content": contenido}
+                continue
+
+            clave = next(iter(datos))
             console.print(clave, style="bold red")
+
+            filtro = filtros.pop(clave, None)
+            if filtro is not None:
+                contenido = filtro.finalizar()
+                if contenido:
+                    yield {"type": "token", "nodo": clave, "content": contenido}
             
-            if "__interrupt__" in event:
+            if clave == "__interrupt__":
                 console.print("INTERRUPCION", style="bold red")
-                interrupt_obj = event["__interrupt__"][0]
+                interrupt_obj = datos["__interrupt__"][0]
+                await sync_to_async(PliegoEspService._registrar_consumo)(consumo)
                 
-                return {
+                yield {
                     "type": clave,
                     "action": interrupt_obj.value["action"],
                     "items": interrupt_obj.value["items"],
                     "config": config
                 }
-            final_response = event[clave]
+                return
+
+            yield {"type": "nodo", "nodo": clave}
+
+        consumo_conversacion = await sync_to_async(PliegoEspService._registrar_consumo)(consumo)
 
-        # Obtener el costo total acumulado del callback_handler compartido
-        token_cost = shared_callback_handler.total_cost
+        # Especificación y costo total de la conversación (suma de los costos de cada nodo)
+        estado = await workflow.aget_state(config)
+        especificacion_generada = estado.values["especificacion_generada"]
+        token_cost = estado.values.get("token_cost", 0.0)
 
-        return {
+        # Se guarda con la clave de la entrada original, también al terminar una
+        # reanudación: la mayoría de las ejecuciones se interrumpen al menos una vez
+        entrada_cache = estado.values.get("entrada_cache")
+        if entrada_cache:
+            await sync_to_async(guardar_especificacion)(
+                entrada_cache["entrada"], entrada_cache["modelo"], especificacion_generada, token_cost
+            )
+
+        yield {
             "type": "final",
-            "content": final_response["especificacion_generada"],
+            "content": especificacion_generada,
             "token_cost": token_cost,
-            "conversation_id": config["configurable"]["thread_id"]
+            "conversation_id": thread_id,
+            "desde_cache": False,
+            "consumo": consumo_conversacion
         }
+
+    @staticmethod
+    def _registrar_consumo(consumo: ConsumoTokens) -> dict:
+        """
+        Muestra el consumo de la ejecución por nodo y lo suma al de la conversación.
+
+        Returns:
+            dict: Consumo acumulado de la conversación
+        """
+        console.print(f"Consumo de la ejecución {consumo.thread_id}: ${consumo.total_cost:.6f} ({consumo.total_tokens} tokens)", style="bold blue")
+        for nodo, datos in consumo.resumen().items():
+            console.print(f"  {nodo}: ${datos['costo']:.6f} ({datos['total_tokens']} tokens, {datos['llamadas']} llamadas)", style="blue")
+        acumulado = acumular_consumo(consumo)
+        console.print(f"Consumo de la conversación {consumo.thread_id}: ${acumulado['costo']:.6f} ({acumulado['total_tokens']} tokens, {acumulado['ejecuciones']} ejecuciones)", style="bold blue")
+        return acumulado
@@ -1,3 +1,435 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from functools import partial
+from importlib import import_module
+from unittest import mock
 
-# Create your tests here.
+import httpx
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+from langgraph.checkpoint.base import create_checkpoint, empty_checkpoint
+from langgraph.checkpoint.memory import MemorySaver
+
+from pliego_esp.graph.callbacks import ConsumoTokens
+from pliego_esp.graph.graph import construir_workflow
+from pliego_esp.graph.nodes.match_parametros_clave import match_parametros_clave
+from pliego_esp.graph.nodes.process_pliego import limpiar_bloque_markdown
+from pliego_esp.models import CheckpointGrafo, ConsumoConversacion, EscrituraCheckpoint, TituloMejoradoCache
+from pliego_esp.services.graph_service import PliegoEspService
+from pliego_esp.utils.cache_especificaciones import buscar_especificacion, guardar_especificacion
+from pliego_esp.utils.cache_titulos import buscar_titulo, guardar_titulo
+from pliego_esp.utils import mejorar_titulo
+from pliego_esp.utils.checkpointer import DjangoCheckpointSaver
+from pliego_esp.utils.streaming import FiltroBloqueMarkdown
+
+
+def _config(thread_id, checkpoint_id=None):
+    configurable = {"thread_id": thread_id, "checkpoint_ns": ""}
+    if checkpoint_id is not None:
+        configurable["checkpoint_id"] = checkpoint_id
+    return {"configurable": configurable}
+
+
+class DjangoCheckpointSaverTests(TestCase):
+    def setUp(self):
+        self.saver = DjangoCheckpointSaver()
+
+    def _guardar(self, thread_id, paso, padre=None):
+        checkpoint = create_checkpoint(empty_checkpoint(), None, paso)
+        checkpoint["channel_values"] = {"titulo": f"Título {paso}"}
+        return self.saver.put(_config(thread_id, padre), checkpoint, {"step": paso}, {})
+
+    def test_put_y_get_tuple(self):
+        primero = self._guardar("hilo", 1)
+        segundo = self._guardar("hilo", 2, padre=primero["configurable"]["checkpoint_id"])
+
+        ultimo = self.saver.get_tuple(_config("hilo"))
+        self.assertEqual(ultimo.config, segundo)
+        self.assertEqual(ultimo.checkpoint["channel_values"], {"titulo": "Título 2"})
+        self.assertEqual(ultimo.metadata, {"step": 2})
+        self.assertEqual(ultimo.parent_config["configurable"]["checkpoint_id"], primero["configurable"]["checkpoint_id"])
+
+        anterior = self.saver.get_tuple(primero)
+        self.assertEqual(anterior.checkpoint["channel_values"], {"titulo": "Título 1"})
+        self.assertIsNone(anterior.parent_config)
+
+        self.assertIsNone(self.saver.get_tuple(_config("otro-hilo")))
+
+    def test_list_filtra_por_hilo_before_y_limit(self):
+        configs = [self._guardar("hilo", paso) for paso in range(3)]
+        self._guardar("otro-hilo", 0)
+
+        ids = [tupla.config["configurable"]["checkpoint_id"] for tupla in self.saver.list(_config("hilo"))]
+        self.assertEqual(ids, [config["configurable"]["checkpoint_id"] for config in reversed(configs)])
+
+        antes = list(self.saver.list(_config("hilo"), before=configs[2], limit=1))
+        self.assertEqual(len(antes), 1)
+        self.assertEqual(antes[0].config, configs[1])
+
+        filtrados = list(self.saver.list(_config("hilo"), filter={"step": 0}))
+        self.assertEqual([tupla.config for tupla in filtrados], [configs[0]])
+
+    def test_put_writes(self):
+        config = self._guardar("hilo", 1)
+
+        self.saver.put_writes(config, [("titulo", "a"), ("parametros_clave", ["b"])], "tarea")
+        # Las escrituras de canales normales no se reemplazan
+        self.saver.put_writes(config, [("titulo", "otro")], "tarea")
+        # Las especiales (interrupción) sí
+        self.saver.put_writes(config, [("__interrupt__", "pregunta 1")], "tarea")
+        self.saver.put_writes(config, [("__interrupt__", "pregunta 2")], "tarea")
+
+        escrituras = self.saver.get_tuple(config).pending_writes
+        self.assertEqual(sorted(escrituras, key=repr), sorted([
+            ("tarea", "__interrupt__", "pregunta 2"),
+            ("tarea", "titulo", "a"),
+            ("tarea", "parametros_clave", ["b"]),
+        ], key=repr))
+
+    def test_delete_thread(self):
+        config = self._guardar("hilo", 1)
+        self.saver.put_writes(config, [("titulo", "a")], "tarea")
+        self._guardar("otro-hilo", 1)
+
+        self.saver.delete_thread("hilo")
+
+        self.assertIsNone(self.saver.get_tuple(_config("hilo")))
+        self.assertFalse(EscrituraCheckpoint.objects.filter(thread_id="hilo").exists())
+        self.assertIsNotNone(self.saver.get_tuple(_config("otro-hilo")))
+
+    def test_podar_elimina_solo_hilos_vencidos(self):
+        config = self._guardar("vencido", 1)
+        self.saver.put_writes(config, [("titulo", "a")], "tarea")
+        self._guardar("activo", 1)
+        CheckpointGrafo.objects.filter(thread_id="vencido").update(
+            fecha_creacion=timezone.now() - timedelta(hours=48)
+        )
+
+        self.assertEqual(self.saver.podar(24), 1)
+
+        self.assertIsNone(self.saver.get_tuple(_config("vencido")))
+        self.assertFalse(EscrituraCheckpoint.objects.filter(thread_id="vencido").exists())
+        self.assertIsNotNone(self.saver.get_tuple(_config("activo")))
+
+    def test_versiones_asincronas(self):
+        checkpoint = create_checkpoint(empty_checkpoint(), None, 1)
+        config = async_to_sync(self.saver.aput)(_config("hilo"), checkpoint, {"step": 1}, {})
+
+        tupla = async_to_sync(self.saver.aget_tuple)(config)
+
+        self.assertEqual(tupla.config, config)
+
+
+class CacheTitulosTests(TestCase):
+    def test_titulo_normalizado_se_responde_desde_la_cache(self):
+        guardar_titulo("Pintado  de PISO", "gpt-4o-mini", 1, "Pintado de Piso Industrial")
+
+        self.assertEqual(buscar_titulo("pintado de piso", "gpt-4o-mini", 1), "Pintado de Piso Industrial")
+        self.assertIsNone(buscar_titulo("pintado de piso", "gpt-4o-mini", 2))
+        self.assertEqual(TituloMejoradoCache.objects.get().aciertos, 1)
+
+
+class MejorarTituloTests(TestCase):
+    async def test_el_modelo_se_crea_una_sola_vez(self):
+        with mock.patch.object(mejorar_titulo, "_cadena", None), \
+                mock.patch.object(mejorar_titulo, "crear_chat_model", return_value=ModeloFalso()) as crear:
+            for titulo in ("Pintado de piso", "Muro de ladrillo"):
+                resultado = await mejorar_titulo.amejorar_titulo_especificacion(titulo)
+                self.assertTrue(resultado["success"])
+                self.assertFalse(resultado["desde_cache"])
+
+        crear.assert_called_once_with(model=mejorar_titulo.MODELO_TITULO, temperature=0.1)
+
+
+class CacheEspecificacionesTests(TestCase):
+    def test_misma_entrada_se_responde_desde_la_cache(self):
+        entrada = {
+            "pliego_base": "## Base",
+            "titulo": "Pintado de piso",
+            "parametros_clave": [{"nombre": "Espesor", "valor": "2 mm"}],
+            "adicionales": [],
+        }
+        guardar_especificacion(entrada, "gpt-4o-mini", "## Pintado de piso", 0.01)
+
+        en_cache = buscar_especificacion({**entrada, "titulo": " Pintado  de piso "}, "gpt-4o-mini")
+        self.assertEqual(en_cache, {"especificacion_generada": "## Pintado de piso", "similitud": 1.0})
+        self.assertIsNone(buscar_especificacion({**entrada, "pliego_base": "## Otra base"}, "gpt-4o-mini"))
+
+
+ESPECIFICACION_FALSA = "```markdown\n## Pintado de Piso\n\n### Descripción\n\nPintura epóxica de **2 mm**.\n```"
+USO_FALSO = {"input_tokens": 120, "output_tokens": 30, "total_tokens": 150}
+EVALUACION_FALSA = {
+    "parametro": "Espesor",
+    "valor": "2 mm",
+    "comentario": "El espesor aplica al recubrimiento.",
+    "corresponde": "Sí",
+    "calificacion": 9,
+}
+# Respuesta del modelo falso según el esquema pedido con with_structured_output
+RESPUESTAS_ESTRUCTURADAS = {
+    "ReviewUnassignedParametersLote": {"evaluaciones": [EVALUACION_FALSA]},
+    "ReviewUnassignedParameters": EVALUACION_FALSA,
+}
+PLIEGO_BASE = "## Pintado de Piso\n\n### Descripción\n\nPintura de piso.\n\n### Parámetros Técnicos Recomendados\n\n| Parámetro |\n"
+
+
+def _trozos(texto, tamano=7):
+    return [texto[i:i + tamano] for i in range(0, len(texto), tamano)]
+
+
+class ModeloFalso(BaseChatModel):
+    """Modelo de chat sin red para ejecutar el grafo en las pruebas (ver PLIEGO_LLM_FABRICA)."""
+
+    model_name: str = "gpt-4o"
+
+    @property
+    def _llm_type(self) -> str:
+        return "falso"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        mensaje = AIMessage(
+            content=ESPECIFICACION_FALSA,
+            usage_metadata=USO_FALSO,
+            response_metadata={"model_name": self.model_name},
+        )
+        return ChatResult(generations=[ChatGeneration(message=mensaje)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        for trozo in _trozos(ESPECIFICACION_FALSA):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=trozo))
+        yield ChatGenerationChunk(message=AIMessageChunk(
+            content="", usage_metadata=USO_FALSO, response_metadata={"model_name": self.model_name}
+        ))
+
+    def with_structured_output(self, schema, **kwargs):
+        return RunnableLambda(lambda _: schema(**RESPUESTAS_ESTRUCTURADAS[schema.__name__]))
+
+
+def modelo_falso(model, temperature):
+    return ModeloFalso(model_name=model)
+
+
+def _evento_openai(delta=None, usage=None, finish_reason=None):
+    return {
+        "id": "chatcmpl-prueba",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": "gpt-4o",
+        "choices": [] if delta is None else [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        "usage": usage,
+    }
+
+
+class FiltroBloqueMarkdownTests(TestCase):
+    def _filtrar(self, texto):
+        filtro = FiltroBloqueMarkdown()
+        return "".join(filtro.agregar(trozo) for trozo in _trozos(texto, 3)) + filtro.finalizar()
+
+    def test_quita_el_bloque_como_el_texto_completo(self):
+        self.assertEqual(self._filtrar(ESPECIFICACION_FALSA), limpiar_bloque_markdown(ESPECIFICACION_FALSA))
+
+    def test_texto_sin_bloque_se_envia_igual(self):
+        texto = "## Título\n\nUsar `código` en línea."
+        self.assertEqual(self._filtrar(texto), texto)
+
+
+@mock.patch.dict(os.environ, {"OPENAI_API_KEY": ""})
+class GrafoSinConexionTests(TestCase):
+    @override_settings(PLIEGO_LLM_FABRICA="pliego_esp.tests.modelo_falso")
+    def test_grafo_se_compila_y_ejecuta_con_modelo_falso(self):
+        workflow = construir_workflow(MemorySaver())
+        entrada = {
+            "pliego_base": PLIEGO_BASE,
+            "titulo": "Pintado de piso",
+            "parametros_clave": [{"nombre": "Color", "valor": "Gris", "recomendacion": "Color"}],
+            "adicionales": [],
+            "token_cost": 0.0,
+        }
+
+        consumo = ConsumoTokens(thread_id="sin-conexion")
+        config = {"configurable": {"thread_id": "sin-conexion"}, "callbacks": [consumo]}
+
+        estado = async_to_sync(workflow.ainvoke)(entrada, config)
+
+        self.assertEqual(estado["especificacion_generada"], limpiar_bloque_markdown(ESPECIFICACION_FALSA))
+        self.assertEqual(consumo.total_tokens, 150)
+        self.assertGreater(estado["token_cost"], 0)
+
+    def test_sin_modelo_falso_requiere_api_key(self):
+        with self.assertRaises(ValueError):
+            construir_workflow(MemorySaver())
+
+
+class MatchParametrosClaveTests(TestCase):
+    """El nodo no está conectado en construir_workflow; se prueba directamente."""
+
+    async def test_evalua_las_filas_en_paralelo_y_conserva_el_orden(self):
+        activas = 0
+        maximo = 0
+
+        async def responder(prompt):
+            nonlocal activas, maximo
+            activas += 1
+            maximo = max(maximo, activas)
+            await asyncio.sleep(0.01)
+            activas -= 1
+            texto = prompt.to_string()
+            return "Gris" if "Color" in texto else "-"
+
+        filas = [
+            {"Parámetro Técnico": nombre, "Opciones Válidas": "Varias"}
+            for nombre in ("Espesor", "Color", "Textura", "Brillo", "Acabado")
+        ]
+        estado = {"parsed_parametros": filas, "parametros_clave": ["Gris", "2 mm"]}
+        config = {"configurable": {"max_llamadas_concurrentes": 2}}
+
+        with mock.patch("pliego_esp.graph.nodes.match_parametros_clave.crear_chat_model",
+                        return_value=RunnableLambda(responder)):
+            resultado = await match_parametros_clave(estado, config=config)
+
+        self.assertEqual(maximo, 2)
+        self.assertEqual([fila["Valor Asignado"] for fila in resultado["parsed_parametros"]], ["-", "Gris", "-", "-", "-"])
+        self.assertEqual(resultado["parametros_clave"], ["Gris"])
+        self.assertEqual(resultado["parametros_no_asignados"], ["2 mm"])
+
+
+@mock.patch.dict(os.environ, {"OPENAI_API_KEY": "sk-prueba"})
+class StreamPliegoTests(TestCase):
+    def setUp(self):
+        self.peticiones = []
+
+    def _responder(self, request):
+        """Simula la API de OpenAI: solo informa el uso si se pide con stream_options."""
+        cuerpo = json.loads(request.content)
+        self.peticiones.append(cuerpo)
+        eventos = [_evento_openai({"role": "assistant", "content": ""})]
+        eventos += [_evento_openai({"content": trozo}) for trozo in _trozos(ESPECIFICACION_FALSA)]
+        eventos.append(_evento_openai({}, finish_reason="stop"))
+        if cuerpo.get("stream_options", {}).get("include_usage"):
+            eventos.append(_evento_openai(usage={"prompt_tokens": 120, "completion_tokens": 30, "total_tokens": 150}))
+        contenido = "".join(f"data: {json.dumps(evento)}\n\n" for evento in eventos) + "data: [DONE]\n\n"
+        return httpx.Response(200, content=contenido.encode(), headers={"content-type": "text/event-stream"})
+
+    def _openai_simulado(self):
+        from langchain_openai import ChatOpenAI
+        cliente = httpx.AsyncClient(transport=httpx.MockTransport(self._responder))
+        return mock.patch(
+            "langchain_openai.ChatOpenAI",
+            partial(ChatOpenAI, http_async_client=cliente),
+        )
+
+    async def test_ejecucion_por_streaming_informa_tokens_y_costo(self):
+        entrada = {"pliego_base": PLIEGO_BASE, "titulo": "Pintado de piso", "parametros_clave": [], "adicionales": []}
+        config = {"configurable": {"thread_id": "hilo-streaming"}}
+
+        with self._openai_simulado(), mock.patch.object(PliegoEspService, "_registrar_consumo") as registrar:
+            eventos = [evento async for evento in PliegoEspService.stream_pliego(entrada, config)]
+
+        self.assertEqual(len(self.peticiones), 1)
+        self.assertTrue(self.peticiones[0]["stream"])
+        consumo = registrar.call_args.args[0]
+        self.assertEqual(consumo.total_tokens, 150)
+        self.assertGreater(consumo.total_cost, 0)
+
+        final = eventos[-1]
+        self.assertEqual(final["type"], "final")
+        self.assertAlmostEqual(final["token_cost"], consumo.total_cost)
+
+        tokens = "".join(evento["content"] for evento in eventos if evento["type"] == "token")
+        self.assertEqual(tokens, limpiar_bloque_markdown(ESPECIFICACION_FALSA))
+
+
+@override_settings(PLIEGO_LLM_FABRICA="pliego_esp.tests.modelo_falso")
+class GenerarPliegoStreamViewTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        ajustes = override_settings(MEDIA_ROOT=self.media)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        carpeta = os.path.join(self.media, "Markdowns", "Pisos")
+        os.makedirs(carpeta)
+        with open(os.path.join(carpeta, "pintado.md"), "w", encoding="utf-8") as f:
+            f.write(PLIEGO_BASE)
+
+    async def _iniciar_sesion(self):
+        sesion = import_module(settings.SESSION_ENGINE).SessionStore()
+        sesion.update({
+            "paso1_data": {"titulo_final": "Pintado de piso industrial"},
+            "paso2_data": {"categoria": "Pisos", "nombre_archivo": "pintado.md"},
+            "paso3_data": {"parametros": [{"nombre": "Espesor", "valor": "2 mm", "recomendacion": ""}]},
+            "paso4_data": {"adicionales": []},
+        })
+        await sesion.asave()
+        self.async_client.cookies[settings.SESSION_COOKIE_NAME] = sesion.session_key
+
+    async def _eventos(self, datos):
+        response = await self.async_client.post("/pliego/generar-pliego/stream/", datos)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        contenido = b"".join([parte async for parte in response.streaming_content]).decode()
+        eventos = []
+        for mensaje in contenido.strip().split("\n\n"):
+            tipo, datos = mensaje.split("\n", 1)
+            evento = json.loads(datos[len("data: "):])
+            self.assertEqual(tipo, f"event: {evento['type']}")
+            eventos.append(evento)
+        return eventos
+
+    async def test_stream_envia_nodos_interrupcion_y_final(self):
+        await self._iniciar_sesion()
+
+        eventos = await self._eventos({"request_type": "inicio"})
+
+        tipos = [evento["type"] for evento in eventos]
+        self.assertEqual(tipos[0], "inicio")
+        self.assertIn("token", tipos)
+        nodos = [evento["nodo"] for evento in eventos if evento["type"] == "nodo"]
+        self.assertIn("process_pliego", nodos)
+        self.assertIn("review_unassigned_parameters", nodos)
+        interrupcion = eventos[-1]
+        self.assertEqual(interrupcion["type"], "__interrupt__")
+        self.assertEqual(interrupcion["action"], "modal_parametros")
+        self.assertEqual([item["parametro"] for item in interrupcion["items"]], ["Espesor"])
+
+        items = [{**item, "agregar": True} for item in interrupcion["items"]]
+        eventos = await self._eventos({
+            "request_type": "continuar",
+            "items": json.dumps(items),
+            "config": json.dumps(interrupcion["config"]),
+        })
+
+        nodos = [evento["nodo"] for evento in eventos if evento["type"] == "nodo"]
+        self.assertEqual(nodos, ["add_unassigned_parameters", "add_other_adicionales", "add_finales"])
+        final = eventos[-1]
+        self.assertEqual(final["type"], "final")
+        self.assertIn("<h2>Pintado de Piso</h2>", final["content"])
+        self.assertGreater(final["token_cost"], 0)
+
+        # El consumo de la conversación suma la ejecución inicial y la reanudación
+        consumo = final["consumo"]
+        self.assertEqual(consumo["thread_id"], final["conversation_id"])
+        self.assertEqual(consumo["ejecuciones"], 2)
+        self.assertAlmostEqual(consumo["costo"], final["token_cost"])
+        self.assertIn("process_pliego", consumo["por_nodo"])
+        self.assertIn("add_unassigned_parameters", consumo["por_nodo"])
+        registro = await ConsumoConversacion.objects.aget(thread_id=final["conversation_id"])
+        self.assertEqual(registro.total_tokens, consumo["total_tokens"])
+
+        # La misma entrada ya no se interrumpe: se responde con la especificación guardada
+        eventos = await self._eventos({"request_type": "inicio"})
+
+        self.assertEqual([evento["type"] for evento in eventos], ["inicio", "final"])
+        self.assertTrue(eventos[-1]["desde_cache"])
+        self.assertEqual(eventos[-1]["token_cost"], 0.0)
+        self.assertEqual(eventos[-1]["raw_markdown"], final["raw_markdown"])
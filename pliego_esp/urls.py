@@ -8,4 +8,5 @@ urlpatterns = [
     path("guardar-pliego/", views.guardar_pliego_view, name="guardar_pliego"),
     path('api/mejorar-titulo/', views.mejorar_titulo, name='mejorar_titulo'),
     path('generar-pliego/', views.generar_pliego, name='generar_pliego'),
+    path('generar-pliego/stream/', views.generar_pliego_stream, name='generar_pliego_stream'),
 ]
\ No newline at end of file
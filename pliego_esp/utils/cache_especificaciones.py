@@ -0,0 +1,152 @@
+import hashlib
+import json
+from typing import Dict, List, Optional
+
+import numpy as np
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from main.utils.cache_lru import registrar_insercion
+from pliego_esp.models import EspecificacionGeneradaCache
+
+from rich.console import Console
+console = Console()
+
+# Incrementar al modificar los prompts o los nodos del grafo para no reutilizar
+# especificaciones generadas con la versión anterior
+VERSION_GRAFO = 1
+
+# Cantidad máxima de especificaciones guardadas; al superarla se eliminan las usadas hace más tiempo
+PLIEGO_CACHE_ESPECIFICACIONES_MAX = getattr(settings, 'PLIEGO_CACHE_ESPECIFICACIONES_MAX', 2000)
+
+# Similitud coseno mínima para reutilizar una especificación casi idéntica (mismo
+# pliego base, título y parámetros redactados de otra forma). None desactiva la búsqueda.
+PLIEGO_CACHE_SIMILITUD_UMBRAL = getattr(settings, 'PLIEGO_CACHE_SIMILITUD_UMBRAL', None)
+
+# Cantidad de entradas recientes del mismo pliego base comparadas en la búsqueda por similitud
+PLIEGO_CACHE_SIMILITUD_CANDIDATOS = getattr(settings, 'PLIEGO_CACHE_SIMILITUD_CANDIDATOS', 200)
+
+
+def _hash(texto: str) -> str:
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+def _canonico(valor) -> str:
+    return json.dumps(valor, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+
+
+def _entrada_normalizada(entrada: Dict) -> Dict:
+    """Título, parámetros clave y adicionales de la entrada, sin el pliego base."""
+    return {
+        'titulo': " ".join(str(entrada.get('titulo', '')).split()),
+        'parametros_clave': entrada.get('parametros_clave', []),
+        'adicionales': entrada.get('adicionales', []),
+    }
+
+
+def claves_entrada(entrada: Dict, modelo: str) -> tuple:
+    """
+    Retorna (clave, clave_base): la clave exacta de la combinación completa y la
+    del pliego base, que limita la búsqueda por similitud.
+    """
+    clave_base = _hash(f"{VERSION_GRAFO}\n{modelo}\n{entrada.get('pliego_base', '')}")
+    clave = _hash(f"{clave_base}\n{_canonico(_entrada_normalizada(entrada))}")
+    return clave, clave_base
+
+
+def _texto_entrada(entrada: Dict) -> str:
+    """Texto que representa la entrada para la búsqueda por similitud."""
+    normalizada = _entrada_normalizada(entrada)
+    lineas = [normalizada['titulo']]
+    for parametro in normalizada['parametros_clave']:
+        if isinstance(parametro, dict):
+            lineas.append(f"{parametro.get('nombre', '')}: {parametro.get('valor', '')}")
+        else:
+            lineas.append(str(parametro))
+    for adicional in normalizada['adicionales']:
+        lineas.append(adicional.get('nombre', '') if isinstance(adicional, dict) else str(adicional))
+    return "\n".join(lineas)
+
+
+def _vector_entrada(entrada: Dict) -> Optional[List[float]]:
+    # Importación diferida: solo se carga la base vectorial si la búsqueda está habilitada
+    from embeddings.utils.embeddings_processor import embeber_consultas
+    return embeber_consultas([_texto_entrada(entrada)])[0]
+
+
+def _registrar_acierto(entrada_id: int) -> None:
+    EspecificacionGeneradaCache.objects.filter(pk=entrada_id).update(
+        aciertos=F('aciertos') + 1, fecha_ultimo_uso=timezone.now()
+    )
+
+
+def buscar_especificacion(entrada: Dict, modelo: str) -> Optional[Dict]:
+    """
+    Busca una especificación ya generada para la entrada: primero por coincidencia
+    exacta y, si está habilitado, por similitud con las del mismo pliego base.
+
+    Returns:
+        Optional[Dict]: {'especificacion_generada', 'similitud'} o None si no hay
+    """
+    clave, clave_base = claves_entrada(entrada, modelo)
+    try:
+        exacta = EspecificacionGeneradaCache.objects.filter(clave=clave).values_list(
+            'pk', 'especificacion_generada'
+        ).first()
+        if exacta is not None:
+            _registrar_acierto(exacta[0])
+            return {'especificacion_generada': exacta[1], 'similitud': 1.0}
+
+        if PLIEGO_CACHE_SIMILITUD_UMBRAL is None:
+            return None
+
+        candidatos = list(
+            EspecificacionGeneradaCache.objects.filter(clave_base=clave_base, vector__isnull=False)
+            .order_by('-fecha_ultimo_uso')
+            .values_list('pk', 'vector')[:PLIEGO_CACHE_SIMILITUD_CANDIDATOS]
+        )
+        if not candidatos:
+            return None
+
+        consulta = np.asarray(_vector_entrada(entrada), dtype=np.float32)
+        matriz = np.asarray([vector for _, vector in candidatos], dtype=np.float32)
+        similitudes = matriz @ consulta / (np.linalg.norm(matriz, axis=1) * np.linalg.norm(consulta) + 1e-12)
+        mejor = int(np.argmax(similitudes))
+        if similitudes[mejor] < PLIEGO_CACHE_SIMILITUD_UMBRAL:
+            return None
+
+        entrada_id = candidatos[mejor][0]
+        especificacion = EspecificacionGeneradaCache.objects.values_list(
+            'especificacion_generada', flat=True
+        ).get(pk=entrada_id)
+        _registrar_acierto(entrada_id)
+        return {'especificacion_generada': especificacion, 'similitud': float(similitudes[mejor])}
+    except Exception as e:
+        console.print(f"[cache_especificaciones] Error al consultar la caché: {str(e)}", style="bold red")
+        return None
+
+
+def guardar_especificacion(entrada: Dict, modelo: str, especificacion_generada: str, token_cost: float) -> None:
+    """Guarda la especificación generada y elimina las más antiguas si se supera el máximo."""
+    clave, clave_base = claves_entrada(entrada, modelo)
+    normalizada = _entrada_normalizada(entrada)
+    try:
+        vector = _vector_entrada(entrada) if PLIEGO_CACHE_SIMILITUD_UMBRAL is not None else None
+        EspecificacionGeneradaCache.objects.update_or_create(
+            clave=clave,
+            defaults={
+                'clave_base': clave_base,
+                'modelo': modelo,
+                'titulo': normalizada['titulo'][:255],
+                'entrada': normalizada,
+                'vector': vector,
+                'especificacion_generada': especificacion_generada,
+                'token_cost': token_cost,
+                'fecha_ultimo_uso': timezone.now(),
+            }
+        )
+
+        registrar_insercion(EspecificacionGeneradaCache, PLIEGO_CACHE_ESPECIFICACIONES_MAX)
+    except Exception as e:
+        console.print(f"[cache_especificaciones] Error al guardar en la caché: {str(e)}", style="bold red")
@@ -0,0 +1,91 @@
+import hashlib
+import threading
+import unicodedata
+from typing import Optional
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from main.utils.cache_lru import registrar_insercion
+from pliego_esp.models import TituloMejoradoCache
+
+from rich.console import Console
+console = Console()
+
+# Cantidad máxima de títulos guardados; al superarla se eliminan los usados hace más tiempo
+PLIEGO_TITULOS_CACHE_MAX = getattr(settings, 'PLIEGO_TITULOS_CACHE_MAX', 5000)
+
+# Cada cuántas consultas se muestran los aciertos y fallos de este proceso
+PLIEGO_TITULOS_METRICAS_CADA = getattr(settings, 'PLIEGO_TITULOS_METRICAS_CADA', 100)
+
+# Aciertos y fallos de este proceso (los aciertos históricos quedan en cada fila, ver el admin)
+_metricas = {'aciertos': 0, 'fallos': 0}
+_metricas_lock = threading.Lock()
+
+
+def normalizar_titulo(titulo: str) -> str:
+    """Título comparable: forma Unicode NFC, espacios colapsados y sin mayúsculas."""
+    return " ".join(unicodedata.normalize("NFC", titulo).split()).casefold()
+
+
+def clave_titulo(titulo_normalizado: str, modelo: str, version_prompt: int) -> str:
+    texto = f"{modelo}\n{version_prompt}\n{titulo_normalizado}"
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+def _contar(tipo: str) -> None:
+    with _metricas_lock:
+        _metricas[tipo] += 1
+        aciertos, fallos = _metricas['aciertos'], _metricas['fallos']
+    consultas = aciertos + fallos
+    if consultas % PLIEGO_TITULOS_METRICAS_CADA == 0:
+        console.print(
+            f"[cache_titulos] {aciertos} aciertos / {fallos} fallos en este proceso "
+            f"({aciertos / consultas:.0%} de aciertos)",
+            style="blue"
+        )
+
+
+def buscar_titulo(titulo: str, modelo: str, version_prompt: int) -> Optional[str]:
+    """
+    Retorna el título mejorado guardado para el título indicado, o None si no
+    hay uno para ese modelo y versión del prompt.
+    """
+    clave = clave_titulo(normalizar_titulo(titulo), modelo, version_prompt)
+    try:
+        entrada = TituloMejoradoCache.objects.filter(clave=clave).values_list('pk', 'titulo_mejorado').first()
+        if entrada is None:
+            _contar('fallos')
+            return None
+
+        TituloMejoradoCache.objects.filter(pk=entrada[0]).update(
+            aciertos=F('aciertos') + 1, fecha_ultimo_uso=timezone.now()
+        )
+    except Exception as e:
+        console.print(f"[cache_titulos] Error al consultar la caché: {str(e)}", style="bold red")
+        return None
+
+    _contar('aciertos')
+    return entrada[1]
+
+
+def guardar_titulo(titulo: str, modelo: str, version_prompt: int, titulo_mejorado: str) -> None:
+    """Guarda el título mejorado y elimina los más antiguos si se supera el máximo."""
+    titulo_normalizado = normalizar_titulo(titulo)
+    try:
+        TituloMejoradoCache.objects.update_or_create(
+            clave=clave_titulo(titulo_normalizado, modelo, version_prompt),
+            defaults={
+                'titulo_normalizado': titulo_normalizado,
+                'modelo': modelo,
+                'version_prompt': version_prompt,
+                'titulo_mejorado': titulo_mejorado,
+                'fecha_ultimo_uso': timezone.now(),
+            }
+        )
+
+        registrar_insercion(TituloMejoradoCache, PLIEGO_TITULOS_CACHE_MAX)
+    except Exception as e:
+        console.print(f"[cache_titulos] Error al guardar en la caché: {str(e)}", style="bold red")
+
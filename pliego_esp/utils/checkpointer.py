@@ -0,0 +1,290 @@
+import random
+import threading
+import time
+from datetime import timedelta
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Sequence, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+)
+
+from pliego_esp.models import CheckpointGrafo, EscrituraCheckpoint
+
+from rich.console import Console
+console = Console()
+
+# Horas sin actividad después de las cuales se eliminan los checkpoints de un hilo
+PLIEGO_CHECKPOINT_TTL_HORAS = getattr(settings, 'PLIEGO_CHECKPOINT_TTL_HORAS', 24)
+
+# Cada cuántos segundos, como máximo, un proceso poda los hilos vencidos al guardar
+PLIEGO_CHECKPOINT_INTERVALO_PODA = getattr(settings, 'PLIEGO_CHECKPOINT_INTERVALO_PODA', 3600)
+
+
+class DjangoCheckpointSaver(BaseCheckpointSaver[str]):
+    """
+    Checkpointer de LangGraph guardado en la base de datos de Django.
+
+    Reemplaza a MemorySaver para que una conversación interrumpida (interrupt())
+    pueda reanudarse en cualquier worker de gunicorn, y para que los hilos
+    abandonados no se acumulen en memoria: se eliminan después de
+    PLIEGO_CHECKPOINT_TTL_HORAS sin actividad.
+
+    Funciona con cualquier backend de Django (PostgreSQL en producción, SQLite en local).
+    """
+
+    def __init__(self, *, ttl_horas: int = PLIEGO_CHECKPOINT_TTL_HORAS, **kwargs):
+        super().__init__(**kwargs)
+        self.ttl_horas = ttl_horas
+        self._ultima_poda = time.monotonic()
+        self._poda_lock = threading.Lock()
+
+    # --- Lectura ---
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+
+        consulta = CheckpointGrafo.objects.filter(thread_id=thread_id, checkpoint_ns=checkpoint_ns)
+        if checkpoint_id := get_checkpoint_id(config):
+            consulta = consulta.filter(checkpoint_id=checkpoint_id)
+        fila = consulta.order_by('-checkpoint_id').first()
+        if fila is None:
+            return None
+
+        escrituras = EscrituraCheckpoint.objects.filter(
+            thread_id=thread_id, checkpoint_ns=checkpoint_ns, checkpoint_id=fila.checkpoint_id
+        ).order_by('task_id', 'idx').values_list('task_id', 'canal', 'tipo', 'valor')
+
+        return self._tupla(fila, [
+            (task_id, canal, self.serde.loads_typed((tipo, bytes(valor))))
+            for task_id, canal, tipo, valor in escrituras
+        ])
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        consulta = CheckpointGrafo.objects.all()
+        if config is not None:
+            consulta = consulta.filter(thread_id=config["configurable"]["thread_id"])
+            if "checkpoint_ns" in config["configurable"]:
+                consulta = consulta.filter(checkpoint_ns=config["configurable"]["checkpoint_ns"])
+            if checkpoint_id := get_checkpoint_id(config):
+                consulta = consulta.filter(checkpoint_id=checkpoint_id)
+        if before is not None and (antes_de := get_checkpoint_id(before)):
+            consulta = consulta.filter(checkpoint_id__lt=antes_de)
+
+        entregados = 0
+        for fila in consulta.order_by('-checkpoint_id').iterator():
+            tupla = self._tupla(fila, None)
+            if filter and not all(tupla.metadata.get(k) == v for k, v in filter.items()):
+                continue
+            # Las escrituras pendientes solo se cargan para los checkpoints entregados
+            escrituras = EscrituraCheckpoint.objects.filter(
+                thread_id=fila.thread_id, checkpoint_ns=fila.checkpoint_ns, checkpoint_id=fila.checkpoint_id
+            ).order_by('task_id', 'idx').values_list('task_id', 'canal', 'tipo', 'valor')
+            yield tupla._replace(pending_writes=[
+                (task_id, canal, self.serde.loads_typed((tipo, bytes(valor))))
+                for task_id, canal, tipo, valor in escrituras
+            ])
+            entregados += 1
+            if limit is not None and entregados >= limit:
+                break
+
+    def _tupla(self, fila: CheckpointGrafo, escrituras) -> CheckpointTuple:
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": fila.thread_id,
+                    "checkpoint_ns": fila.checkpoint_ns,
+                    "checkpoint_id": fila.checkpoint_id,
+                }
+            },
+            checkpoint=self.serde.loads_typed((fila.tipo, bytes(fila.checkpoint))),
+            metadata=self.serde.loads_typed((fila.tipo_metadata, bytes(fila.metadata))),
+            parent_config={
+                "configurable": {
+                    "thread_id": fila.thread_id,
+                    "checkpoint_ns": fila.checkpoint_ns,
+                    "checkpoint_id": fila.parent_checkpoint_id,
+                }
+            } if fila.parent_checkpoint_id else None,
+            pending_writes=escrituras,
+        )
+
+    # --- Escritura ---
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        tipo, datos = self.serde.dumps_typed(checkpoint)
+        tipo_metadata, datos_metadata = self.serde.dumps_typed(metadata)
+
+        CheckpointGrafo.objects.update_or_create(
+            thread_id=thread_id,
+            checkpoint_ns=checkpoint_ns,
+            checkpoint_id=checkpoint["id"],
+            defaults={
+                'parent_checkpoint_id': config["configurable"].get("checkpoint_id"),
+                'tipo': tipo,
+                'checkpoint': datos,
+                'tipo_metadata': tipo_metadata,
+                'metadata': datos_metadata,
+            }
+        )
+        self._podar_si_corresponde()
+
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        claves_base = {
+            'thread_id': config["configurable"]["thread_id"],
+            'checkpoint_ns': config["configurable"].get("checkpoint_ns", ""),
+            'checkpoint_id': config["configurable"]["checkpoint_id"],
+            'task_id': task_id,
+        }
+        # Las escrituras especiales (error, interrupción, reanudación) reemplazan a las
+        # anteriores; las de canales normales solo se guardan la primera vez
+        reemplazar = all(canal in WRITES_IDX_MAP for canal, _ in writes)
+
+        with transaction.atomic():
+            nuevas = []
+            for idx, (canal, valor) in enumerate(writes):
+                tipo, datos = self.serde.dumps_typed(valor)
+                claves = {**claves_base, 'idx': WRITES_IDX_MAP.get(canal, idx)}
+                valores = {'task_path': task_path, 'canal': canal, 'tipo': tipo, 'valor': datos}
+                if reemplazar:
+                    EscrituraCheckpoint.objects.update_or_create(**claves, defaults=valores)
+                else:
+                    nuevas.append(EscrituraCheckpoint(**claves, **valores))
+            if nuevas:
+                EscrituraCheckpoint.objects.bulk_create(nuevas, ignore_conflicts=True)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with transaction.atomic():
+            EscrituraCheckpoint.objects.filter(thread_id=thread_id).delete()
+            CheckpointGrafo.objects.filter(thread_id=thread_id).delete()
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        # Mismo formato que MemorySaver: versión creciente + sufijo aleatorio
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    # --- Poda de hilos vencidos ---
+
+    def podar(self, horas: Optional[int] = None) -> int:
+        """
+        Elimina los checkpoints y escrituras de los hilos sin actividad en las
+        últimas `horas` (por defecto, el TTL configurado).
+
+        Returns:
+            int: Cantidad de hilos eliminados
+        """
+        limite = timezone.now() - timedelta(hours=self.ttl_horas if horas is None else horas)
+        activos = CheckpointGrafo.objects.filter(fecha_creacion__gte=limite).values('thread_id')
+        vencidos = list(
+            CheckpointGrafo.objects.filter(fecha_creacion__lt=limite)
+            .exclude(thread_id__in=activos)
+            .values_list('thread_id', flat=True)
+            .distinct()
+        )
+
+        for inicio in range(0, len(vencidos), 500):
+            lote = vencidos[inicio:inicio + 500]
+            with transaction.atomic():
+                EscrituraCheckpoint.objects.filter(thread_id__in=lote).delete()
+                CheckpointGrafo.objects.filter(thread_id__in=lote).delete()
+        return len(vencidos)
+
+    def _podar_si_corresponde(self) -> None:
+        if time.monotonic() - self._ultima_poda < PLIEGO_CHECKPOINT_INTERVALO_PODA:
+            return
+        if not self._poda_lock.acquire(blocking=False):
+            return
+        try:
+            self._ultima_poda = time.monotonic()
+            eliminados = self.podar()
+            if eliminados:
+                console.print(f"[checkpointer] {eliminados} hilos vencidos eliminados", style="yellow")
+        except Exception as e:
+            console.print(f"[checkpointer] Error al podar hilos vencidos: {str(e)}", style="bold red")
+        finally:
+            self._poda_lock.release()
+
+    # --- Versiones asíncronas (el ORM se usa desde un hilo) ---
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await sync_to_async(self.get_tuple)(config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        tuplas = await sync_to_async(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )()
+        for tupla in tuplas:
+            yield tupla
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await sync_to_async(self.put)(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await sync_to_async(self.put_writes)(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await sync_to_async(self.delete_thread)(thread_id)
@@ -0,0 +1,31 @@
+from typing import Dict
+
+from django.db import transaction
+
+from pliego_esp.graph.callbacks import ConsumoTokens
+from pliego_esp.models import ConsumoConversacion
+
+CAMPOS_TOKENS = ('prompt_tokens', 'completion_tokens', 'total_tokens')
+
+
+def acumular_consumo(consumo: ConsumoTokens) -> Dict:
+    """
+    Suma el consumo de una ejecución del grafo al de su conversación (thread_id),
+    de modo que las reanudaciones tras una interrupción no empiecen desde cero.
+
+    Returns:
+        Dict: Consumo acumulado de la conversación (ver ConsumoConversacion.como_dict)
+    """
+    resumen = consumo.resumen()
+    with transaction.atomic():
+        registro, _ = ConsumoConversacion.objects.select_for_update().get_or_create(thread_id=consumo.thread_id)
+        for nodo, datos in resumen.items():
+            acumulado = registro.por_nodo.setdefault(nodo, {})
+            for campo, valor in datos.items():
+                acumulado[campo] = acumulado.get(campo, 0) + valor
+            for campo in CAMPOS_TOKENS:
+                setattr(registro, campo, getattr(registro, campo) + datos[campo])
+            registro.costo += datos['costo']
+        registro.ejecuciones += 1
+        registro.save()
+    return registro.como_dict()
@@ -1,14 +1,63 @@
-from langchain_openai import ChatOpenAI
+import threading
+
 from langchain.prompts import ChatPromptTemplate
 from django.conf import settings
 from langchain_core.output_parsers import StrOutputParser
+from asgiref.sync import sync_to_async
+
+from pliego_esp.graph.llm import crear_chat_model
+from pliego_esp.utils.cache_titulos import buscar_titulo, guardar_titulo
 
 from rich.console import Console
 console = Console()
 
-def mejorar_titulo_especificacion(titulo_especificacion: str) -> dict:
+MODELO_TITULO = "gpt-4o-mini"
+# Incrementar al modificar el prompt para no reutilizar respuestas del prompt anterior
+VERSION_PROMPT_TITULO = 1
+
+# Cadena compartida por proceso (worker), creada en el primer título que no está en caché
+_cadena = None
+_cadena_lock = threading.Lock()
+
+def _crear_cadena():
+    # Configurar el modelo de LangChain
+    llm = crear_chat_model(
+        model=MODELO_TITULO,
+        temperature=0.1
+    )
+
+    prompt = ChatPromptTemplate.from_messages([
+        ("system",
+        "Eres un experto en redacción técnica para especificaciones de construcción. "
+        "Debes mejorar títulos técnicos para que sean más claros, uniformes y adecuados para documentos de obra y búsqueda semántica. "
+        "Sigue estas reglas estrictamente:\n"
+        "- No agregues ni traduzcas información técnica que no esté explícita en el título original.\n"
+        "- No transformes abreviaciones técnicas comunes como H30, B500, Ø110, HR, ni valores como f'c=25 MPa. Deben mantenerse exactamente como están.\n"
+        "- Si hay abreviaciones informales (como H°A°), conviértelas a su forma completa (por ejemplo, 'Hormigón Armado').\n"
+        "- Usa notación técnica compacta cuando sea posible: 'espesor' → 'e=', 'diámetro' → 'Ø=', etc., solo si ya están indicados.\n"
+        "- Separa los conceptos con comas, conserva el orden lógico, y usa mayúsculas solo para términos clave.\n"
+        "- No repitas ni reformules la información original.\n"
+        "Tu salida debe ser solo el nuevo título corregido, sin explicaciones."),
+        ("user", "Mejora el siguiente título para la especificación técnica: {titulo}")
+    ])
+
+    # Crear la cadena
+    return prompt | llm | StrOutputParser()
+
+def _obtener_cadena():
+    """Retorna la cadena compartida, creándola la primera vez que se usa."""
+    global _cadena
+
+    if _cadena is None:
+        with _cadena_lock:
+            if _cadena is None:
+                _cadena = _crear_cadena()
+    return _cadena
+
+async def amejorar_titulo_especificacion(titulo_especificacion: str) -> dict:
     """
     Mejora el titulo de una especificación técnica usando LangChain con OpenAI.
+    Los títulos repetidos se responden desde la caché, sin llamar al modelo.
     
     Args:
         titulo_especificacion (str): El titulo de la especificación técnica a mejorar
@@ -19,42 +68,26 @@ def mejorar_titulo_especificacion(titulo_especificacion: str) -> dict:
 
     console.print(f"Titulo especificacion: {titulo_especificacion}")
     try:
-        # Configurar el modelo de LangChain
-        llm = ChatOpenAI(
-            model="gpt-4o-mini",
-            temperature=0.1
-        )
-        
-        prompt = ChatPromptTemplate.from_messages([
-            ("system",
-            "Eres un experto en redacción técnica para especificaciones de construcción. "
-            "Debes mejorar títulos técnicos para que sean más claros, uniformes y adecuados para documentos de obra y búsqueda semántica. "
-            "Sigue estas reglas estrictamente:\n"
-            "- No agregues ni traduzcas información técnica que no esté explícita en el título original.\n"
-            "- No transformes abreviaciones técnicas comunes como H30, B500, Ø110, HR, ni valores como f'c=25 MPa. Deben mantenerse exactamente como están.\n"
-            "- Si hay abreviaciones informales (como H°A°), conviértelas a su forma completa (por ejemplo, 'Hormigón Armado').\n"
-            "- Usa notación técnica compacta cuando sea posible: 'espesor' → 'e=', 'diámetro' → 'Ø=', etc., solo si ya están indicados.\n"
-            "- Separa los conceptos con comas, conserva el orden lógico, y usa mayúsculas solo para términos clave.\n"
-            "- No repitas ni reformules la información original.\n"
-            "Tu salida debe ser solo el nuevo título corregido, sin explicaciones."),
-            ("user", "Mejora el siguiente título para la especificación técnica: {titulo}")
-        ])
-
-        # Crear la cadena
-        chain = prompt | llm | StrOutputParser()
-        
-        # Ejecutar la cadena
-        response = chain.invoke({"titulo": titulo_especificacion})
+        en_cache = await sync_to_async(buscar_titulo)(titulo_especificacion, MODELO_TITULO, VERSION_PROMPT_TITULO)
+        if en_cache is not None:
+            return {
+                'success': True,
+                'titulo_especificacion_mejorado': en_cache,
+                'desde_cache': True
+            }
+
+        response = await _obtener_cadena().ainvoke({"titulo": titulo_especificacion})
         
-        print(f"Response: {response}")
+        await sync_to_async(guardar_titulo)(titulo_especificacion, MODELO_TITULO, VERSION_PROMPT_TITULO, response)
         
         return {
             'success': True,
-            'titulo_especificacion_mejorado': response
+            'titulo_especificacion_mejorado': response,
+            'desde_cache': False
         }
         
     except Exception as e:
         return {
             'success': False,
             'error': str(e)
-        } 
\ No newline at end of file
+        }
@@ -1,75 +1,151 @@
-from langchain_openai import OpenAIEmbeddings
-from langchain_chroma import Chroma
-from scipy.spatial.distance import cosine
-from django.conf import settings
-import os
+import threading
+import numpy as np
+
+from embeddings.utils.embeddings_processor import obtener_vectorstore, version_coleccion, embeber_consultas
 
 from rich.console import Console
 console = Console()
 
-def calcular_similitud_titulos(titulo_original: str, titulo_sugerido: str) -> dict:
+
+class IndiceTitulos:
+    """
+    Índice en memoria con los vectores normalizados (L2) de todos los documentos
+    de ChromaDB y sus metadatos, para calcular similitudes con un único producto
+    matriz-vector.
+    """
+
+    def __init__(self, vectores, titulos, nombres_archivo, categorias, version):
+        self.vectores = vectores
+        self.titulos = titulos
+        self.nombres_archivo = nombres_archivo
+        self.categorias = categorias
+        self.version = version
+
+    @classmethod
+    def desde_vectorstore(cls, vectorstore, version) -> "IndiceTitulos":
+        """Construye el índice leyendo solo los embeddings y metadatos de la colección."""
+        data = vectorstore.get(include=["embeddings", "metadatas"])
+        metadatas = data.get("metadatas") or []
+
+        embeddings = data.get("embeddings")
+        if embeddings is None or len(embeddings) == 0:
+            vectores = np.zeros((0, 0), dtype=np.float32)
+        else:
+            vectores = _normalizar(np.asarray(embeddings, dtype=np.float32))
+
+        return cls(
+            vectores=vectores,
+            titulos=np.array([m.get("titulo", "") for m in metadatas], dtype=object),
+            nombres_archivo=np.array([m.get("nombre_archivo", "") for m in metadatas], dtype=object),
+            categorias=np.array([m.get("categoria", "") for m in metadatas], dtype=object),
+            version=version,
+        )
+
+    def __len__(self):
+        return self.vectores.shape[0]
+
+    def puntuar(self, consultas) -> np.ndarray:
+        """
+        Calcula la similitud coseno de cada documento con cada consulta.
+
+        Args:
+            consultas: Matriz (k, d) con los vectores de las consultas
+
+        Returns:
+            np.ndarray: Matriz (n_documentos, k) de similitudes
+        """
+        consultas = _normalizar(np.asarray(consultas, dtype=np.float32))
+        return self.vectores @ consultas.T
+
+
+def _normalizar(matriz: np.ndarray) -> np.ndarray:
+    normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+    normas[normas == 0] = 1.0
+    return matriz / normas
+
+
+# Índice compartido por proceso (worker)
+_indice: IndiceTitulos = None
+_indice_lock = threading.Lock()
+
+
+def obtener_indice_titulos() -> IndiceTitulos:
+    """
+    Retorna el índice de títulos del proceso, reconstruyéndolo si la colección
+    cambió desde la última vez (procesar_embeddings / borrar_embedding).
+    """
+    global _indice
+
+    version = version_coleccion()
+    if _indice is not None and _indice.version == version:
+        return _indice
+
+    with _indice_lock:
+        if _indice is None or _indice.version != version:
+            console.print("[similitud_titulos] Reconstruyendo índice de títulos", style="yellow")
+            _indice = IndiceTitulos.desde_vectorstore(obtener_vectorstore(), version)
+        return _indice
+
+
+def calcular_similitud_titulos(titulo_original: str, titulo_sugerido: str, top_k: int = 1) -> dict:
     """
     Calcula la similitud entre los títulos y los documentos en ChromaDB.
-    
+
     Args:
         titulo_original (str): El título original de la especificación
         titulo_sugerido (str): El título sugerido por el sistema
-        
+        top_k (int): Cantidad de documentos a incluir en el ranking
+
     Returns:
         dict: Un diccionario con los resultados de la similitud
     """
     try:
-        # Inicializar embeddings
-        embeddings = OpenAIEmbeddings(
-            model="text-embedding-ada-002",
-        )
-        
-        # Obtener embeddings para ambos títulos
-        embedding_original = embeddings.embed_query(titulo_original)
-        embedding_sugerido = embeddings.embed_query(titulo_sugerido)
-        
-        # Si existe una base de datos de vectores, buscar similitudes con documentos existentes
-        mejor_score = 0
-        mejor_documento = None
-        persist_directory = os.path.join(settings.BASE_DIR, 'chroma_db')
-        
-        if os.path.exists(persist_directory):
-            vectorstore = Chroma(
-                persist_directory=persist_directory,
-                embedding_function=embeddings
-            )
-            
-            # Obtener todos los documentos con sus embeddings
-            data = vectorstore.get(include=["documents", "embeddings", "metadatas"])
-            
-            for doc_text, vec, metadata in zip(data["documents"], data["embeddings"], data["metadatas"]):
-                score_original = 1 - cosine(embedding_original, vec)
-                score_sugerido = 1 - cosine(embedding_sugerido, vec)
-                score_actual = max(score_original, score_sugerido)
-                
-                if score_actual > mejor_score:
-                    mejor_score = score_actual
-                    mejor_documento = {
-                        "document": metadata["titulo"],
-                        "nombre_archivo": metadata["nombre_archivo"],
-                        "categoria": metadata["categoria"],
-                        "score_original": round(score_original, 4),
-                        "score_sugerido": round(score_sugerido, 4),
-                        "mejor_match": "original" if score_original > score_sugerido else "sugerido"
-                    }
+        # Obtener embeddings para ambos títulos en una sola llamada (con caché)
+        embedding_original, embedding_sugerido = embeber_consultas([titulo_original, titulo_sugerido])
+
+        indice = obtener_indice_titulos()
+        ranking = []
+
+        if len(indice) > 0:
+            # Columna 0: título original, columna 1: título sugerido
+            scores = indice.puntuar([embedding_original, embedding_sugerido])
+            scores_max = scores.max(axis=1)
+
+            k = min(top_k, len(indice))
+            if k == 1:
+                mejores = np.array([int(np.argmax(scores_max))])
+            else:
+                mejores = np.argpartition(-scores_max, k - 1)[:k]
+                mejores = mejores[np.argsort(-scores_max[mejores])]
+
+            for i in mejores:
+                if scores_max[i] <= 0:
+                    continue
+                score_original = float(scores[i, 0])
+                score_sugerido = float(scores[i, 1])
+                ranking.append({
+                    "document": indice.titulos[i],
+                    "nombre_archivo": indice.nombres_archivo[i],
+                    "categoria": indice.categorias[i],
+                    "score_original": round(score_original, 4),
+                    "score_sugerido": round(score_sugerido, 4),
+                    "mejor_match": "original" if score_original > score_sugerido else "sugerido"
+                })
+
+        mejor_documento = ranking[0] if ranking else None
 
         return {
             'success': True,
-            'ranking': [mejor_documento] if mejor_documento else [],
+            'ranking': ranking,
             'estadisticas': {
                 'mejor_score_original': mejor_documento['score_original'] if mejor_documento else 0,
                 'mejor_score_sugerido': mejor_documento['score_sugerido'] if mejor_documento else 0,
                 'mejor_match': mejor_documento['mejor_match'] if mejor_documento else "ninguno"
             }
         }
-        
+
     except Exception as e:
         return {
             'success': False,
             'error': str(e)
-        } 
\ No newline at end of file
+        }
@@ -0,0 +1,62 @@
+import json
+
+
+def evento_sse(evento: dict) -> str:
+    """Formatea un evento del servicio de pliegos como mensaje Server-Sent Events."""
+    datos = json.dumps(evento, ensure_ascii=False, default=str)
+    return f"event: {evento['type']}\ndata: {datos}\n\n"
+
+
+APERTURA_BLOQUE = "```markdown"
+CIERRE_BLOQUE = "```"
+
+
+class FiltroBloqueMarkdown:
+    """
+    Quita de un texto recibido por partes el bloque ```markdown ... ``` con el que
+    el modelo suele envolver la especificación, como limpiar_bloque_markdown hace
+    con el texto completo. Retiene el comienzo hasta saber si abre el bloque y los
+    espacios y comillas invertidas finales hasta saber si lo cierran.
+    """
+
+    def __init__(self):
+        self._inicio = ""
+        self._decidido = False
+        self._omitir_espacios = False
+        self._pendiente = ""
+
+    def agregar(self, texto: str) -> str:
+        """Agrega un fragmento y retorna la parte que ya se puede enviar."""
+        if not self._decidido:
+            self._inicio += texto
+            inicio = self._inicio.lstrip()
+            if len(inicio) < len(APERTURA_BLOQUE) and APERTURA_BLOQUE.startswith(inicio):
+                return ""
+            self._decidido = True
+            if inicio.startswith(APERTURA_BLOQUE):
+                texto = inicio[len(APERTURA_BLOQUE):]
+                self._omitir_espacios = True
+            else:
+                texto = self._inicio
+            self._inicio = ""
+
+        if self._omitir_espacios:
+            texto = texto.lstrip()
+            if not texto:
+                return ""
+            self._omitir_espacios = False
+
+        texto = self._pendiente + texto
+        corte = len(texto.rstrip(" \t\r\n`"))
+        self._pendiente = texto[corte:]
+        return texto[:corte]
+
+    def finalizar(self) -> str:
+        """Retorna lo retenido al terminar el texto, sin el cierre del bloque."""
+        if not self._decidido:
+            self._decidido = True
+            self._pendiente, self._inicio = self._inicio, ""
+        pendiente, self._pendiente = self._pendiente, ""
+        if pendiente.endswith(CIERRE_BLOQUE):
+            return ""
+        return pendiente
@@ -1,14 +1,14 @@
 # views.py
 import sys
 from django.shortcuts import render, get_object_or_404
-from asgiref.sync import async_to_sync
+from asgiref.sync import sync_to_async
 from langchain_core.runnables import RunnableConfig
 import uuid
 import os
 import json
 from pathlib import Path
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.conf import settings
 from django.core.files.base import ContentFile
@@ -20,8 +20,10 @@ from django.contrib import messages
 
 from pliego_esp.forms import PliegoForm
 from pliego_esp.services.graph_service import PliegoEspService
-from pliego_esp.utils.mejorar_titulo import mejorar_titulo_especificacion
+from pliego_esp.utils.mejorar_titulo import amejorar_titulo_especificacion
 from pliego_esp.utils.similitud_titulos import calcular_similitud_titulos
+from pliego_esp.utils.streaming import evento_sse
+from embeddings.utils.secciones_md import parsear_markdown, obtener_documento_base
 from esp_web.models import Proyecto, Especificacion
 
 from rich.console import Console
@@ -49,7 +51,7 @@ especificacion = {
 
 # @login_required
 @csrf_exempt
-def pliego_especificaciones_view(request):
+async def pliego_especificaciones_view(request):
     if request.method == "POST":
         request_type = request.POST.get('request_type')
 
@@ -71,11 +73,11 @@ def pliego_especificaciones_view(request):
                     recursion_limit=100,
                     configurable={
                         "thread_id": conversation_id,
-                        "user": request.user.username
+                        "user": (await request.auser()).username
                         }
                     )
                 # Procesamos el mensaje usando el servicio de forma asíncrona
-                response_data = async_to_sync(PliegoEspService.process_pliego)(
+                response_data = await PliegoEspService.process_pliego(
                     input=especificacion,
                     config=config
                     )
@@ -91,14 +93,16 @@ def pliego_especificaciones_view(request):
                     return JsonResponse({
                         'content': response_data.get('content', ''),
                         'token_cost': response_data.get('token_cost', 0),
-                        'conversation_id': response_data.get('conversation_id', '')
+                        'conversation_id': response_data.get('conversation_id', ''),
+                        'desde_cache': response_data.get('desde_cache', False),
+                        'consumo': response_data.get('consumo')
                     })
             
         else:
             resume = json.loads(request.POST.get('items'))
             config = json.loads(request.POST.get('config'))
             
-            response_data = async_to_sync(PliegoEspService.process_pliego)(
+            response_data = await PliegoEspService.process_pliego(
                 input=resume,
                 config=config,
                 resume_data=True
@@ -115,22 +119,22 @@ def pliego_especificaciones_view(request):
             return JsonResponse({
                 'content': response_data.get('content', ''),
                 'token_cost': response_data.get('token_cost', 0),
-                'conversation_id': response_data.get('conversation_id', '')
+                'conversation_id': response_data.get('conversation_id', ''),
+                'consumo': response_data.get('consumo')
             })
             
     else:
         form = PliegoForm()
     
-    return render(request, "pliego_especificaciones.html", {"form": form})
+    return await sync_to_async(render)(request, "pliego_especificaciones.html", {"form": form})
 
 
 @csrf_exempt
-def mejorar_titulo(request):
+async def mejorar_titulo(request):
     if request.method == 'POST':
         try:
             # Decodificar el body como UTF-8
             body = request.body.decode('utf-8')
-            print(f"Body recibido: {body}")
             
             data = json.loads(body)
             titulo_especificacion = data.get('titulo_especificacion', '')
@@ -138,83 +142,30 @@ def mejorar_titulo(request):
             if not titulo_especificacion:
                 return JsonResponse({'error': 'La especificación está vacía'}, status=400)
             
-            resultado = mejorar_titulo_especificacion(titulo_especificacion)
+            resultado = await amejorar_titulo_especificacion(titulo_especificacion)
             
             if resultado['success']:
                 return JsonResponse({
                     'success': True,
-                    'titulo_especificacion_mejorado': resultado['titulo_especificacion_mejorado']
+                    'titulo_especificacion_mejorado': resultado['titulo_especificacion_mejorado'],
+                    'desde_cache': resultado.get('desde_cache', False)
                 })
             else:
                 return JsonResponse({'error': resultado['error']}, status=500)
             
         except Exception as e:
-            print(f"Error: {str(e)}")
+            console.print(f"Error al mejorar el título: {str(e)}", style="bold red")
             return JsonResponse({'error': str(e)}, status=500)
     
     return JsonResponse({'error': 'Método no permitido'}, status=405)
 
 def extraer_parametros_tecnicos(contenido):
     """Extrae los parámetros técnicos de un documento Markdown."""
-    import re
-    
-    # Buscar la sección de parámetros técnicos
-    patron = r"### Parámetros Técnicos\n\n(.*?)(?=\n\n###|\Z)"
-    match = re.search(patron, contenido, re.DOTALL)
-    
-    if not match:
-        return []
-    
-    # Extraer la tabla
-    tabla = match.group(1)
-    lineas = tabla.strip().split('\n')
-    
-    # Procesar la tabla
-    parametros = []
-    for linea in lineas[2:]:  # Saltar las líneas de encabezado y separador
-        if linea.strip():
-            # Dividir por el carácter | y limpiar espacios
-            columnas = [col.strip() for col in linea.split('|') if col.strip()]
-            if len(columnas) >= 2:
-                parametro = {
-                    'nombre': columnas[0],
-                    'opciones': columnas[1].split(', ') if len(columnas) > 1 else [],
-                    'valor_defecto': columnas[2] if len(columnas) > 2 else None
-                }
-                parametros.append(parametro)
-    
-    return parametros
+    return parsear_markdown(contenido).parametros_tecnicos
 
 def extraer_adicionales(contenido):
     """Extrae los adicionales de un documento Markdown."""
-    import re
-    
-    # Buscar la sección de adicionales
-    patron = r"### Adicionales\n\n(.*?)(?=\n\n###|\Z)"
-    match = re.search(patron, contenido, re.DOTALL)
-    
-    if not match:
-        return []
-    
-    # Extraer la lista de adicionales
-    adicionales_texto = match.group(1)
-    lineas = adicionales_texto.strip().split('\n')
-    
-    # Procesar los adicionales
-    adicionales = []
-    for linea in lineas:
-        if linea.strip():
-            # Extraer el texto entre ** si existe
-            match = re.search(r'\*\*(.*?)\*\*:\s*(.*)', linea)
-            if match:
-                nombre = match.group(1).strip()
-                descripcion = match.group(2).strip()
-                adicionales.append({
-                    'nombre': nombre,
-                    'descripcion': descripcion
-                })
-    
-    return adicionales
+    return parsear_markdown(contenido).adicionales
 
 @csrf_exempt
 def nuevo_pliego_view(request):
@@ -298,21 +249,19 @@ def nuevo_pliego_view(request):
                     # Obtener el nombre del archivo base
                     archivo_base = request.session.get('paso2_data', {}).get('nombre_archivo', '')
                     categoria = request.session.get('paso2_data', {}).get('categoria', '')
-                    ruta_archivo = os.path.join(settings.MEDIA_ROOT, 'Markdowns', categoria, archivo_base)
                     
-                    # Leer el contenido del archivo
+                    # Obtener el documento ya analizado (solo se lee del disco si cambió)
                     try:
-                        with open(ruta_archivo, 'r', encoding='utf-8') as file:
-                            contenido = file.read()
-                            
-                            # Extraer parámetros técnico
-                            parametros = extraer_parametros_tecnicos(contenido)
-                            
-                            return JsonResponse({
-                                'success': True,
-                                'message': 'Parámetros extraídos correctamente',
-                                'parametros_tecnicos': parametros,
-                            })
+                        documento = obtener_documento_base(categoria, archivo_base)
+                        
+                        # Extraer parámetros técnicos
+                        parametros = documento.parametros_tecnicos
+                        
+                        return JsonResponse({
+                            'success': True,
+                            'message': 'Parámetros extraídos correctamente',
+                            'parametros_tecnicos': parametros,
+                        })
                     except Exception as e:
                         console.print(f"Error al leer el archivo: {str(e)}", style="bold red")
                         return JsonResponse({
@@ -348,21 +297,19 @@ def nuevo_pliego_view(request):
                     # Obtener el nombre del archivo base
                     archivo_base = request.session.get('paso2_data', {}).get('nombre_archivo', '')
                     categoria = request.session.get('paso2_data', {}).get('categoria', '')
-                    ruta_archivo = os.path.join(settings.MEDIA_ROOT, 'Markdowns', categoria, archivo_base)
                     
-                    # Leer el contenido del archivo
+                    # Obtener el documento ya analizado (solo se lee del disco si cambió)
                     try:
-                        with open(ruta_archivo, 'r', encoding='utf-8') as file:
-                            contenido = file.read()
-                            
-                            # Extraer adicionales
-                            adicionales = extraer_adicionales(contenido)
-                            
-                            return JsonResponse({
-                                'success': True,
-                                'message': 'Adicionales extraídos correctamente',
-                                'adicionales': adicionales,
-                            })
+                        documento = obtener_documento_base(categoria, archivo_base)
+                        
+                        # Extraer adicionales
+                        adicionales = documento.adicionales
+                        
+                        return JsonResponse({
+                            'success': True,
+                            'message': 'Adicionales extraídos correctamente',
+                            'adicionales': adicionales,
+                        })
                     except Exception as e:
                         console.print(f"Error al leer el archivo: {str(e)}", style="bold red")
                         return JsonResponse({
@@ -476,19 +423,19 @@ def guardar_pliego_view(request):
 
 
 @csrf_exempt
-def generar_pliego(request):
+async def generar_pliego(request):
     if request.method == "POST":
         request_type = request.POST.get('request_type')
         if request_type == "inicio":
             console.print("Generando pliego", style="bold green")
-            archivo_base = request.session.get('paso2_data', {}).get('nombre_archivo', '')
-            categoria = request.session.get('paso2_data', {}).get('categoria', '')
-            ruta_archivo = os.path.join(settings.MEDIA_ROOT, 'Markdowns', categoria, archivo_base)
+            paso2_data = await request.session.aget('paso2_data', {})
+            archivo_base = paso2_data.get('nombre_archivo', '')
+            categoria = paso2_data.get('categoria', '')
             
             contenido_pliego = ""
             try:
-                with open(ruta_archivo, 'r', encoding='utf-8') as file:
-                    contenido_pliego = file.read()
+                documento = await sync_to_async(obtener_documento_base)(categoria, archivo_base)
+                contenido_pliego = documento.texto
                     
             except Exception as e:
                 console.print(f"Error al leer el archivo: {str(e)}", style="bold red")
@@ -497,9 +444,9 @@ def generar_pliego(request):
                     'error': f'Error al leer el archivo: {str(e)}'
                 }, status=500)
             
-            titulo_pliego = request.session.get('paso1_data', {}).get('titulo_final', '')
-            parametros_tecnicos = request.session.get('paso3_data', {}).get('parametros', [])
-            adicionales = request.session.get('paso4_data', {}).get('adicionales', [])
+            titulo_pliego = (await request.session.aget('paso1_data', {})).get('titulo_final', '')
+            parametros_tecnicos = (await request.session.aget('paso3_data', {})).get('parametros', [])
+            adicionales = (await request.session.aget('paso4_data', {})).get('adicionales', [])
             
             # console.print(titulo_pliego, style="bold green")
             # console.print(parametros_tecnicos, style="bold green")
@@ -519,12 +466,12 @@ def generar_pliego(request):
                 recursion_limit=100,
                 configurable={
                     "thread_id": conversation_id,
-                    "user": request.user.username
+                    "user": (await request.auser()).username
                     }
                 )
             
             # Procesamos el mensaje usando el servicio de forma asíncrona
-            response_data = async_to_sync(PliegoEspService.process_pliego)(
+            response_data = await PliegoEspService.process_pliego(
                 input=especificacion,
                 config=config
                 )
@@ -552,13 +499,15 @@ def generar_pliego(request):
                     'content': md_generado_html,
                     'raw_markdown': raw_markdown,
                     'token_cost': response_data.get('token_cost', 0),
-                    'conversation_id': response_data.get('conversation_id', '')
+                    'conversation_id': response_data.get('conversation_id', ''),
+                    'desde_cache': response_data.get('desde_cache', False),
+                    'consumo': response_data.get('consumo')
                 })
         else:
             resume = json.loads(request.POST.get('items'))
             config = json.loads(request.POST.get('config'))
             
-            response_data = async_to_sync(PliegoEspService.process_pliego)(
+            response_data = await PliegoEspService.process_pliego(
                 input=resume,
                 config=config,
                 resume_data=True
@@ -591,5 +540,79 @@ def generar_pliego(request):
                 'content': md_generado_html,
                 'raw_markdown': raw_markdown,
                 'token_cost': response_data.get('token_cost', 0),
-                'conversation_id': response_data.get('conversation_id', '')
-            })
\ No newline at end of file
+                'conversation_id': response_data.get('conversation_id', ''),
+                'consumo': response_data.get('consumo')
+            })
+
+def _markdown_a_html(raw_markdown):
+    extensions = [
+        'markdown.extensions.extra',
+        'markdown.extensions.codehilite',
+        'markdown.extensions.sane_lists'
+    ]
+    return markdown.markdown(raw_markdown, output_format='html', extensions=extensions)
+
+
+@csrf_exempt
+async def generar_pliego_stream(request):
+    """
+    Igual que generar_pliego, pero responde con Server-Sent Events: los tokens de
+    la especificación y el avance de los nodos se envían a medida que se generan.
+    """
+    if request.method != "POST":
+        return JsonResponse({'success': False, 'error': 'Método no permitido'}, status=405)
+
+    if request.POST.get('request_type') == "inicio":
+        paso2_data = await request.session.aget('paso2_data', {})
+        archivo_base = paso2_data.get('nombre_archivo', '')
+        categoria = paso2_data.get('categoria', '')
+        try:
+            documento = await sync_to_async(obtener_documento_base)(categoria, archivo_base)
+            contenido_pliego = documento.texto
+        except Exception as e:
+            console.print(f"Error al leer el archivo: {str(e)}", style="bold red")
+            return JsonResponse({
+                'success': False,
+                'error': f'Error al leer el archivo: {str(e)}'
+            }, status=500)
+
+        especificacion = {
+            "pliego_base": contenido_pliego,
+            "titulo": (await request.session.aget('paso1_data', {})).get('titulo_final', ''),
+            "parametros_clave": (await request.session.aget('paso3_data', {})).get('parametros', []),
+            "adicionales": (await request.session.aget('paso4_data', {})).get('adicionales', [])
+        }
+        config = RunnableConfig(
+            recursion_limit=100,
+            configurable={
+                "thread_id": str(uuid.uuid4()),
+                "user": (await request.auser()).username
+                }
+            )
+        argumentos = {"input": especificacion, "config": config}
+    else:
+        argumentos = {
+            "input": json.loads(request.POST.get('items')),
+            "config": json.loads(request.POST.get('config')),
+            "resume_data": True
+        }
+
+    async def eventos():
+        try:
+            async for evento in PliegoEspService.stream_pliego(**argumentos):
+                if evento["type"] == "final":
+                    evento = {
+                        **evento,
+                        "content": _markdown_a_html(evento["content"]),
+                        "raw_markdown": evento["content"]
+                    }
+                yield evento_sse(evento)
+        except Exception as e:
+            console.print(f"Error al generar el pliego: {str(e)}", style="bold red")
+            yield evento_sse({"type": "error", "response": str(e), "token_cost": 0})
+
+    response = StreamingHttpResponse(eventos(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Evitar que nginx acumule la respuesta antes de enviarla
+    response['X-Accel-Buffering'] = 'no'
+    return response
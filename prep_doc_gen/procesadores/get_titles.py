@@ -1,13 +1,10 @@
 import sys
 import re
 from bs4 import BeautifulSoup
-from langchain_openai import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
 from langchain.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 
-# 1. Define tu modelo (puede ser gpt-4o, gpt-4, etc.)
-llm = ChatOpenAI(model="gpt-4o", temperature=0)
+from pliego_esp.graph.llm import crear_chat_model
 
 prompt_template = ChatPromptTemplate.from_template("""
 Eres un especialista en redacción técnica de obras civiles. Tu tarea es **mejorar una lista de títulos de actividades de construcción** para que sean adecuados para documentos oficiales como especificaciones técnicas, presupuestos u hojas de metrados.
@@ -63,6 +60,8 @@ def extraer_titulos(ruta_archivo, tag_titulo):
     
     titulos_input = "\n".join([f"- {t}" for t in titulos_limpios])
     
+    # El modelo se crea al usarlo: importar el módulo no requiere OPENAI_API_KEY
+    llm = crear_chat_model(model="gpt-4o", temperature=0)
     chain = prompt_template | llm | JsonOutputParser()
     
     result = chain.invoke({"titulos": titulos_input})
@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.db.models import Count
 from .models import Ubicacion, UbicacionImagen
 
 
@@ -9,9 +10,13 @@ class UbicacionAdmin(admin.ModelAdmin):
     search_fields = ('nombre', 'descripcion', 'proyecto__nombre')
     readonly_fields = ('fecha_creacion', 'fecha_actualizacion')
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(num_imagenes=Count('imagenes'))
+    
     def cantidad_imagenes(self, obj):
         return obj.cantidad_imagenes()
     cantidad_imagenes.short_description = 'Imágenes'
+    cantidad_imagenes.admin_order_field = 'num_imagenes'
 
 
 @admin.register(UbicacionImagen)
@@ -42,10 +42,19 @@ class Ubicacion(models.Model):
     
     def tiene_imagenes(self):
         """Verifica si la ubicación tiene imágenes asociadas"""
-        return self.imagenes.exists()
+        return self.cantidad_imagenes() > 0
     
     def cantidad_imagenes(self):
-        """Retorna la cantidad de imágenes asociadas"""
+        """
+        Retorna la cantidad de imágenes asociadas. Usa la anotación `num_imagenes`
+        o las imágenes precargadas con prefetch_related si están disponibles, para
+        no hacer una consulta por cada llamada desde los listados.
+        """
+        if hasattr(self, 'num_imagenes'):
+            return self.num_imagenes
+        precargadas = getattr(self, '_prefetched_objects_cache', {})
+        if 'imagenes' in precargadas:
+            return len(precargadas['imagenes'])
         return self.imagenes.count()
 
 
@@ -1,9 +1,10 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse, FileResponse, Http404
 from django.views.decorators.http import require_http_methods
 from django.conf import settings
+from asgiref.sync import sync_to_async
 import json
 import os
 from PIL import Image
@@ -14,47 +15,51 @@ from .utils.generar_ubicacion_pdf import generar_ubicacion_pdf
 
 
 @login_required
-def crear_ubicacion_view(request, proyecto_id):
+async def crear_ubicacion_view(request, proyecto_id):
     """
-    Vista para crear una nueva ubicación
+    Vista para crear una nueva ubicación.
+
+    Es asíncrona porque la generación del PDF consulta Google Maps y OpenAI y
+    puede tardar varios segundos; la generación corre en un hilo aparte.
     """
-    proyecto = get_object_or_404(Proyecto, id=proyecto_id, activo=True)
+    proyecto = await aget_object_or_404(Proyecto, id=proyecto_id, activo=True)
+    usuario = await request.auser()
     
-    if proyecto.creado_por != request.user:
+    if proyecto.creado_por_id != usuario.id:
         messages.error(request, 'Solo puedes crear ubicaciones en tus propios proyectos.')
         return redirect('esp_web:proyecto_detalle', proyecto_id=proyecto.id)
     
     if request.method == 'POST':
         form = UbicacionForm(request.POST)
-        if form.is_valid():
+        if await sync_to_async(form.is_valid)():
             ubicacion = form.save(commit=False)
             ubicacion.proyecto = proyecto
             
             # Si tiene coordenadas y ciudad, generar PDF automáticamente
             if ubicacion.latitud and ubicacion.longitud and ubicacion.ciudad:
                 try:
-                    ubicacion.save()  # Guardar primero para tener el ID
+                    await ubicacion.asave()  # Guardar primero para tener el ID
                     # Intentar obtener la API key desde settings
                     api_key = getattr(settings, 'GOOGLE_MAPS_API_KEY', None)
-                    generar_ubicacion_pdf(ubicacion, google_maps_api_key=api_key)
-                    ubicacion.save()  # Guardar nuevamente con los archivos adjuntos
+                    await sync_to_async(generar_ubicacion_pdf)(ubicacion, google_maps_api_key=api_key)
+                    await ubicacion.asave()  # Guardar nuevamente con los archivos adjuntos
                     messages.success(request, f'Ubicación "{ubicacion.nombre}" creada exitosamente. PDF generado automáticamente.')
                 except ValueError as e:
                     # Error específico de API key no configurada
-                    ubicacion.save()  # Guardar sin PDF si hay error
+                    await ubicacion.asave()  # Guardar sin PDF si hay error
                     messages.warning(request, f'Ubicación "{ubicacion.nombre}" creada exitosamente. Para generar el PDF automáticamente, configure GOOGLE_MAPS_API_KEY en su archivo .env')
                 except Exception as e:
-                    ubicacion.save()  # Guardar sin PDF si hay error
+                    await ubicacion.asave()  # Guardar sin PDF si hay error
                     messages.warning(request, f'Ubicación "{ubicacion.nombre}" creada, pero hubo un error al generar el PDF: {str(e)}')
             else:
-                ubicacion.save()
+                await ubicacion.asave()
                 messages.success(request, f'Ubicación "{ubicacion.nombre}" creada exitosamente.')
             
             return redirect('esp_web:proyecto_detalle', proyecto_id=proyecto.id)
     else:
         form = UbicacionForm()
     
-    return render(request, 'ubi_web/crear_ubicacion.html', {
+    return await sync_to_async(render)(request, 'ubi_web/crear_ubicacion.html', {
         'form': form,
         'proyecto': proyecto,
     })